@@ -34,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'movies.instrumentation.QueryInstrumentationMiddleware',
+    'movies.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -67,12 +69,108 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# SQLite runs in WAL mode so reads are not blocked by the single writer.
+# DB_REPLICAS lists extra SQLite files that serve reads (kept current by
+# `manage.py sync_replicas` locally); see movies/routers.py.
+
+CONN_MAX_AGE = int(os.getenv("DB_CONN_MAX_AGE", 0))
+
+SQLITE_PRAGMAS = [
+    'journal_mode=WAL',
+    'synchronous=NORMAL',  # with WAL, only a power loss can drop the last commits
+    f'mmap_size={int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))}',
+    f'busy_timeout={int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))}',
+]
+
+
+def sqlite_database(name, pragmas=(), **options):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': CONN_MAX_AGE != 0,
+        'OPTIONS': {
+            'init_command': '; '.join(f'PRAGMA {p}' for p in [*SQLITE_PRAGMAS, *pragmas]),
+            **options,
+        },
+    }
+
+
 DATABASES = {
+    # Writers take the lock up front instead of failing to upgrade a read lock
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3', transaction_mode='IMMEDIATE'),
+}
+
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(",")), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = sqlite_database(BASE_DIR / path.strip(), pragmas=['query_only=ON'])
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['movies.routers.ReplicaRouter']
+
+# How far replicas may trail the primary (seconds); a user's reads stay on the
+# primary this long after each of their writes.
+DATABASE_REPLICA_LAG = int(os.getenv("DB_REPLICA_LAG", 5))
+
+
+# Cache
+# locmem by default; set CACHE_BACKEND to "file" or "redis" (with CACHE_LOCATION)
+# to share cached pages/feeds between worker processes. Any deployment with more
+# than one process needs a shared backend: the version counters that tell
+# processes to drop their in-memory genre list and cached pages live here.
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': os.getenv("CACHE_LOCATION", ""),
     }
 }
+if CACHE_BACKEND in ('locmem', 'file'):
+    # Room for a rendered card and a version counter per movie; the default of 300 thrashes.
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': int(os.getenv("CACHE_MAX_ENTRIES", 20000))}
+
+# Serve the read-heavy pages/endpoints with their async views (for ASGI deployments).
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS") == "True"
+
+# Query instrumentation (Server-Timing header + per-URL query budgets)
+QUERY_INSTRUMENTATION = os.getenv("QUERY_INSTRUMENTATION", str(DEBUG)) == "True"
+QUERY_BUDGET_MODULES = ['movies.urls', 'movies.api.urls']
+
+# Safety-net TTL (seconds) for the precomputed home feed; writes invalidate it sooner.
+HOME_FEED_TTL = int(os.getenv("HOME_FEED_TTL", 300))
+
+# Per-user cached favorite ids; kept current by Favorite writes.
+FAVORITES_CACHE_TTL = int(os.getenv("FAVORITES_CACHE_TTL", 60 * 60 * 24))
+
+# Per-user "for you" recommendations written by `manage.py build_for_you`.
+FOR_YOU_TTL = int(os.getenv("FOR_YOU_TTL", 60 * 60 * 24 * 2))
+
+# Per-genre top-N shelves; patched in place by Movie/Review writes.
+GENRE_SHELF_TTL = int(os.getenv("GENRE_SHELF_TTL", 60 * 60))
+
+# Rendered movie card HTML; entries are checked against movie versions, so this only bounds memory.
+CARD_FRAGMENT_TTL = int(os.getenv("CARD_FRAGMENT_TTL", 60 * 60 * 24))
+
+# Trending: activity half-life and how often each process flushes its counters (seconds).
+TRENDING_HALF_LIFE = int(os.getenv("TRENDING_HALF_LIFE", 60 * 60 * 48))
+TRENDING_FLUSH_INTERVAL = int(os.getenv("TRENDING_FLUSH_INTERVAL", 30))
+
+# Background jobs (movies.jobs), run by `manage.py run_workers`.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+# First retry delay (seconds); doubles with each attempt.
+JOB_RETRY_DELAY = int(os.getenv("JOB_RETRY_DELAY", 10))
+# A job still running after this long is assumed lost with its worker and run again.
+JOB_LEASE = int(os.getenv("JOB_LEASE", 60 * 10))
 
 
 # Password validation
@@ -126,3 +224,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Video delivery: "" streams from Django, "x-accel" (nginx) or "x-sendfile"
+# (Apache/lighttpd) hands the file to the front proxy instead.
+VIDEO_SENDFILE_MODE = os.getenv("VIDEO_SENDFILE_MODE", "")
+# Internal nginx location that maps to MEDIA_ROOT (x-accel mode only).
+VIDEO_ACCEL_PREFIX = os.getenv("VIDEO_ACCEL_PREFIX", "/protected-media/")
+# Rewrite uploads as fragmented MP4 (for segment-based players) instead of
+# only moving the index to the front.
+VIDEO_FRAGMENTED = os.getenv("VIDEO_FRAGMENTED") == "True"
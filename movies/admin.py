@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Movie, Genre
+from .models import Genre, Job, Movie
+from .renditions import schedule_renditions
+from .video import schedule_video_processing
 
 
 @admin.register(Movie)
@@ -12,11 +16,12 @@ class MovieAdmin(admin.ModelAdmin):
         'release_date',
         'featured',
         'has_video',
+        'video_status',
     )
     search_fields = ('title', 'genre__name')
     list_filter = ('genre', 'release_date', 'featured')
     list_editable = ('featured',)
-    readonly_fields = ('video_preview',)
+    readonly_fields = ('video_preview', 'video_status')
 
     fieldsets = (
         ('Basic Info', {
@@ -34,6 +39,7 @@ class MovieAdmin(admin.ModelAdmin):
                 'poster',
                 'video',
                 'video_url',
+                'video_status',
                 'video_preview',
             )
         }),
@@ -67,10 +73,38 @@ class MovieAdmin(admin.ModelAdmin):
             raise ValidationError(
                 "Please provide either a video file OR a video URL — not both."
             )
+        if 'poster' in form.changed_data:
+            obj.poster_hash = ''  # serve the original until renditions exist
+        if 'video' in form.changed_data:
+            obj.video_status = Movie.VIDEO_PENDING if obj.video else ''
         super().save_model(request, obj, form, change)
+        if 'poster' in form.changed_data and obj.poster:
+            schedule_renditions(obj.pk)
+        if 'video' in form.changed_data and obj.video:
+            schedule_video_processing(obj.pk)
 
 
 @admin.register(Genre)
 class GenreAdmin(admin.ModelAdmin):
     list_display = ('name',)
     search_fields = ('name',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'key', 'attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'key')
+    readonly_fields = ('claim', 'claimed_at', 'last_error', 'created_at')
+    actions = ['retry_now']
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_now(self, request, queryset):
+        for job in queryset.exclude(status=Job.RUNNING):
+            try:
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk).update(
+                        status=Job.QUEUED, attempts=0, run_at=timezone.now(), claim='',
+                    )
+            except IntegrityError:
+                job.delete()  # the same key is already queued
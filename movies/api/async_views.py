@@ -0,0 +1,149 @@
+"""
+Async (ASGI-native) versions of the read-only API endpoints.
+
+DRF's ``@api_view`` is sync-only, so these are plain Django async views that
+return the same JSON as ``home_api``, ``movie_list_api``,
+``movie_detail_api`` and ``genre_shelf_api``. Routed instead of those when
+``settings.ASYNC_READ_VIEWS`` is on.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from movies.favorites import afavorite_ids
+from movies.feeds import aget_home_feed, section_cards
+from movies.models import Movie, Review
+from movies.pagination import InvalidCursor
+from movies.personalized import afor_you
+from movies.related import related_ids, related_movies
+from movies.shelves import aget_shelves
+from movies.versioning import conditional_view
+from .serializers import agenre_map, card_payload, MOVIE_CARD, MOVIE_DETAIL, ReviewSerializer
+from .streaming import NDJSON, NDJSONRenderer, astream_list, wants_ndjson
+from .views import list_paginator, list_queryset, page_data, shelf_data
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, safe=False, encoder=JSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def error_response(request, data, status):
+    """``json_response``, or one NDJSON line for clients that asked for it (as DRF negotiates)."""
+    if wants_ndjson(request):
+        return HttpResponse(NDJSONRenderer().render(data), status=status, content_type=f'{NDJSON}; charset=utf-8')
+    return json_response(data, status=status)
+
+
+_jwt = JWTAuthentication()
+
+
+async def atoken_user(request):
+    """
+    The active user behind a valid bearer token, ``None`` without one. Raises
+    ``AuthenticationFailed`` exactly where DRF's ``JWTAuthentication`` would.
+    """
+    if _jwt.get_header(request) is None:
+        return None  # anonymous: no database round trip
+    authenticated = await sync_to_async(_jwt.authenticate)(request)
+    return authenticated[0] if authenticated else None
+
+
+def auth_error(exc):
+    # Same body as DRF's exception handler
+    data = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    return json_response(data, status=exc.status_code)
+
+
+# ---------------- Home API ----------------
+@conditional_view(per_user=False, anonymous_only=True)
+@require_GET
+async def home_api(request):
+    try:
+        user = await atoken_user(request)
+    except AuthenticationFailed as exc:
+        return auth_error(exc)
+
+    feed = await aget_home_feed()
+
+    def cards(name):
+        return [card_payload(card) for card in section_cards(feed, name)]
+
+    data = {
+        "featured": cards('api_featured'),
+        "latest": cards('api_latest'),
+        "trending": cards('trending'),
+    }
+    if user is not None:
+        exclude = await afavorite_ids(user)
+        data["for_you"] = [card_payload(card) for card in await afor_you(user.pk, exclude=exclude)]
+    return json_response(data)
+
+
+# ---------------- Movie List API ----------------
+@conditional_view(per_user=False)
+@require_GET
+async def movie_list_api(request):
+    movies, error = list_queryset(request)
+    if error:
+        return error_response(request, {"error": error}, status=400)
+
+    # Full listing, streamed row by row instead of paginated
+    if request.GET.get('stream') or wants_ndjson(request):
+        return await astream_list(request, movies, MOVIE_CARD)
+
+    paginator, error = list_paginator(request, movies)
+    if error:
+        return error_response(request, {"error": error}, status=400)
+    try:
+        page, genres = await asyncio.gather(paginator.apage(request.GET.get('cursor')), agenre_map())
+    except InvalidCursor:
+        return error_response(request, {"error": "Invalid cursor"}, status=400)
+
+    data = page_data(request, page, genres)
+    if request.GET.get('with_total'):
+        data["approximate_count"] = await sync_to_async(paginator.approximate_count)()
+    return json_response(data)
+
+
+# ---------------- Movie Detail API ----------------
+@conditional_view(movie_kwarg='pk', per_user=False, related=related_ids)
+@require_GET
+async def movie_detail_api(request, pk):
+    try:
+        movie, reviews, related, genres = await asyncio.gather(
+            aget_object_or_404(MOVIE_DETAIL.rows(Movie.objects.all()), pk=pk),
+            _alist(Review.objects.filter(movie_id=pk).select_related('user')),
+            _alist(MOVIE_CARD.rows(related_movies(pk))),
+            agenre_map(),
+        )
+    except Http404 as exc:
+        return json_response({"detail": str(exc)}, status=404)  # same body as DRF
+
+    return json_response({
+        "movie": MOVIE_DETAIL.serialize([movie], genres)[0],
+        "reviews": ReviewSerializer(reviews, many=True).data,
+        "related": MOVIE_CARD.serialize(related, genres),
+    })
+
+
+# ---------------- Genre Shelf API ----------------
+@conditional_view(per_user=False)
+@require_GET
+async def genre_shelf_api(request, pk):
+    genre = (await agenre_map()).get(pk)
+    if genre is None:
+        return json_response({"detail": "No Genre matches the given query."}, status=404)
+    return json_response(shelf_data(genre, (await aget_shelves([pk]))[pk]))
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
@@ -1,5 +1,12 @@
+from urllib.parse import urljoin
+
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
 from rest_framework import serializers
+from movies.genres import genre_registry
 from movies.models import Movie, Genre, Review
+from movies.renditions import poster_srcset
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -10,7 +17,8 @@ class GenreSerializer(serializers.ModelSerializer):
 
 class MovieListSerializer(serializers.ModelSerializer):
     genre = GenreSerializer()
-    avg_rating_val = serializers.FloatField(read_only=True)
+    avg_rating_val = serializers.FloatField(source='avg_rating', read_only=True)
+    poster_srcset = serializers.ReadOnlyField()
 
     class Meta:
         model = Movie
@@ -18,19 +26,39 @@ class MovieListSerializer(serializers.ModelSerializer):
             'id',
             'title',
             'poster',
+            'poster_srcset',
             'release_date',
             'avg_rating_val',
             'genre',
         ]
 
 
+def card_payload(card):
+    """MovieListSerializer-shaped dict for a cached home feed card."""
+    poster = card['poster']
+    return {
+        'id': card['id'],
+        'title': card['title'],
+        'poster': poster['url'] if poster else None,
+        'poster_srcset': card['poster_srcset'],
+        'release_date': card['release_date'].isoformat(),
+        'avg_rating_val': float(card['avg_rating']),
+        'genre': card['genre'],
+    }
+
+
 class MovieDetailSerializer(serializers.ModelSerializer):
     genre = GenreSerializer()
-    avg_rating_val = serializers.FloatField(read_only=True)
+    avg_rating_val = serializers.FloatField(source='avg_rating', read_only=True)
+    poster_srcset = serializers.ReadOnlyField()
 
     class Meta:
         model = Movie
-        fields = '__all__'  # includes avg_rating_val automatically
+        # aggregates are exposed as avg_rating_val, poster_hash as poster_srcset;
+        # video_status is admin-only, updated_at bookkeeping for incremental builds
+        exclude = [
+            'external_id', 'rating_sum', 'rating_count', 'avg_rating', 'poster_hash', 'video_status', 'updated_at',
+        ]
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -39,3 +67,118 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ['id', 'user', 'rating', 'comment', 'created_at']
+
+
+class ReviewEntrySerializer(serializers.Serializer):
+    """One entry of a bulk review upload."""
+    movie_id = serializers.IntegerField(min_value=1)
+    rating = serializers.IntegerField(min_value=1, max_value=5)
+    comment = serializers.CharField(max_length=500, allow_blank=True, default='')
+
+
+# ---------------- Fast-path (read-only) serializers ----------------
+# Same output as MovieListSerializer / MovieDetailSerializer, but built from
+# ``.values()`` rows and a genre lookup map instead of model instances, with
+# the per-field conversions resolved once up front.
+
+def _file_url(field_name):
+    storage = Movie._meta.get_field(field_name).storage
+    if not isinstance(storage, FileSystemStorage):
+        return lambda name: storage.url(name) if name else None
+
+    # Same result as FileSystemStorage.url(); urljoin is only needed when the
+    # base has no trailing slash or the path has dot segments to resolve.
+    def url(name):
+        if not name:
+            return None
+        base = storage.base_url
+        path = filepath_to_uri(name).lstrip('/')
+        if base.endswith('/') and '/.' not in '/' + path:
+            return base + path
+        return urljoin(base, path)
+    return url
+
+
+def _date(value):
+    return value.isoformat() if value else None
+
+
+def _datetime(value):
+    if not value:
+        return None
+    value = timezone.localtime(value) if timezone.is_aware(value) else value
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _float(value):
+    return float(value)
+
+
+def _same(value):
+    return value
+
+
+class FastMovieSerializer:
+    """
+    Compiled serializer for a fixed movie shape.
+
+    ``fields`` is a sequence of ``(output key, values() column, converter)``;
+    the ``'genre'`` key is resolved through the genre map.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.values_fields = tuple(dict.fromkeys(
+            'genre_id' if key == 'genre' else column for key, column, _ in self.fields
+        ))
+
+    def rows(self, queryset):
+        return queryset.values(*self.values_fields)
+
+    def to_representation(self, row, genres):
+        return {
+            key: genres.get(row['genre_id']) if key == 'genre' else convert(row[column])
+            for key, column, convert in self.fields
+        }
+
+    def serialize(self, rows, genres=None):
+        genres = genre_map() if genres is None else genres
+        return [self.to_representation(row, genres) for row in rows]
+
+
+def genre_map():
+    return genre_registry.as_map()
+
+
+async def agenre_map():
+    return await genre_registry.aas_map()
+
+
+MOVIE_CARD = FastMovieSerializer([
+    ('id', 'id', _same),
+    ('title', 'title', _same),
+    ('poster', 'poster', _file_url('poster')),
+    ('poster_srcset', 'poster_hash', poster_srcset),
+    ('release_date', 'release_date', _date),
+    ('avg_rating_val', 'avg_rating', _float),
+    ('genre', 'genre_id', None),
+])
+
+MOVIE_DETAIL = FastMovieSerializer([
+    ('id', 'id', _same),
+    ('genre', 'genre_id', None),
+    ('avg_rating_val', 'avg_rating', _float),
+    ('poster_srcset', 'poster_hash', poster_srcset),
+    ('title', 'title', _same),
+    ('description', 'description', _same),
+    ('release_date', 'release_date', _date),
+    ('poster', 'poster', _file_url('poster')),
+    ('featured', 'featured', _same),
+    ('created_at', 'created_at', _datetime),
+    ('duration', 'duration', _same),
+    ('video', 'video', _file_url('video')),
+    ('video_url', 'video_url', _same),
+])
@@ -0,0 +1,91 @@
+"""
+Streaming list responses.
+
+Large listings are serialized one row at a time from a chunked queryset
+iterator and written straight to the socket, so memory stays flat no matter
+how many rows are returned. Clients sending ``Accept: application/x-ndjson``
+get one JSON object per line instead of a single array.
+"""
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .serializers import agenre_map, genre_map
+
+CHUNK_SIZE = 500
+NDJSON = 'application/x-ndjson'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Lets DRF negotiate ``application/x-ndjson`` (used for non-streamed replies such as errors)."""
+    media_type = NDJSON
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(encoder.encode(row) + '\n' for row in rows).encode()
+
+
+STREAMING_RENDERERS = list(api_settings.DEFAULT_RENDERER_CLASSES) + [NDJSONRenderer]
+
+
+def wants_ndjson(request):
+    return NDJSON in request.META.get('HTTP_ACCEPT', '')
+
+
+def _json_array(rows):
+    yield '['
+    first = True
+    for row in rows:
+        yield row if first else ',' + row
+        first = False
+    yield ']'
+
+
+def _ndjson(rows):
+    for row in rows:
+        yield row + '\n'
+
+
+def stream_list(request, queryset, serializer, chunk_size=CHUNK_SIZE):
+    """Stream ``queryset`` through a fast-path serializer (see ``serializers.MOVIE_CARD``)."""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    genres = genre_map()
+    rows = (
+        encoder.encode(serializer.to_representation(row, genres))
+        for row in serializer.rows(queryset).iterator(chunk_size=chunk_size)
+    )
+    if wants_ndjson(request):
+        return StreamingHttpResponse(_ndjson(rows), content_type=NDJSON)
+    return StreamingHttpResponse(_json_array(rows), content_type='application/json')
+
+
+async def astream_list(request, queryset, serializer, chunk_size=CHUNK_SIZE):
+    """``stream_list`` for async views; rows are fetched with ``aiterator()``."""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    genres = await agenre_map()
+
+    async def rows():
+        async for row in serializer.rows(queryset).aiterator(chunk_size=chunk_size):
+            yield encoder.encode(serializer.to_representation(row, genres))
+
+    async def json_array():
+        yield '['
+        first = True
+        async for row in rows():
+            yield row if first else ',' + row
+            first = False
+        yield ']'
+
+    async def ndjson():
+        async for row in rows():
+            yield row + '\n'
+
+    if wants_ndjson(request):
+        return StreamingHttpResponse(ndjson(), content_type=NDJSON)
+    return StreamingHttpResponse(json_array(), content_type='application/json')
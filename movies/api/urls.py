@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -7,27 +8,51 @@ from .views import (
     home_api,
     movie_list_api,
     movie_detail_api,
+    genre_shelf_api,
     register_api,
     toggle_favorite_api,
     user_favorites_api,
     add_review_api,
+    bulk_reviews_api,
 )
 
+# Read-only endpoints can be served by their async (ASGI-native) versions.
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import home_api, movie_list_api, movie_detail_api, genre_shelf_api  # noqa: F811
+
 urlpatterns = [
     # Home / Movies
-    path('home/', home_api),
-    path('movies/', movie_list_api),
-    path('movies/<int:pk>/', movie_detail_api),
+    path('home/', home_api, name='api_home'),
+    path('movies/', movie_list_api, name='api_movie_list'),
+    path('movies/<int:pk>/', movie_detail_api, name='api_movie_detail'),
+    path('genres/<int:pk>/shelf/', genre_shelf_api, name='api_genre_shelf'),
 
     # Auth
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('register/', register_api),
+    path('register/', register_api, name='api_register'),
 
     # Favorites
-    path('favorites/', user_favorites_api),
-    path('favorites/toggle/<int:movie_id>/', toggle_favorite_api),
+    path('favorites/', user_favorites_api, name='api_favorites'),
+    path('favorites/toggle/<int:movie_id>/', toggle_favorite_api, name='api_toggle_favorite'),
 
     # Reviews
-    path('movies/<int:movie_id>/review/', add_review_api),
+    path('movies/<int:movie_id>/review/', add_review_api, name='api_add_review'),
+    path('reviews/bulk/', bulk_reviews_api, name='api_bulk_reviews'),
 ]
+
+# Max SQL queries per request (JWT-authenticated where required, warm caches),
+# checked by movies.instrumentation. Streamed bodies are not counted.
+QUERY_BUDGETS = {
+    'api_home': 2,
+    'api_movie_list': 2,
+    'api_movie_detail': 4,
+    'api_genre_shelf': 0,
+    'api_register': 3,
+    'api_favorites': 2,
+    'api_toggle_favorite': 4,
+    'api_add_review': 6,
+    'api_bulk_reviews': 8,
+    'token_obtain_pair': 2,
+    'token_refresh': 1,
+}
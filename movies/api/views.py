@@ -1,75 +1,176 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import status
-from django.db.models import Avg, Q
 from django.contrib.auth.models import User
 from rest_framework.permissions import IsAuthenticated
+from movies.favorites import favorite_ids
+from movies.feeds import get_home_feed, section_cards
 from movies.models import Movie, Review
+from movies.pagination import CursorPaginator, InvalidCursor
+from movies.personalized import for_you
+from movies.related import related_ids, related_movies
+from movies.reviews import upsert_reviews
+from movies.search import search_movies
+from movies.shelves import SHELVES, get_shelves
+from movies.versioning import conditional_view
+from .streaming import STREAMING_RENDERERS, stream_list, wants_ndjson
 from .serializers import (
-    MovieListSerializer,
-    MovieDetailSerializer,
+    card_payload,
+    genre_map,
+    MOVIE_CARD,
+    MOVIE_DETAIL,
+    ReviewEntrySerializer,
     ReviewSerializer
 )
 
+MAX_PAGE_SIZE = 100
+MAX_BULK_REVIEWS = 500
+
+# ?ordering= values accepted by movie_list_api
+LIST_ORDERINGS = {
+    '-release_date': ('-release_date',),
+    '-avg_rating': ('-avg_rating',),
+    '-created_at': ('-created_at',),
+    'relevance': ('search_rank', '-release_date'),
+}
+
 # ---------------- Home API ----------------
+@conditional_view(per_user=False, anonymous_only=True)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def home_api(request):
-    featured = Movie.objects.filter(featured=True) \
-        .annotate(avg_rating_val=Avg('reviews__rating'))[:6]
+    feed = get_home_feed()
 
-    latest = Movie.objects.order_by('-release_date') \
-        .annotate(avg_rating_val=Avg('reviews__rating'))[:4]
+    def cards(name):
+        return [card_payload(card) for card in section_cards(feed, name)]
 
-    trending = Movie.objects.annotate(
-        avg_rating_val=Avg('reviews__rating')
-    ).order_by('-avg_rating_val')[:4]
-
-    return Response({
-        "featured": MovieListSerializer(featured, many=True).data,
-        "latest": MovieListSerializer(latest, many=True).data,
-        "trending": MovieListSerializer(trending, many=True).data,
-    })
+    data = {
+        "featured": cards('api_featured'),
+        "latest": cards('api_latest'),
+        "trending": cards('trending'),
+    }
+    if request.user.is_authenticated:
+        exclude = favorite_ids(request.user)
+        data["for_you"] = [card_payload(card) for card in for_you(request.user.pk, exclude=exclude)]
+    return Response(data)
 
 
 # ---------------- Movie List API ----------------
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def movie_list_api(request):
-    movies = Movie.objects.annotate(avg_rating_val=Avg('reviews__rating'))
+def list_queryset(request):
+    """Returns ``(queryset, error message)`` for the request's search/genre filters."""
+    movies = Movie.objects.all()
 
     q = request.GET.get('q')
     if q:
-        movies = movies.filter(
-            Q(title__icontains=q) |
-            Q(description__icontains=q) |
-            Q(genre__name__icontains=q)
-        )
+        movies = search_movies(movies, q)
 
     genre_id = request.GET.get('genre')
     if genre_id:
+        if not genre_id.isdigit():
+            return None, "Invalid genre"
         movies = movies.filter(genre_id=genre_id)
+    return movies, None
+
+
+def list_paginator(request, movies):
+    """Returns ``(paginator, error message)`` for the request's ordering/page_size."""
+    q = request.GET.get('q')
+    ordering = request.GET.get('ordering')
+    if ordering is None:
+        ordering = 'relevance' if q else '-release_date'
+    if ordering not in LIST_ORDERINGS or (ordering == 'relevance' and not q):
+        return None, "Unsupported ordering"
+
+    try:
+        page_size = min(int(request.GET.get('page_size', 20)), MAX_PAGE_SIZE)
+    except ValueError:
+        page_size = 20
+    ordering = LIST_ORDERINGS[ordering]
+    rows = movies.values(*dict.fromkeys(
+        MOVIE_CARD.values_fields + tuple(o.lstrip('-') for o in ordering)
+    ))
+    return CursorPaginator(rows, ordering, per_page=max(page_size, 1)), None
+
+
+def page_data(request, page, genres):
+    def page_url(cursor):
+        if cursor is None:
+            return None
+        params = request.GET.copy()
+        params['cursor'] = cursor
+        return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+    return {
+        "next": page_url(page.next_cursor),
+        "previous": page_url(page.previous_cursor),
+        "results": MOVIE_CARD.serialize(page.object_list, genres),
+    }
+
+
+@conditional_view(per_user=False)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes(STREAMING_RENDERERS)
+def movie_list_api(request):
+    movies, error = list_queryset(request)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response(MovieListSerializer(movies, many=True).data)
+    # Full listing, streamed row by row instead of paginated
+    if request.GET.get('stream') or wants_ndjson(request):
+        return stream_list(request, movies, MOVIE_CARD)
+
+    paginator, error = list_paginator(request, movies)
+    if error:
+        return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return Response({"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+    data = page_data(request, page, genre_map())
+    if request.GET.get('with_total'):
+        data["approximate_count"] = paginator.approximate_count()
+    return Response(data)
 
 
 # ---------------- Movie Detail API ----------------
+@conditional_view(movie_kwarg='pk', per_user=False, related=related_ids)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def movie_detail_api(request, pk):
-    movie = Movie.objects.annotate(
-        avg_rating_val=Avg('reviews__rating')
-    ).get(pk=pk)
+    movie = get_object_or_404(MOVIE_DETAIL.rows(Movie.objects.all()), pk=pk)
 
-    reviews = movie.reviews.all()
+    reviews = Review.objects.filter(movie_id=pk).select_related('user')
+    related = MOVIE_CARD.rows(related_movies(pk))
 
+    genres = genre_map()
     return Response({
-        "movie": MovieDetailSerializer(movie).data,
-        "reviews": ReviewSerializer(reviews, many=True).data
+        "movie": MOVIE_DETAIL.serialize([movie], genres)[0],
+        "reviews": ReviewSerializer(reviews, many=True).data,
+        "related": MOVIE_CARD.serialize(related, genres),
     })
 
+
+# ---------------- Genre Shelf API ----------------
+def shelf_data(genre, shelf):
+    data = {"genre": genre}
+    data.update((name, [card_payload(card) for card in shelf[name]]) for name in SHELVES)
+    return data
+
+
+@conditional_view(per_user=False)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def genre_shelf_api(request, pk):
+    genre = genre_map().get(pk)
+    if genre is None:
+        raise Http404("No Genre matches the given query.")
+    return Response(shelf_data(genre, get_shelves([pk])[pk]))
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register_api(request):
@@ -102,10 +203,10 @@ def toggle_favorite_api(request, movie_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(STREAMING_RENDERERS)
 def user_favorites_api(request):
     fav_movies = Movie.objects.filter(favorited_by__user=request.user)
-    from .serializers import MovieListSerializer
-    return Response(MovieListSerializer(fav_movies, many=True).data)
+    return stream_list(request, fav_movies, MOVIE_CARD)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -125,3 +226,26 @@ def add_review_api(request, movie_id):
     )
     from .serializers import ReviewSerializer
     return Response(ReviewSerializer(review).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_reviews_api(request):
+    # Accepts {"reviews": [...]} or a bare list of {movie_id, rating, comment}
+    entries = request.data.get('reviews') if isinstance(request.data, dict) else request.data
+    if not isinstance(entries, list) or not entries:
+        return Response({"error": "Expected a non-empty list of reviews"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(entries) > MAX_BULK_REVIEWS:
+        return Response(
+            {"error": f"At most {MAX_BULK_REVIEWS} reviews per request"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    serializer = ReviewEntrySerializer(data=entries, many=True)
+    if not serializer.is_valid():
+        return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    # A movie listed twice keeps its last entry
+    reviews = {e['movie_id']: (e['rating'], e['comment']) for e in serializer.validated_data}
+    created, updated, missing = upsert_reviews(request.user, reviews)
+    return Response({"created": created, "updated": updated, "missing": missing})
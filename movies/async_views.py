@@ -0,0 +1,124 @@
+"""
+Async (ASGI-native) versions of the read-heavy site pages.
+
+Same behaviour and templates as ``views.home``, ``views.movie_list`` and
+``views.movie_detail``, but data is fetched with the async ORM and
+independent queries run concurrently. Template rendering still runs in a
+worker thread because context processors and ``request.user`` are sync.
+Routed instead of the sync views when ``settings.ASYNC_READ_VIEWS`` is on.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render
+
+from .cards import aprefetch as aprefetch_cards
+from .favorites import afavorite_ids
+from .feeds import aget_home_feed, section_cards
+from .genres import genre_registry
+from .models import Genre, Movie, Review
+from .pagination import CursorPaginator, InvalidCursor
+from .personalized import afor_you
+from .related import related_ids, related_movies
+from .search import search_movies
+from .shelves import aget_shelves
+from . import trending
+from .versioning import conditional_view
+from .views import CARD_SECTIONS, add_stars, list_ordering
+
+arender = sync_to_async(render)
+
+
+# ---------------- Home ----------------
+@conditional_view()
+async def home(request):
+    user = await request.auser()
+    feed, user_fav_ids = await asyncio.gather(aget_home_feed(), afavorite_ids(user))
+
+    context = {
+        'for_you_movies': await afor_you(user.pk, exclude=user_fav_ids),
+        'movies': section_cards(feed, 'featured'),
+        'other_movies': section_cards(feed, 'other'),
+        'trending_movies': section_cards(feed, 'trending'),
+        'latest_movies': section_cards(feed, 'latest'),
+        'genres': feed['genres'],
+        'user_fav_ids': user_fav_ids,
+    }
+    await aprefetch_cards(request, *(context[name] for name in CARD_SECTIONS))
+    return await arender(request, 'movies/home.html', context)
+
+
+# ---------------- Movie List ----------------
+@conditional_view()
+async def movie_list(request, genre_id=None, filter_type=None):
+    movies = Movie.objects.select_related('genre')
+    query = request.GET.get('q')
+    if query:
+        movies = search_movies(movies, query)
+    selected_genre = None
+
+    if genre_id:
+        selected_genre = await aget_object_or_404(Genre, id=genre_id)
+        movies = movies.filter(genre=selected_genre)
+
+    if filter_type == 'trending':
+        movies = trending.with_scores(movies)
+
+    paginator = CursorPaginator(movies, list_ordering(filter_type, query), per_page=20)
+    cursor = request.GET.get('cursor')
+    try:
+        paginator.decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        cursor = None
+
+    async def shelves():
+        if selected_genre or filter_type:
+            return {}
+        genres = [genre for genre in await genre_registry.aall() if genre.movie_count]
+        shelves = await aget_shelves([genre.id for genre in genres])
+        return {genre: shelves[genre.id]['latest'] for genre in genres if shelves[genre.id]['latest']}
+
+    user = await request.auser()
+    page_obj, movies_by_genre, user_fav_ids = await asyncio.gather(
+        paginator.apage(cursor), shelves(), afavorite_ids(user),
+    )
+
+    add_stars(page_obj)
+    await aprefetch_cards(request, page_obj, *movies_by_genre.values())
+
+    return await arender(request, 'movies/movie_list.html', {
+        'page_obj': page_obj,
+        'movies_by_genre': movies_by_genre,
+        'user_fav_ids': user_fav_ids,
+        'selected_genre': selected_genre,
+        'filter_type': filter_type,
+        'search_query': query,
+    })
+
+
+# ---------------- Movie Detail ----------------
+@conditional_view(movie_kwarg='pk', related=related_ids)
+async def movie_detail(request, pk):
+    user = await request.auser()
+    movie, reviews, related, user_fav_ids = await asyncio.gather(
+        aget_object_or_404(Movie.objects.select_related('genre'), pk=pk),
+        _alist(Review.objects.filter(movie_id=pk).select_related('user')),
+        _alist(related_movies(pk).select_related('genre')),
+        afavorite_ids(user),
+    )
+    add_stars(related)
+    await aprefetch_cards(request, related)
+
+    return await arender(request, 'movies/movie_detail.html', {
+        'movie': movie,
+        'user_fav_ids': user_fav_ids,
+        'reviews': reviews,
+        'related_movies': related,
+        'avg_rating_value': movie.avg_rating,
+        'stars_display': movie.stars_display,
+        'review_stars_range': range(1, 6),
+    })
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
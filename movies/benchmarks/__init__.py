@@ -0,0 +1,11 @@
+"""
+Reproducible benchmarks for the site's hot endpoints.
+
+``data`` loads a synthetic catalog (genres, movies, users, reviews and
+favorites with realistic popularity skew) through bulk inserts,
+``scenarios`` lists the requests worth measuring and ``runner`` drives them
+either in-process through the Django test client (with exact query counts)
+or over HTTP against a running server at a fixed concurrency. The
+``bench_site`` command ties them together and writes a JSON report meant to
+be diffed between commits.
+"""
@@ -0,0 +1,122 @@
+"""
+Synthetic data for benchmarks.
+
+``synthetic_catalog`` generates plain tuples (no database) and ``load``
+bulk inserts the same shape as models, then rebuilds everything the pages
+read precomputed: ratings, the search index, trending scores and the
+related-movies index.
+"""
+import io
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+
+from .. import feeds, search, shelves, versioning
+from ..genres import genre_registry
+from ..models import Favorite, Genre, Movie, Review
+
+USERNAME = 'bench{}'
+PASSWORD = 'bench-password'
+
+
+def synthetic_catalog(movies, users, reviews, favorites, genres=20, vocabulary=20000, seed=1):
+    """
+    Random movies/favorites/ratings shaped like real catalogs: word and
+    movie popularity are Zipf-like and users stick to a couple of genres.
+    """
+    rng = random.Random(seed)
+    words = [f'w{i}' for i in range(vocabulary)]
+    cum_weights, total = [], 0.0
+    for i in range(vocabulary):
+        total += 1 / (i + 1)
+        cum_weights.append(total)
+    genre_of = [rng.randrange(genres) for _ in range(movies)]
+    by_genre = [[] for _ in range(genres)]
+    for movie_id, genre in enumerate(genre_of):
+        by_genre[genre].append(movie_id)
+
+    catalog = [
+        (movie_id, genre_of[movie_id], ' '.join(rng.choices(words, cum_weights=cum_weights, k=3)),
+         ' '.join(rng.choices(words, cum_weights=cum_weights, k=40)))
+        for movie_id in range(movies)
+    ]
+
+    def picks(count):
+        # Distinct movies; each user mostly stays within two genres and
+        # favors popular movies.
+        tastes = [by_genre[rng.randrange(genres)] for _ in range(2)]
+        chosen = set()
+        for _ in range(count * 4):
+            if len(chosen) == count:
+                break
+            pool = rng.choice(tastes) if rng.random() < 0.8 else by_genre[rng.randrange(genres)]
+            if pool:
+                chosen.add(pool[min(int(rng.paretovariate(0.8)) - 1, len(pool) - 1)])
+        return chosen
+
+    ratings, favs = [], []
+    for user_id in range(users):
+        ratings.extend((user_id, m, rng.randint(1, 5)) for m in picks(reviews // users))
+        favs.extend((user_id, m) for m in picks(favorites // users))
+    return catalog, favs, ratings
+
+
+def is_loaded():
+    return User.objects.filter(username=USERNAME.format(0)).exists()
+
+
+def load(movies, users, reviews, favorites, genres=20, seed=1, batch_size=2000):
+    """Bulk insert a synthetic catalog; every user's password is ``PASSWORD``."""
+    catalog, favs, ratings = synthetic_catalog(movies, users, reviews, favorites, genres=genres, seed=seed)
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)  # hashing once per user would dominate the load
+
+    with transaction.atomic():
+        genre_ids = [
+            g.pk for g in Genre.objects.bulk_create([Genre(name=f'Bench {i}') for i in range(genres)])
+        ]
+        movie_ids = [
+            m.pk for m in Movie.objects.bulk_create(
+                [
+                    Movie(
+                        title=title, description=description, genre_id=genre_ids[genre],
+                        release_date=date(1990, 1, 1) + timedelta(days=rng.randrange(12000)),
+                        duration=rng.randint(80, 180), featured=rng.random() < 0.01,
+                    )
+                    for _, genre, title, description in catalog
+                ],
+                batch_size=batch_size,
+            )
+        ]
+        user_ids = [
+            u.pk for u in User.objects.bulk_create(
+                [User(username=USERNAME.format(i), password=password) for i in range(users)],
+                batch_size=batch_size,
+            )
+        ]
+        Review.objects.bulk_create(
+            [
+                Review(movie_id=movie_ids[m], user_id=user_ids[u], rating=rating, comment='')
+                for u, m, rating in ratings
+            ],
+            batch_size=batch_size,
+        )
+        Favorite.objects.bulk_create(
+            [Favorite(movie_id=movie_ids[m], user_id=user_ids[u]) for u, m in favs],
+            batch_size=batch_size,
+        )
+        Movie.objects.all().refresh_ratings()
+        search.rebuild_index()
+
+    # bulk_create sends no signals, so refresh what the receivers would have.
+    call_command('rebuild_trending', stdout=io.StringIO())
+    call_command('build_related', stdout=io.StringIO())
+    feeds.invalidate_home_feed()
+    genre_registry.invalidate()
+    shelves.invalidate()
+    versioning.bump(genres=True)
+    return {'genres': genres, 'movies': movies, 'users': users, 'reviews': len(ratings), 'favorites': len(favs)}
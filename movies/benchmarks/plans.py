@@ -0,0 +1,65 @@
+"""
+Query plans for the benchmark scenarios.
+
+``capture`` runs scenarios through the test client and keeps one statement
+per query shape; ``explain`` asks SQLite how it would execute it and
+``full_scans`` picks out the tables read without an index.
+"""
+import re
+
+from django.core.cache import cache
+from django.db import connection
+
+from ..instrumentation import fingerprint
+from .runner import run_client
+
+# Lookup tables small enough that scanning them is the right plan
+SMALL_TABLES = {'movies_genre'}
+
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)\b(.*)$')
+_INDEX_WALK = re.compile(r'^ USING (?:COVERING )?INDEX ')
+_FTS_MATCH = re.compile(r'^ VIRTUAL TABLE INDEX \d+:\S*M')
+_WRITES = ('INSERT', 'UPDATE', 'DELETE', 'SAVEPOINT', 'RELEASE', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+
+def capture(scenarios, ctx):
+    """``{fingerprint: (sql, params)}`` for every read the scenarios issue, cold cache."""
+    statements = {}
+
+    def wrapper(execute, sql, params, many, context):
+        if not many and not sql.lstrip().upper().startswith(_WRITES):
+            statements.setdefault(fingerprint(sql), (sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        for scenario in scenarios:
+            cache.clear()
+            run_client([scenario], ctx, iterations=1, warmup=0)
+    return statements
+
+
+def explain(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan, allowed=SMALL_TABLES, limited=False):
+    """
+    Tables in ``plan`` read front to back, other than ``allowed`` ones.
+
+    Walking a whole index in its order counts too, unless the statement is
+    ``limited`` (has a LIMIT): then it is a top-N read that stops after one
+    page. Full-text MATCH lookups on a virtual table are index reads.
+    """
+    # Subqueries and CTEs show up as "SCAN <alias>" too; only real tables count
+    tables = set(connection.introspection.table_names()) - set(allowed)
+    scanned = []
+    for match in map(_SCAN.match, plan):
+        if not match or match.group(1) not in tables:
+            continue
+        how = match.group(2)
+        if _FTS_MATCH.match(how) or (limited and _INDEX_WALK.match(how)):
+            continue
+        scanned.append(match.group(1))
+    return scanned
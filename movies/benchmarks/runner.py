@@ -0,0 +1,208 @@
+"""
+Drive scenarios and summarize the results.
+
+``run_client`` sends each scenario's requests one after another through
+the Django test client and counts the exact queries every request runs,
+streamed bodies included. ``run_http`` sends them to a running server from
+a thread pool; query counts then come from the ``Server-Timing`` header
+(see ``movies.instrumentation``) when the server has
+``QUERY_INSTRUMENTATION`` on, and are ``None`` otherwise.
+"""
+import json
+import math
+import re
+import statistics
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urljoin
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import Client
+
+from ..instrumentation import record_queries
+
+SERVER_TIMING_RE = re.compile(r'desc="(\d+) queries"')
+COMPARED = ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries')
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted ``values``."""
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def summarize(latencies, statuses, queries, elapsed):
+    latencies = sorted(latencies)
+    counted = [q for q in queries if q is not None]
+
+    def ms(seconds):
+        return round(seconds * 1000, 3)
+
+    return {
+        'requests': len(latencies),
+        # 0 stands for a connection error (HTTP driver only)
+        'errors': sum(1 for s in statuses if s == 0 or s >= 400),
+        'status': {str(code): n for code, n in sorted(Counter(statuses).items())},
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'mean_ms': ms(statistics.fmean(latencies)),
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1]),
+        'queries': round(statistics.fmean(counted), 2) if counted else None,
+        'queries_max': max(counted) if counted else None,
+    }
+
+
+def is_api(path):
+    return path.startswith('/api/')
+
+
+# ---------------- Django test client ----------------
+async def _drain(content):
+    async for _ in content:
+        pass
+
+
+def run_client(scenarios, ctx, iterations=50, warmup=3):
+    anonymous, session = Client(), Client()
+    session.force_login(ctx.user)
+    jwt_headers = {'Authorization': f'Bearer {ctx.access_token}'}
+
+    def send(scenario, i):
+        client = session if scenario.auth == 'session' else anonymous
+        headers = jwt_headers if scenario.auth == 'jwt' else {}
+        path, data = scenario.resolve(ctx, i)
+        if scenario.method == 'GET':
+            response = client.get(path, headers=headers)
+        elif is_api(path):
+            response = client.post(path, json.dumps(data or {}), content_type='application/json', headers=headers)
+        else:
+            response = client.post(path, data or {}, headers=headers)
+        if response.streaming:
+            if response.is_async:
+                async_to_sync(_drain)(response.streaming_content)
+            else:
+                b''.join(response.streaming_content)
+        return response.status_code
+
+    results = {}
+    for scenario in scenarios:
+        for i in range(warmup):
+            send(scenario, i)
+        latencies, statuses, queries = [], [], []
+        started = time.perf_counter()
+        for i in range(warmup, warmup + iterations):
+            with record_queries() as stats:
+                start = time.perf_counter()
+                statuses.append(send(scenario, i))
+                latencies.append(time.perf_counter() - start)
+            queries.append(stats.count)
+        results[scenario.name] = summarize(latencies, statuses, queries, time.perf_counter() - started)
+    return results
+
+
+# ---------------- HTTP ----------------
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect is the response being measured, not a reason for another request.
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _cookies(headers):
+    jar = SimpleCookie()
+    for header in headers.get_all('Set-Cookie') or ():
+        jar.load(header)
+    return {name: morsel.value for name, morsel in jar.items()}
+
+
+def http_login(opener, base_url, username, password):
+    """Log in through the site's form; returns the headers of a logged-in browser."""
+    url = urljoin(base_url, '/login/')
+    with opener.open(url) as response:
+        cookies = _cookies(response.headers)
+    csrf_token = cookies.get(settings.CSRF_COOKIE_NAME, '')
+    form = urlencode({'username': username, 'password': password, 'csrfmiddlewaretoken': csrf_token})
+    request = urllib.request.Request(url, data=form.encode(), headers={
+        'Cookie': f'{settings.CSRF_COOKIE_NAME}={csrf_token}', 'Referer': url,
+    })
+    try:
+        opener.open(request).close()
+    except urllib.error.HTTPError as exc:  # the redirect after a successful login
+        cookies.update(_cookies(exc.headers))
+    if settings.SESSION_COOKIE_NAME not in cookies:
+        raise RuntimeError(f"Could not log in to {url} as {username}")
+    return {
+        'Cookie': '; '.join(f'{name}={value}' for name, value in cookies.items()),
+        'X-CSRFToken': cookies.get(settings.CSRF_COOKIE_NAME, csrf_token),
+        'Referer': url,
+    }
+
+
+def run_http(scenarios, ctx, base_url, iterations=50, warmup=3, concurrency=8, timeout=30):
+    opener = urllib.request.build_opener(NoRedirect)
+    auth_headers = {
+        None: {},
+        'session': http_login(opener, base_url, ctx.username, ctx.password),
+        'jwt': {'Authorization': f'Bearer {ctx.access_token}'},
+    }
+
+    def send(scenario, i):
+        path, data = scenario.resolve(ctx, i)
+        headers = dict(auth_headers[scenario.auth])
+        body = None
+        if scenario.method != 'GET':
+            if is_api(path):
+                body, headers['Content-Type'] = json.dumps(data or {}).encode(), 'application/json'
+            else:
+                body, headers['Content-Type'] = urlencode(data or {}).encode(), 'application/x-www-form-urlencoded'
+        request = urllib.request.Request(urljoin(base_url, path), body, headers, method=scenario.method)
+
+        start = time.perf_counter()
+        try:
+            with opener.open(request, timeout=timeout) as response:
+                response.read()
+                status, response_headers = response.status, response.headers
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            status, response_headers = exc.code, exc.headers
+        except OSError:
+            return time.perf_counter() - start, 0, None
+        latency = time.perf_counter() - start
+        match = SERVER_TIMING_RE.search(response_headers.get('Server-Timing', ''))
+        return latency, status, int(match.group(1)) if match else None
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for scenario in scenarios:
+            list(pool.map(lambda i: send(scenario, i), range(warmup)))
+            started = time.perf_counter()
+            samples = list(pool.map(lambda i: send(scenario, i), range(warmup, warmup + iterations)))
+            elapsed = time.perf_counter() - started
+            latencies, statuses, queries = zip(*samples)
+            results[scenario.name] = summarize(latencies, statuses, queries, elapsed)
+    return results
+
+
+# ---------------- Reports ----------------
+def compare(old, new):
+    """One line per scenario describing how ``new`` differs from report ``old``."""
+    lines = []
+    for name, result in new['scenarios'].items():
+        before = old.get('scenarios', {}).get(name)
+        if before is None:
+            lines.append(f"{name}: not in the baseline")
+            continue
+        changes = []
+        for key in COMPARED:
+            a, b = before.get(key), result.get(key)
+            if a is None or b is None:
+                continue
+            change = f" ({(b - a) / a * 100:+.0f}%)" if a else ""
+            changes.append(f"{key} {a:g} -> {b:g}{change}")
+        lines.append(f"{name}: {', '.join(changes)}")
+    return lines
@@ -0,0 +1,127 @@
+"""
+The requests a benchmark run measures.
+
+A scenario's ``path`` and ``data`` are either constants or callables of
+``(ctx, i)``, so iteration ``i`` can spread over several movies the way
+real traffic does. ``auth`` is ``None`` (anonymous), ``'session'`` (site
+login) or ``'jwt'`` (bearer token).
+"""
+import uuid
+
+from django.contrib.auth.models import User
+from django.db.models import Count
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..models import Genre, Movie
+from ..pagination import CursorPaginator
+from .data import PASSWORD, USERNAME
+
+
+class Scenario:
+    def __init__(self, name, path, method='GET', auth=None, data=None):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.auth = auth
+        self.data = data
+
+    def resolve(self, ctx, i):
+        """``(path, data)`` for iteration ``i``."""
+        path = self.path(ctx, i) if callable(self.path) else self.path
+        data = self.data(ctx, i) if callable(self.data) else self.data
+        return path, data
+
+
+class Context:
+    """Ids and credentials the scenarios need, read from the loaded data."""
+
+    def __init__(self, sample=50, depth=10):
+        self.user = User.objects.get(username=USERNAME.format(0))
+        self.username, self.password = self.user.username, PASSWORD
+        refresh = RefreshToken.for_user(self.user)
+        self.refresh_token, self.access_token = str(refresh), str(refresh.access_token)
+
+        # The most reviewed movies: where real traffic concentrates
+        popular = Movie.objects.order_by('-rating_count', 'pk')[:sample]
+        self.movie_ids = [m.pk for m in popular]
+        self.search_terms = list(dict.fromkeys(m.title.split()[0] for m in popular))
+        self.genre_id = Genre.objects.annotate(n=Count('movies')).order_by('-n', 'pk')[0].pk
+
+        # Default list ordering on both the site and the API
+        paginator = CursorPaginator(Movie.objects.all(), ('-release_date',), per_page=20)
+        cursor = None
+        for _ in range(depth - 1):
+            page = paginator.page(cursor)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.deep_cursor = cursor or ''
+        self.run_id = uuid.uuid4().hex[:8]
+
+    def movie(self, i):
+        return self.movie_ids[i % len(self.movie_ids)]
+
+    def search_term(self, i):
+        return self.search_terms[i % len(self.search_terms)]
+
+
+SCENARIOS = [
+    # Site
+    Scenario('home', '/'),
+    Scenario('home_user', '/', auth='session'),
+    Scenario('movie_list', '/movies/'),
+    Scenario('movie_list_search', lambda ctx, i: f'/movies/?q={ctx.search_term(i)}'),
+    Scenario('movie_list_genre', lambda ctx, i: f'/movies/genre/{ctx.genre_id}/'),
+    Scenario('movie_list_latest', '/movies/latest/'),
+    Scenario('movie_list_top_rated', '/movies/top-rated/'),
+    Scenario('movie_list_trending', '/movies/trending/'),
+    Scenario('movie_list_deep', lambda ctx, i: f'/movies/?cursor={ctx.deep_cursor}'),
+    Scenario('movie_detail', lambda ctx, i: f'/movies/{ctx.movie(i)}/'),
+    Scenario('movie_detail_user', lambda ctx, i: f'/movies/{ctx.movie(i)}/', auth='session'),
+    Scenario('toggle_favorite', lambda ctx, i: f'/movies/{ctx.movie(i // 2)}/favorite/', 'POST', 'session'),
+
+    # API
+    Scenario('api_home', '/api/home/'),
+    Scenario('api_home_user', '/api/home/', auth='jwt'),
+    Scenario('api_movie_list', '/api/movies/'),
+    Scenario('api_movie_list_search', lambda ctx, i: f'/api/movies/?q={ctx.search_term(i)}'),
+    Scenario('api_movie_list_genre', lambda ctx, i: f'/api/movies/?genre={ctx.genre_id}'),
+    Scenario('api_movie_list_top_rated', '/api/movies/?ordering=-avg_rating'),
+    Scenario('api_movie_list_deep', lambda ctx, i: f'/api/movies/?cursor={ctx.deep_cursor}'),
+    Scenario('api_movie_list_stream', lambda ctx, i: f'/api/movies/?stream=1&genre={ctx.genre_id}'),
+    Scenario('api_movie_detail', lambda ctx, i: f'/api/movies/{ctx.movie(i)}/'),
+    Scenario('api_genre_shelf', lambda ctx, i: f'/api/genres/{ctx.genre_id}/shelf/'),
+    Scenario('api_favorites', '/api/favorites/', auth='jwt'),
+    Scenario(
+        'api_toggle_favorite', lambda ctx, i: f'/api/favorites/toggle/{ctx.movie(i // 2)}/', 'POST', 'jwt',
+    ),
+    Scenario(
+        'api_add_review', lambda ctx, i: f'/api/movies/{ctx.movie(i)}/review/', 'POST', 'jwt',
+        data=lambda ctx, i: {'rating': i % 5 + 1, 'comment': 'benchmark'},
+    ),
+    Scenario(
+        'api_bulk_reviews', '/api/reviews/bulk/', 'POST', 'jwt',
+        data=lambda ctx, i: {'reviews': [
+            {'movie_id': ctx.movie(i + n), 'rating': (i + n) % 5 + 1, 'comment': 'benchmark'} for n in range(10)
+        ]},
+    ),
+    Scenario(
+        'api_register', '/api/register/', 'POST',
+        data=lambda ctx, i: {
+            'username': f'bench-{ctx.run_id}-{i}', 'email': f'bench-{ctx.run_id}-{i}@example.com',
+            'password': PASSWORD, 'confirm_password': PASSWORD,
+        },
+    ),
+    Scenario(
+        'token_obtain_pair', '/api/token/', 'POST',
+        data=lambda ctx, i: {'username': ctx.username, 'password': ctx.password},
+    ),
+    Scenario('token_refresh', '/api/token/refresh/', 'POST', data=lambda ctx, i: {'refresh': ctx.refresh_token}),
+]
+
+
+def select(names=None):
+    """Scenarios whose name equals or starts with one of ``names`` (all if empty)."""
+    if not names:
+        return list(SCENARIOS)
+    return [s for s in SCENARIOS if any(s.name == n or s.name.startswith(n) for n in names)]
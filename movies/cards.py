@@ -0,0 +1,139 @@
+"""
+Cached movie card HTML.
+
+Each movie's ``movie_card.html`` is rendered once and cached under its id,
+stamped with the versions it was rendered at: the movie's counter (bumped by
+Movie/Review writes, see ``versioning``), the genre list's counter (cards
+show the genre name) and today's date (the NEW badge). A stale entry is
+simply rendered again.
+
+The cached HTML is shared by every user. It is stored split around two
+placeholders, the animation delay and the favorite button, so serving a
+card is string concatenation: the delay is the card's position and the
+button is ``movie_card_favorite.html``, rendered once per request and heart
+state and given the movie's URL. Anonymous users get no button.
+
+Only HTML rendered from a current card is stored. Movie rows are current;
+``feeds.movie_card`` dicts from other caches only when they carry the
+movie version they were built at (``version``) and it matches the stamp,
+otherwise the card is rendered for this request and not kept.
+
+Views call ``prefetch`` with every card on the page so the page costs one
+``get_many``; the ``{% movie_cards %}`` tag fetches whatever was not
+prefetched.
+"""
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+from . import versioning
+from .routers import from_replica
+from .feeds import movie_card
+
+CARD_TEMPLATE = 'movies/movie_card.html'
+FAVORITE_TEMPLATE = 'movies/movie_card_favorite.html'
+
+# Placeholders rendered into the cached HTML (autoescaping leaves them alone)
+DELAY = '\x00delay\x00'
+FAVORITE = '\x00favorite\x00'
+ACTION = '\x00action\x00'
+
+
+def _key(movie_id):
+    return f'movies:card_html:{movie_id}'
+
+
+def _id(movie):
+    return movie['id'] if isinstance(movie, dict) else movie.id
+
+
+def render_entry(movie, stamp):
+    """``(stamp, head, middle, tail, favorite url)`` for a Movie or ``feeds.movie_card`` dict."""
+    card = movie if isinstance(movie, dict) else movie_card(movie)
+    html = render_to_string(CARD_TEMPLATE, {
+        'movie': card, 'delay': mark_safe(DELAY), 'favorite_form': mark_safe(FAVORITE),
+    })
+    head, rest = html.split(DELAY)
+    middle, tail = rest.split(FAVORITE)
+    return stamp, head, middle, tail, reverse('toggle_favorite', args=[card['id']])
+
+
+def load(movies):
+    """Current entries for ``movies`` by id: one ``get_many``, stale ones re-rendered and stored."""
+    by_id = {}
+    for movie in movies:
+        # A Movie row is fresher than a card dict from another cache
+        if isinstance(by_id.get(_id(movie), {}), dict):
+            by_id[_id(movie)] = movie
+    if not by_id:
+        return {}
+    version_keys = [versioning.GENRES_KEY] + [versioning.movie_key(pk) for pk in by_id]
+    values = cache.get_many(version_keys + [_key(pk) for pk in by_id])
+    values.update(versioning.seed([key for key in version_keys if key not in values]))
+
+    today = date.today().toordinal()
+    entries, rendered, provisional = {}, {}, {}
+    for pk, movie in by_id.items():
+        stamp = (values[versioning.movie_key(pk)], values[versioning.GENRES_KEY], today)
+        entry = values.get(_key(pk))
+        if entry is None or entry[0] != stamp:
+            entry = render_entry(movie, stamp)
+            if isinstance(movie, dict) and movie.get('version') != stamp[0]:
+                pass  # built before the movie's last write, or at an unknown version
+            elif from_replica(movie):
+                # A replica row may predate the write that set this version; keep it only briefly
+                provisional[_key(pk)] = entry
+            else:
+                rendered[_key(pk)] = entry
+        entries[pk] = entry
+    if rendered:
+        cache.set_many(rendered, settings.CARD_FRAGMENT_TTL)
+    if provisional:
+        cache.set_many(provisional, settings.DATABASE_REPLICA_LAG)
+    return entries
+
+
+def prefetch(request, *groups):
+    """Load the cards of every movie in ``groups`` for ``request`` at once."""
+    loaded = getattr(request, '_movie_cards', None)
+    if loaded is None:
+        loaded = request._movie_cards = {}
+    loaded.update(load(movie for group in groups for movie in group if _id(movie) not in loaded))
+
+
+aprefetch = sync_to_async(prefetch)
+
+
+def _favorite_forms(request):
+    forms = getattr(request, '_movie_card_forms', None)
+    if forms is None:
+        csrf_token = get_token(request)
+        forms = request._movie_card_forms = {
+            active: render_to_string(FAVORITE_TEMPLATE, {
+                'action': mark_safe(ACTION), 'active': active, 'csrf_token': csrf_token,
+            })
+            for active in (False, True)
+        }
+    return forms
+
+
+def render_cards(request, movies, favorite_ids=()):
+    """HTML for ``movies`` in order, with ``request.user``'s hearts filled in."""
+    movies = list(movies)
+    prefetch(request, movies)
+    entries = request._movie_cards
+    forms = _favorite_forms(request) if request.user.is_authenticated else None
+
+    html = []
+    for delay, movie in enumerate(movies):
+        pk = _id(movie)
+        stamp, head, middle, tail, action = entries[pk]
+        favorite = forms[pk in favorite_ids].replace(ACTION, action) if forms else ''
+        html.append(f'{head}{delay}{middle}{favorite}{tail}')
+    return mark_safe(''.join(html))
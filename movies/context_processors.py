@@ -1,6 +1,6 @@
-from .models import Genre
+from .genres import genre_registry
 
 def navbar_genres(request):
     return {
-        'navbar_genres': Genre.objects.all()
+        'navbar_genres': genre_registry.all()
     }
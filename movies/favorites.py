@@ -0,0 +1,121 @@
+"""
+Per-user favorites cache.
+
+Views only need to know which of the 20-odd movies on a page the user has
+favorited, so instead of loading the user's whole Favorite list on every
+request we keep it in the cache as a compact sorted integer array.
+
+Cached arrays are never patched in place: the key carries a per-user
+generation that Favorite writes advance on commit (see ``signals.py``). A
+read that raced a write can only store its array under the generation it
+started with, which nobody reads any more, so a lost update cannot outlive
+the write that caused it. Generations start from the current time in
+milliseconds, so one that fell out of the cache is never reused.
+"""
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Favorite
+
+
+class FavoriteSet:
+    """Sorted array of movie ids with O(log n) membership tests."""
+
+    __slots__ = ('ids',)
+
+    def __init__(self, ids=()):
+        self.ids = array('q', sorted(set(ids)))
+
+    def __contains__(self, movie_id):
+        i = bisect_left(self.ids, movie_id)
+        return i < len(self.ids) and self.ids[i] == movie_id
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, movie_id):
+        i = bisect_left(self.ids, movie_id)
+        if i == len(self.ids) or self.ids[i] != movie_id:
+            self.ids.insert(i, movie_id)
+
+    def discard(self, movie_id):
+        i = bisect_left(self.ids, movie_id)
+        if i < len(self.ids) and self.ids[i] == movie_id:
+            del self.ids[i]
+
+    def __getstate__(self):
+        return self.ids.tobytes()
+
+    def __setstate__(self, state):
+        self.ids = array('q')
+        self.ids.frombytes(state)
+
+
+EMPTY = FavoriteSet()
+
+
+def _generation_key(user_id):
+    return f'movies:favorites:{user_id}:generation'
+
+
+def _key(user_id, generation):
+    return f'movies:favorites:{user_id}:{generation}'
+
+
+def _baseline():
+    return time.time_ns() // 1_000_000
+
+
+def favorite_ids(user):
+    """The user's favorite movie ids (anonymous users get an empty set)."""
+    if not user.is_authenticated:
+        return EMPTY
+    generation_key = _generation_key(user.pk)
+    generation = cache.get(generation_key)
+    if generation is None:
+        generation = _baseline()
+        cache.add(generation_key, generation, None)
+        generation = cache.get(generation_key, generation)
+    key = _key(user.pk, generation)
+    favorites = cache.get(key)
+    if favorites is None:
+        favorites = FavoriteSet(
+            Favorite.objects.filter(user_id=user.pk).values_list('movie_id', flat=True)
+        )
+        cache.set(key, favorites, settings.FAVORITES_CACHE_TTL)
+    return favorites
+
+
+async def afavorite_ids(user):
+    if not user.is_authenticated:
+        return EMPTY
+    generation_key = _generation_key(user.pk)
+    generation = await cache.aget(generation_key)
+    if generation is None:
+        generation = _baseline()
+        await cache.aadd(generation_key, generation, None)
+        generation = await cache.aget(generation_key, generation)
+    key = _key(user.pk, generation)
+    favorites = await cache.aget(key)
+    if favorites is None:
+        favorites = FavoriteSet([
+            movie_id async for movie_id in
+            Favorite.objects.filter(user_id=user.pk).values_list('movie_id', flat=True)
+        ])
+        await cache.aset(key, favorites, settings.FAVORITES_CACHE_TTL)
+    return favorites
+
+
+def favorites_changed(user_id):
+    """Retire the user's cached array; call once the Favorite write has committed."""
+    try:
+        cache.incr(_generation_key(user_id))
+    except ValueError:
+        pass  # not cached; the next read seeds a fresh generation
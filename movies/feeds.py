@@ -0,0 +1,190 @@
+"""
+Precomputed home page sections.
+
+``get_home_feed()`` returns the featured/other/trending/latest ID lists for the
+home page and home API together with a card payload per movie, built once and
+kept in the default cache until a Movie, Review or Genre write invalidates it
+(``HOME_FEED_TTL`` is only a safety net). Per-user favorite state is not part
+of the feed; views merge it in afterwards.
+
+Each card carries the movie version it was built at (``version``) so the
+card HTML cache can tell whether it is still current. A feed built while
+the catalog changed gets no versions; its cards are rendered but not cached.
+"""
+import asyncio
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+
+from . import trending, versioning
+from .genres import genre_registry
+from .models import Movie
+
+HOME_FEED_KEY = 'movies:home_feed'
+
+
+def stars_for(avg):
+    return [
+        'full' if i <= avg else
+        'half' if i - avg < 1 else
+        'empty'
+        for i in range(1, 6)
+    ]
+
+
+def movie_card(movie):
+    """Template/API friendly snapshot of everything a movie card renders."""
+    avg = movie.avg_rating or 0
+    return {
+        'id': movie.id,
+        'pk': movie.pk,
+        'title': movie.title,
+        'description': movie.description,
+        'release_date': movie.release_date,
+        'poster': {'url': movie.poster.url} if movie.poster else None,
+        'poster_srcset': movie.poster_srcset,
+        'genre': {'id': movie.genre_id, 'name': movie.genre.name},
+        'featured': movie.featured,
+        'avg_rating': avg,
+        'avg_rating_value': avg,
+        'stars_list': stars_for(avg),
+        'display_duration': movie.display_duration,
+        'is_new': movie.release_date >= date.today() - timedelta(days=30),
+    }
+
+
+def _movies():
+    # Cached until the next write, so read it where that write is already visible
+    return Movie.objects.using(DEFAULT_DB_ALIAS).select_related('genre')
+
+
+def _trending_section(movies, trending_ids):
+    if len(trending_ids) >= 4:
+        movies = movies.filter(id__in=trending_ids)
+    # else: too little activity recorded yet, pad with the best rated movies
+    return movies.order_by(F('trending__log_score').desc(nulls_last=True), '-avg_rating')[:4]
+
+
+def _independent_sections(trending_ids):
+    """Section querysets that do not depend on which movies are featured."""
+    movies = _movies()
+    return {
+        'flagged': movies.filter(featured=True).order_by('-created_at')[:6],
+        'recent': movies.order_by('-created_at')[:6],
+        'trending': _trending_section(movies, trending_ids),
+        # home_api keeps its own definition of the latest section
+        'api_latest': movies.order_by('-release_date')[:4],
+    }
+
+
+def _featured_sections(featured_ids):
+    movies = _movies().exclude(id__in=featured_ids)
+    return {
+        'other': movies.order_by('-created_at')[:4],
+        'latest': movies.order_by('-release_date')[:4],
+    }
+
+
+def _assemble(rows):
+    sections = {
+        'featured': rows['flagged'] or rows['recent'],
+        'other': rows['other'],
+        'trending': rows['trending'],
+        'latest': rows['latest'],
+        'api_featured': rows['flagged'],
+        'api_latest': rows['api_latest'],
+    }
+
+    cards = {}
+    for section in sections.values():
+        for movie in section:
+            if movie.id not in cards:
+                cards[movie.id] = movie_card(movie)
+
+    return {
+        'sections': {name: [m.id for m in section] for name, section in sections.items()},
+        'cards': cards,
+        'genres': rows['genres'],
+    }
+
+
+def stamp_cards(cards, catalog):
+    """
+    Tag ``movie_card`` dicts with their movie's current version.
+
+    ``catalog`` is the catalog version read before the rows the cards were
+    built from. Versions read afterwards only describe those rows if no write
+    landed in between; otherwise the cards are left untagged.
+    """
+    cards = list(cards)
+    versions = versioning.movie_versions({card['id'] for card in cards})
+    if cache.get(versioning.CATALOG_KEY) == catalog:
+        for card in cards:
+            card['version'] = versions[card['id']]
+
+
+def _stamped(feed, catalog):
+    stamp_cards(feed['cards'].values(), catalog)
+    return feed
+
+
+def _genres(entries):
+    return [{'id': g.id, 'name': g.name} for g in entries if g.movie_count]
+
+
+def build_home_feed():
+    catalog = versioning.current(versioning.CATALOG_KEY)
+    sections = _independent_sections(trending.top_movie_ids(4))
+    rows = {name: list(qs) for name, qs in sections.items()}
+    rows['genres'] = _genres(genre_registry.all())
+    featured = rows['flagged'] or rows['recent']
+    rows.update(
+        (name, list(qs)) for name, qs in _featured_sections([m.id for m in featured]).items()
+    )
+    return _stamped(_assemble(rows), catalog)
+
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+async def abuild_home_feed():
+    """``build_home_feed`` with each round of independent queries run concurrently."""
+    async def fetch(querysets):
+        results = await asyncio.gather(*(_alist(qs) for qs in querysets.values()))
+        return dict(zip(querysets, results))
+
+    catalog = await sync_to_async(versioning.current)(versioning.CATALOG_KEY)
+    rows = await fetch(_independent_sections(await trending.atop_movie_ids(4)))
+    rows['genres'] = _genres(await genre_registry.aall())
+    featured = rows['flagged'] or rows['recent']
+    rows.update(await fetch(_featured_sections([m.id for m in featured])))
+    return await sync_to_async(_stamped)(_assemble(rows), catalog)
+
+
+def get_home_feed():
+    feed = cache.get(HOME_FEED_KEY)
+    if feed is None:
+        feed = build_home_feed()
+        cache.set(HOME_FEED_KEY, feed, settings.HOME_FEED_TTL)
+    return feed
+
+
+async def aget_home_feed():
+    feed = await cache.aget(HOME_FEED_KEY)
+    if feed is None:
+        feed = await abuild_home_feed()
+        await cache.aset(HOME_FEED_KEY, feed, settings.HOME_FEED_TTL)
+    return feed
+
+
+def section_cards(feed, name):
+    return [feed['cards'][movie_id] for movie_id in feed['sections'][name]]
+
+
+def invalidate_home_feed():
+    cache.delete(HOME_FEED_KEY)
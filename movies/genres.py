@@ -0,0 +1,96 @@
+"""
+Process-wide genre registry.
+
+Genres change rarely but are rendered on every page (navbar dropdown, home
+badges) and used to build API payloads, so each process keeps the id/name
+list and per-genre movie counts in memory. A version number in the shared
+cache tells every process when to reload: Genre and Movie writes bump it
+(see ``signals.py``), so a render normally costs one cache read and no query.
+
+This needs a cache shared by every worker process (``CACHE_BACKEND`` set to
+``redis`` or ``file``); with the per-process ``locmem`` default, other
+workers keep serving their old list. A version that falls out of the cache
+restarts from the current time in milliseconds, never from a value some
+process may already hold.
+"""
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count
+
+from .models import Genre
+
+VERSION_KEY = 'movies:genres:version'
+
+GenreEntry = namedtuple('GenreEntry', ['id', 'name', 'movie_count'])
+
+
+def _baseline():
+    return time.time_ns() // 1_000_000
+
+
+def _query():
+    # Rebuilt right after a genre write bumps the version; a replica may not have it yet
+    return Genre.objects.using(DEFAULT_DB_ALIAS) \
+        .annotate(movie_count=Count('movies')).order_by('name') \
+        .values_list('id', 'name', 'movie_count')
+
+
+class GenreRegistry:
+    def __init__(self):
+        # (version, entries) swapped as one tuple so readers never see a mix.
+        self._state = (None, ())
+
+    def _version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            version = _baseline()
+            cache.add(VERSION_KEY, version, None)
+            version = cache.get(VERSION_KEY, version)
+        return version
+
+    async def _aversion(self):
+        version = await cache.aget(VERSION_KEY)
+        if version is None:
+            version = _baseline()
+            await cache.aadd(VERSION_KEY, version, None)
+            version = await cache.aget(VERSION_KEY, version)
+        return version
+
+    def all(self):
+        version = self._version()
+        current, entries = self._state
+        if current != version:
+            entries = tuple(GenreEntry(*row) for row in _query())
+            self._state = (version, entries)
+        return entries
+
+    async def aall(self):
+        version = await self._aversion()
+        current, entries = self._state
+        if current != version:
+            entries = tuple([GenreEntry(*row) async for row in _query()])
+            self._state = (version, entries)
+        return entries
+
+    def with_movies(self):
+        return [g for g in self.all() if g.movie_count]
+
+    def as_map(self):
+        """``{id: {'id': ..., 'name': ...}}`` in the shape of ``GenreSerializer``."""
+        return {g.id: {'id': g.id, 'name': g.name} for g in self.all()}
+
+    async def aas_map(self):
+        return {g.id: {'id': g.id, 'name': g.name} for g in await self.aall()}
+
+    def invalidate(self):
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.add(VERSION_KEY, _baseline(), None)
+        self._state = (None, ())
+
+
+genre_registry = GenreRegistry()
@@ -0,0 +1,143 @@
+"""
+Per-request query instrumentation.
+
+``QueryInstrumentationMiddleware`` counts the SQL a request runs, how long it
+spent in the database and which statements ran more than once (an N+1 smell),
+and reports them in a ``Server-Timing`` header. Each URL name may declare a
+query budget in a ``QUERY_BUDGETS`` dict next to its urlpatterns (see
+``movies/urls.py`` and ``movies/api/urls.py``); going over it is logged, and
+``QueryBudgetMixin`` turns it into a test failure.
+
+Only enabled when ``settings.QUERY_INSTRUMENTATION`` is true. Queries run
+while a ``StreamingHttpResponse`` is being consumed are not included.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from importlib import import_module
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r'\s+')
+_TRANSACTION_RE = re.compile(r'\s*(BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE)\b', re.IGNORECASE)
+
+
+def fingerprint(sql):
+    """Normalize SQL so the same statement with different values compares equal."""
+    sql = _IN_LIST_RE.sub('(%s, ...)', sql)
+    sql = _LITERAL_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            # Transaction control depends on the caller (tests wrap
+            # everything in savepoints), so it does not count as a query.
+            if not _TRANSACTION_RE.match(sql):
+                self.count += 1
+                self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {sql: n for sql, n in self.fingerprints.items() if n > 1}
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries", '
+            f'dbdup;desc="{sum(n - 1 for n in self.duplicates.values())} duplicate"'
+        )
+
+
+@contextmanager
+def record_queries(using=None):
+    """Record every query run inside the block on the given (or every) database."""
+    stats = QueryStats()
+    aliases = [using] if using else list(connections)
+    wrapped = []
+    try:
+        for alias in aliases:
+            cm = connections[alias].execute_wrapper(stats)
+            cm.__enter__()
+            wrapped.append(cm)
+        yield stats
+    finally:
+        for cm in reversed(wrapped):
+            cm.__exit__(None, None, None)
+
+
+_budgets = None
+
+
+def query_budgets():
+    """URL name -> max queries, merged from every ``settings.QUERY_BUDGET_MODULES``."""
+    global _budgets
+    if _budgets is None:
+        budgets = {}
+        for module in settings.QUERY_BUDGET_MODULES:
+            budgets.update(getattr(import_module(module), 'QUERY_BUDGETS', {}))
+        _budgets = budgets
+    return _budgets
+
+
+def budget_for(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return None
+    return query_budgets().get(match.url_name)
+
+
+class QueryInstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not settings.QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as stats:
+            response = self.get_response(request)
+
+        response['Server-Timing'] = stats.server_timing()
+        response.query_stats = stats
+        response.query_budget = budget = budget_for(request)
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                "%s ran %d queries (budget %d); duplicates: %s",
+                request.resolver_match.url_name, stats.count, budget, stats.duplicates,
+            )
+        return response
+
+
+class QueryBudgetMixin:
+    """TestCase mixin; requires ``QUERY_INSTRUMENTATION`` to be enabled for the test."""
+
+    def assertWithinQueryBudget(self, response):
+        stats = getattr(response, 'query_stats', None)
+        if stats is None:
+            self.fail("Response has no query stats; is QUERY_INSTRUMENTATION enabled?")
+        url_name = response.resolver_match.url_name
+        budget = response.query_budget
+        if budget is None:
+            self.fail(f"No query budget declared for URL name {url_name!r}")
+        if stats.count > budget:
+            self.fail(
+                f"{url_name!r} ran {stats.count} queries, budget is {budget}.\n"
+                + "\n".join(f"  x{n}  {sql}" for sql, n in stats.duplicates.items())
+            )
@@ -0,0 +1,147 @@
+"""
+Background jobs stored in the database.
+
+``enqueue(func, *args, **kwargs)`` records a call to a module-level function
+as a ``Job`` row; ``manage.py run_workers`` claims ready rows and runs them
+on a thread or process pool. No broker is involved: the jobs table is the
+queue, so enqueueing inside a transaction commits or rolls back with it, and
+``enqueue_on_commit`` defers even the insert until the transaction commits.
+
+* Claiming is one ``UPDATE ... WHERE id IN (ready ids)`` that stamps a random
+  claim token, so two workers never run the same job.
+* A job that raises is retried after ``JOB_RETRY_DELAY`` seconds, doubling
+  per attempt up to an hour, and marked failed after ``JOB_MAX_ATTEMPTS``.
+  Failed rows stay in the table (and the admin) with their traceback.
+* A running job whose worker died is claimed again once ``JOB_LEASE``
+  seconds have passed; work must therefore be safe to repeat. Each claim
+  counts as an attempt, so a job that keeps killing its worker is marked
+  failed once it has used up ``max_attempts``.
+* Passing ``key`` deduplicates: while a job with that key is still queued,
+  enqueueing it again returns the existing row. A job that has already
+  started does not absorb new requests, so nothing enqueued after the work
+  began is lost.
+* Jobs read from the primary: they usually act on rows written just before
+  they were queued, which the replicas may not have yet.
+
+Succeeded jobs are deleted. Arguments must be JSON serializable.
+"""
+import logging
+import random
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import routers
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 60 * 60
+
+
+def task_name(func):
+    name = f'{func.__module__}.{func.__qualname__}'
+    if '<' in name:
+        raise ValueError(f"{name} is not importable; jobs must be module-level functions")
+    return name
+
+
+def enqueue(func, *args, key=None, delay=0, **kwargs):
+    """Queue ``func(*args, **kwargs)``; returns the ``Job`` (the existing one for a queued ``key``)."""
+    job = Job(
+        task=task_name(func), args=list(args), kwargs=kwargs, key=key,
+        run_at=timezone.now() + timedelta(seconds=delay), max_attempts=settings.JOB_MAX_ATTEMPTS,
+    )
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        existing = Job.objects.filter(key=key, status=Job.QUEUED).first()
+        if existing is None:  # started between our insert and this read
+            return enqueue(func, *args, key=key, delay=delay, **kwargs)
+        return existing
+
+
+def enqueue_on_commit(func, *args, using=None, **kwargs):
+    """``enqueue`` once the current transaction on ``using`` commits (right away outside one)."""
+    transaction.on_commit(lambda: enqueue(func, *args, **kwargs), using=using)
+
+
+# ---------------- Workers ----------------
+def claim(limit):
+    """Mark up to ``limit`` ready jobs as running for this caller and return them."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    expired = Q(status=Job.RUNNING, claimed_at__lt=now - timedelta(seconds=settings.JOB_LEASE))
+    exhausted = Job.objects.filter(expired, attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, last_error="The worker running the last attempt stopped before finishing.",
+    )
+    if exhausted:
+        logger.error("%d jobs failed: their workers stopped during the last attempt", exhausted)
+
+    ready = Q(status=Job.QUEUED, run_at__lte=now) | (expired & Q(attempts__lt=F('max_attempts')))
+    ids = Job.objects.filter(ready).order_by('run_at').values('pk')[:limit]
+    claimed = Job.objects.filter(ready, pk__in=ids).update(
+        status=Job.RUNNING, claim=token, claimed_at=now, attempts=F('attempts') + 1,
+    )
+    if not claimed:
+        return []
+    return list(Job.objects.filter(claim=token).order_by('run_at'))
+
+
+def call(task, args, kwargs):
+    # The scope ends with the job, so its writes do not pin the next one
+    with routers.primary():
+        import_string(task)(*args, **kwargs)
+
+
+def retry_delay(attempts):
+    """Seconds before retry number ``attempts``: doubling, capped, with jitter."""
+    delay = min(settings.JOB_RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def finish(job, error=None):
+    """Record the outcome of a claimed ``job``; a no-op if its claim was taken over."""
+    mine = Job.objects.filter(pk=job.pk, claim=job.claim)
+    if error is None:
+        mine.delete()
+        return
+
+    details = ''.join(traceback.format_exception(error))
+    if job.attempts >= job.max_attempts:
+        logger.error("Job %s (%s) failed after %d attempts:\n%s", job.pk, job.task, job.attempts, details)
+        mine.update(status=Job.FAILED, last_error=details)
+        return
+
+    logger.warning("Job %s (%s) attempt %d failed, will retry", job.pk, job.task, job.attempts)
+    run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+    try:
+        with transaction.atomic():
+            mine.update(status=Job.QUEUED, run_at=run_at, last_error=details)
+    except IntegrityError:
+        # The same key was queued again meanwhile; that job does the work
+        mine.delete()
+
+
+def run_ready(limit=100):
+    """Claim and run ready jobs in this thread; returns how many ran. For tests and scripts."""
+    jobs = claim(limit)
+    for job in jobs:
+        try:
+            call(job.task, job.args, job.kwargs)
+        except Exception as exc:
+            finish(job, exc)
+        else:
+            finish(job)
+    return len(jobs)
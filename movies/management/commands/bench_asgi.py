@@ -0,0 +1,91 @@
+import asyncio
+import importlib
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from django.urls import clear_url_caches
+
+DEFAULT_URLS = ['/', '/movies/', '/movies/top-rated/', '/api/home/', '/api/movies/']
+
+
+def reload_urlconf():
+    for module in ('movies.urls', 'movies.api.urls', 'config.urls'):
+        importlib.reload(importlib.import_module(module))
+    clear_url_caches()
+
+
+class Command(BaseCommand):
+    help = (
+        "In-process ASGI load benchmark: drives config.asgi-style requests through "
+        "the sync views and then the async views (ASYNC_READ_VIEWS) at a fixed "
+        "concurrency and reports throughput and latency percentiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per mode.")
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--url', action='append', dest='urls', help="URL to hit (repeatable).")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON.")
+
+    def handle(self, *args, **options):
+        urls = options['urls'] or DEFAULT_URLS
+        results = {}
+        try:
+            for mode in ('sync', 'async'):
+                with override_settings(ASYNC_READ_VIEWS=(mode == 'async'), ALLOWED_HOSTS=['testserver']):
+                    reload_urlconf()
+                    results[mode] = asyncio.run(
+                        self.run_load(urls, options['requests'], options['concurrency'])
+                    )
+        finally:
+            reload_urlconf()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode, r in results.items():
+            self.stdout.write(
+                f"{mode:>5}: {r['rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f} ms  "
+                f"p99 {r['p99_ms']:7.1f} ms  errors {r['errors']}"
+            )
+
+    async def run_load(self, urls, total, concurrency):
+        client = AsyncClient()
+        latencies, errors = [], 0
+        queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(urls[i % len(urls)])
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                url = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(url)
+                if response.streaming:
+                    async for _ in response.streaming_content:
+                        pass
+                latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors += 1
+
+        # Warm caches so both modes measure the steady state.
+        for url in urls:
+            await client.get(url)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'requests': total,
+            'concurrency': concurrency,
+            'rps': total / elapsed,
+            'p50_ms': statistics.median(latencies) * 1000,
+            'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+            'errors': errors,
+        }
@@ -0,0 +1,69 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from movies import cards, versioning
+from movies.feeds import movie_card
+from movies.models import Genre, Movie
+
+# Far above real primary keys, so the benchmark never overwrites real cache entries.
+FIRST_ID = 10 ** 12
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark: rendering a page of movie cards from the template vs the fragment cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20, help="Best of N runs.")
+
+    def handle(self, *args, **options):
+        count, repeat = options['cards'], options['repeat']
+        genres = [Genre(id=i, name=f'Genre {i}') for i in range(1, 11)]
+        page = [
+            movie_card(Movie(
+                id=FIRST_ID + i, title=f'Movie {i}', description='Lorem ipsum ' * 10,
+                release_date=date.today() - timedelta(days=i * 7), genre=genres[i % len(genres)],
+                duration=90 + i % 60, avg_rating=(i % 50) / 10,
+            ))
+            for i in range(count)
+        ]
+        favorites = {card['id'] for card in page[::3]}
+        keys = [cards._key(card['id']) for card in page] + [versioning.movie_key(card['id']) for card in page]
+
+        def request_for(user):
+            request = RequestFactory().get('/')
+            request.user = user
+            return request
+
+        def uncached(user):
+            # What every page did before: the template runs for every card.
+            cache.delete_many(keys)
+            return cards.render_cards(request_for(user), page, favorites)
+
+        def cached(user):
+            return cards.render_cards(request_for(user), page, favorites)
+
+        member = User(id=FIRST_ID, username='bench')
+        try:
+            cached(member)  # fill the cache
+            for label, user in (('anonymous', AnonymousUser()), ('logged in', member)):
+                before = min(self._time(lambda: uncached(user)) for _ in range(repeat))
+                cached(user)
+                after = min(self._time(lambda: cached(user)) for _ in range(repeat))
+                self.stdout.write(
+                    f"{label:>9}: {count} cards rendered {before * 1000:7.2f} ms, "
+                    f"cached {after * 1000:6.2f} ms ({before / after:.0f}x)"
+                )
+        finally:
+            cache.delete_many(keys)
+
+    @staticmethod
+    def _time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
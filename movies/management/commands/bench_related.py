@@ -0,0 +1,50 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies.benchmarks.data import synthetic_catalog
+from movies.related import SimilarityIndex
+
+
+class Command(BaseCommand):
+    help = "Benchmark building the related-movies index on a synthetic catalog (no database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--reviews', type=int, default=1000000)
+        parser.add_argument('--favorites', type=int, default=300000)
+        parser.add_argument(
+            '--sample', type=int, default=None,
+            help="Score only this many movies and extrapolate the full build time.",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        catalog, favorites, ratings = synthetic_catalog(
+            options['movies'], options['users'], options['reviews'], options['favorites'],
+        )
+        generated = time.perf_counter()
+        self.stdout.write(
+            f"Generated {len(catalog):,} movies, {len(ratings):,} reviews, {len(favorites):,} favorites "
+            f"in {generated - start:.1f}s"
+        )
+
+        index = SimilarityIndex(catalog, favorites, ratings)
+        indexed = time.perf_counter()
+        self.stdout.write(f"Indexed in {indexed - generated:.1f}s")
+
+        movie_ids = range(len(catalog))
+        if options['sample']:
+            movie_ids = random.Random(2).sample(movie_ids, min(options['sample'], len(catalog)))
+        neighbors = sum(len(row) for _, row in index.rows(movie_ids))
+        scored = time.perf_counter() - indexed
+
+        per_movie = scored / len(movie_ids)
+        self.stdout.write(
+            f"Scored {len(movie_ids):,} movies ({neighbors:,} neighbors) in {scored:.1f}s, "
+            f"{per_movie * 1000:.2f} ms/movie"
+        )
+        if options['sample']:
+            self.stdout.write(f"Estimated full build: {indexed - generated + per_movie * len(catalog):.0f}s")
@@ -0,0 +1,57 @@
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+
+from movies.api.serializers import (
+    MOVIE_CARD,
+    MOVIE_DETAIL,
+    MovieDetailSerializer,
+    MovieListSerializer,
+)
+from movies.models import Genre, Movie
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark: DRF ModelSerializers vs the fast-path card/detail serializers (rows/second)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3, help="Best of N runs.")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+
+        # In-memory data only: the benchmark measures serialization, not the DB.
+        genres = [Genre(id=i, name=f'Genre {i}') for i in range(1, 21)]
+        genre_lookup = {g.id: {'id': g.id, 'name': g.name} for g in genres}
+        movies = []
+        for i in range(rows):
+            genre = genres[i % len(genres)]
+            movies.append(Movie(
+                id=i + 1, title=f'Movie {i}', description='Lorem ipsum ' * 10,
+                release_date=date(2000, 1, 1) + timedelta(days=i % 9000), genre=genre,
+                poster=f'posters/{i}.jpg' if i % 3 else '', featured=not i % 10,
+                created_at=datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i),
+                duration=90 + i % 60, avg_rating=(i % 50) / 10,
+            ))
+        value_rows = [
+            {name: getattr(m, name) for name in MOVIE_DETAIL.values_fields}
+            for m in movies
+        ]
+
+        cases = [
+            ('card   DRF ', lambda: MovieListSerializer(movies, many=True).data),
+            ('card   fast', lambda: MOVIE_CARD.serialize(value_rows, genre_lookup)),
+            ('detail DRF ', lambda: MovieDetailSerializer(movies, many=True).data),
+            ('detail fast', lambda: MOVIE_DETAIL.serialize(value_rows, genre_lookup)),
+        ]
+        for label, run in cases:
+            best = min(self._time(run) for _ in range(repeat))
+            self.stdout.write(f"{label}: {rows / best:>12,.0f} rows/s  ({best * 1000:.1f} ms)")
+
+    @staticmethod
+    def _time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
@@ -0,0 +1,148 @@
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from movies import trending
+from movies.benchmarks import data, runner
+from movies.benchmarks.scenarios import SCENARIOS, Context, select
+from movies.models import Favorite, Genre, Movie, Review
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the site's hot endpoints on a synthetic catalog and write a JSON report "
+        "(throughput, latency percentiles, queries per request) to diff between commits. "
+        "By default requests go through the Django test client against a throwaway database "
+        "(the cache is cleared before and after); --base-url drives a running server instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--reviews', type=int, default=20000)
+        parser.add_argument('--favorites', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help="Only scenarios with this name or name prefix (repeatable).",
+        )
+        parser.add_argument('--iterations', type=int, default=50, help="Measured requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=3, help="Unmeasured requests per scenario first.")
+        parser.add_argument(
+            '--base-url',
+            help="Drive a running server over HTTP, e.g. http://127.0.0.1:8000. It must use this "
+                 "project's database, loaded beforehand with --load-only.",
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent requests (--base-url only).")
+        parser.add_argument(
+            '--load-only', action='store_true',
+            help="Load the synthetic catalog into the configured database and exit.",
+        )
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+        parser.add_argument('--compare', help="Print changes against an earlier JSON report.")
+        parser.add_argument('--list', action='store_true', help="List scenario names and exit.")
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for scenario in SCENARIOS:
+                self.stdout.write(f"{scenario.name:<28} {scenario.method:<4} {scenario.auth or ''}")
+            return
+
+        scenarios = select(options['scenarios'])
+        if not scenarios:
+            raise CommandError("No scenario matches; see --list.")
+
+        if options['load_only']:
+            if data.is_loaded():
+                raise CommandError("The benchmark catalog is already loaded in this database.")
+            dataset = self.load(options)
+            self.stdout.write(self.style.SUCCESS(f"Loaded {json.dumps(dataset)}."))
+            return
+
+        if options['base_url']:
+            if not data.is_loaded():
+                raise CommandError("No benchmark catalog in the configured database; run with --load-only first.")
+            results = runner.run_http(
+                scenarios, Context(), options['base_url'], options['iterations'],
+                options['warmup'], options['concurrency'],
+            )
+            dataset = self.dataset()
+        else:
+            results, dataset = self.run_in_process(scenarios, options)
+
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'created_at': timezone.now().isoformat(timespec='seconds'),
+                'driver': 'http' if options['base_url'] else 'client',
+                'base_url': options['base_url'],
+                'concurrency': options['concurrency'] if options['base_url'] else 1,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'async_read_views': settings.ASYNC_READ_VIEWS,
+            },
+            'dataset': dataset,
+            'scenarios': results,
+        }
+        text = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(text + '\n')
+        else:
+            self.stdout.write(text)
+
+        errors = {name: r['errors'] for name, r in results.items() if r['errors']}
+        if errors:
+            self.stderr.write(f"Scenarios with error responses: {errors}")
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            for line in runner.compare(baseline, report):
+                self.stderr.write(line)
+
+    def load(self, options):
+        return data.load(
+            options['movies'], options['users'], options['reviews'], options['favorites'], seed=options['seed'],
+        )
+
+    def dataset(self):
+        return {
+            'genres': Genre.objects.count(),
+            'movies': Movie.objects.count(),
+            'reviews': Review.objects.count(),
+            'favorites': Favorite.objects.count(),
+        }
+
+    def run_in_process(self, scenarios, options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache.clear()
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                self.load(options)
+                dataset = self.dataset()  # before the write scenarios add to it
+                results = runner.run_client(scenarios, Context(), options['iterations'], options['warmup'])
+            trending.counters.flush()  # into the throwaway database, not the real one at exit
+            return results, dataset
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            cache.clear()
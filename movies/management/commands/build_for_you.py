@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from movies import personalized
+
+_inputs = None
+
+
+def _init(inputs):
+    global _inputs
+    django.setup()
+    _inputs = inputs
+
+
+def _score(histories):
+    # Runs in a worker process: pure computation, no database access.
+    neighbors, genre_of, genre_top = _inputs
+    return [
+        (user_id, personalized.score_user(history, neighbors, genre_of, genre_top))
+        for user_id, history in histories
+    ]
+
+
+class Command(BaseCommand):
+    help = "Precompute and cache every active user's \"for you\" recommendations."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='*', help="Only these user ids.")
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+        parser.add_argument('--chunk-size', type=int, default=500, help="Users per worker task (default: 500).")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        neighbors = personalized.load_neighbors()
+        genre_of, genre_top = personalized.load_genre_top()
+        histories = list(personalized.user_histories(options['users']).items())
+        loaded = time.perf_counter()
+
+        size = options['chunk_size']
+        chunks = [histories[i:i + size] for i in range(0, len(histories), size)]
+        stored = 0
+        with ProcessPoolExecutor(
+            max_workers=options['workers'], initializer=_init, initargs=((neighbors, genre_of, genre_top),),
+        ) as pool:
+            for results in pool.map(_score, chunks):
+                personalized.store(dict(results))
+                stored += len(results)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Cached recommendations for {stored} users in {elapsed:.1f}s "
+            f"(loading {loaded - start:.1f}s)."
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies import related, versioning
+
+
+class Command(BaseCommand):
+    help = "Build the related-movies (\"more like this\") neighbor table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help="Only rebuild movies touched since the last build (full build if there is none).",
+        )
+
+    def handle(self, *args, **options):
+        movie_ids = None
+        if options['incremental']:
+            since = related.last_built()
+            if since is not None:
+                movie_ids = related.changed_since(since)
+                if not movie_ids:
+                    self.stdout.write("Nothing changed since the last build.")
+                    return
+
+        start = time.perf_counter()
+        index = related.load_index()
+        loaded = time.perf_counter()
+        written = related.store(index.rows(movie_ids), movie_ids)
+        done = time.perf_counter()
+        versioning.bump(written)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Built neighbors for {len(written)} movies "
+            f"(load {loaded - start:.1f}s, score + store {done - loaded:.1f}s)."
+        ))
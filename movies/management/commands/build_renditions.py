@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+
+from movies import feeds, shelves, versioning
+from movies.models import Movie
+from movies.renditions import build_renditions
+
+
+def _render(name):
+    # Runs in a worker process: file work only, no database access.
+    return name, build_renditions(name)
+
+
+class Command(BaseCommand):
+    help = "Generate poster renditions for every movie that is missing them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-check movies that already have renditions.")
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+
+    def handle(self, *args, **options):
+        movies = Movie.objects.exclude(poster='').exclude(poster__isnull=True)
+        if not options['all']:
+            movies = movies.filter(poster_hash='')
+        names = sorted(set(movies.values_list('poster', flat=True)))
+
+        start = time.perf_counter()
+        failed = 0
+        updated = []
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = {pool.submit(_render, name): name for name in names}
+            for future in as_completed(futures):
+                try:
+                    name, digest = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"Failed {futures[future]}: {exc}")
+                    continue
+                pks = list(movies.filter(poster=name).values_list('pk', flat=True))
+                Movie.objects.filter(pk__in=pks).update(poster_hash=digest)
+                updated += pks
+
+        done = len(updated)
+        if done:
+            feeds.invalidate_home_feed()
+            shelves.invalidate()
+            versioning.bump(updated)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Built renditions for {done} movies ({failed} posters failed) in {elapsed:.1f}s."
+        ))
@@ -0,0 +1,217 @@
+import csv
+import json
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from movies import feeds, search, shelves, versioning
+from movies.genres import genre_registry
+from movies.models import Genre, Movie
+
+# Input columns copied onto Movie; `genre` is resolved separately.
+FIELDS = ('title', 'description', 'release_date', 'duration', 'featured', 'video_url')
+REQUIRED = ('external_id', 'title', 'description', 'release_date', 'genre')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def read_rows(path, fmt):
+    """Yield ``(line number, dict)`` from a CSV or JSONL file without loading it."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_num, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield line_num, json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        yield line_num, exc
+
+
+class GenreResolver:
+    """Genre name -> id, loaded once; unknown names are created a batch at a time."""
+
+    def __init__(self, create=True):
+        self.ids = dict(Genre.objects.values_list('name', 'id'))
+        self.create = create
+        self.created = set()
+
+    def resolve(self, names):
+        missing = {name for name in names if name not in self.ids}
+        if not missing:
+            return
+        self.created |= missing
+        if not self.create:
+            # Dry run: hand out placeholder ids so rows still validate.
+            self.ids.update((name, -1) for name in missing)
+            return
+        Genre.objects.bulk_create([Genre(name=name) for name in missing], ignore_conflicts=True)
+        self.ids.update(Genre.objects.filter(name__in=missing).values_list('name', 'id'))
+
+
+class Checkpoint:
+    """Last committed input line, so an interrupted import resumes after it."""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get('source') != self.source:
+            raise CommandError(f"Checkpoint {self.path} belongs to {data.get('source')}, not {self.source}.")
+        return data['line']
+
+    def save(self, line):
+        if not self.path:
+            return
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'source': self.source, 'line': line}, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert movies from a CSV or JSONL file, keyed on external_id. "
+        "Columns: external_id, title, description, release_date (YYYY-MM-DD), genre (name), "
+        "and optionally duration, featured, video_url (left unchanged on existing movies when absent)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSONL file to import.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (default: from the file extension).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows written per transaction (default: 1000).")
+        parser.add_argument('--dry-run', action='store_true', help="Validate every row without writing anything.")
+        parser.add_argument(
+            '--checkpoint',
+            help="File recording the last committed line; an existing one resumes the import after it.",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        dry_run = options['dry_run']
+        checkpoint = Checkpoint(None if dry_run else options['checkpoint'], path)
+        resume_after = checkpoint.load()
+        if resume_after:
+            self.stdout.write(f"Resuming after line {resume_after}.")
+
+        genres = GenreResolver(create=not dry_run)
+        self.imported = self.invalid = 0
+        start = time.perf_counter()
+
+        batch = []
+        last_line = resume_after
+        for line_num, row in read_rows(path, fmt):
+            if line_num <= resume_after:
+                continue
+            batch.append((line_num, row))
+            last_line = line_num
+            if len(batch) >= batch_size:
+                self.write_batch(batch, genres, dry_run)
+                checkpoint.save(last_line)
+                batch = []
+                self.progress(start)
+        if batch:
+            self.write_batch(batch, genres, dry_run)
+            checkpoint.save(last_line)
+        checkpoint.clear()
+
+        if self.imported and not dry_run:
+            feeds.invalidate_home_feed()
+            genre_registry.invalidate()
+            shelves.invalidate()
+            versioning.bump(genres=bool(genres.created))
+
+        elapsed = time.perf_counter() - start
+        verb = "Validated" if dry_run else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {self.imported} movies ({self.invalid} invalid rows, "
+            f"{len(genres.created)} new genres) in {elapsed:.1f}s, "
+            f"{self.imported / elapsed if elapsed else 0:.0f} rows/s."
+        ))
+
+    def progress(self, start):
+        if self.verbosity > 1:
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"  {self.imported} rows, {self.imported / elapsed:.0f} rows/s")
+
+    # ---------------- rows ----------------
+    def parse(self, row):
+        if isinstance(row, Exception):
+            raise ValidationError(f"Invalid JSON: {row}")
+        if not isinstance(row, dict):
+            raise ValidationError("Expected an object")
+        row = {key: value.strip() if isinstance(value, str) else value for key, value in row.items()}
+        missing = [name for name in REQUIRED if row.get(name) in (None, '')]
+        if missing:
+            raise ValidationError(f"Missing {', '.join(missing)}")
+        values = {name: row[name] for name in FIELDS if row.get(name) not in (None, '')}
+        if isinstance(values.get('featured'), str):
+            values['featured'] = values['featured'].lower() in TRUE_VALUES
+        return str(row['external_id']), str(row['genre']), values
+
+    def write_batch(self, batch, genres, dry_run):
+        parsed = {}
+        for line_num, row in batch:
+            try:
+                external_id, genre, values = self.parse(row)
+            except ValidationError as exc:
+                self.report(line_num, exc)
+                continue
+            # A repeated id within one batch keeps its last row.
+            parsed[external_id] = (line_num, genre, values)
+
+        genres.resolve({genre for _, genre, _ in parsed.values()})
+
+        # Rows are grouped by the optional columns they carry, so an upsert
+        # only overwrites what the input provides.
+        groups = {}
+        for external_id, (line_num, genre, values) in parsed.items():
+            movie = Movie(external_id=external_id, genre_id=genres.ids[genre], **values)
+            try:
+                movie.clean_fields(exclude=['genre', 'poster', 'video'])
+            except ValidationError as exc:
+                self.report(line_num, exc)
+                continue
+            groups.setdefault(tuple(name for name in FIELDS if name in values), []).append(movie)
+
+        movies = [movie for group in groups.values() for movie in group]
+        if not dry_run and movies:
+            with transaction.atomic():
+                for fields, group in groups.items():
+                    Movie.objects.bulk_create(
+                        group,
+                        update_conflicts=True,
+                        unique_fields=['external_id'],
+                        update_fields=['genre', 'updated_at', *fields],
+                    )
+                ids = list(Movie.objects.filter(
+                    external_id__in=[m.external_id for m in movies]
+                ).values_list('pk', flat=True))
+                search.index_movies(ids)
+            versioning.bump(ids)
+        self.imported += len(movies)
+
+    def report(self, line_num, exc):
+        self.invalid += 1
+        messages = exc.message_dict if hasattr(exc, 'error_dict') else {'row': exc.messages}
+        detail = '; '.join(f"{field}: {' '.join(errors)}" for field, errors in messages.items())
+        self.stderr.write(f"Line {line_num}: {detail}")
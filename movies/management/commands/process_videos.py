@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from movies import mp4
+from movies.models import Movie
+from movies.video import process_video, schedule_video_processing
+
+
+class Command(BaseCommand):
+    help = "Rewrite uploaded videos for fast playback start (moov first, or fragmented MP4)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Include videos that were already processed.")
+        parser.add_argument('--queue', action='store_true',
+                            help="Queue background jobs for run_workers instead of processing here.")
+
+    def handle(self, *args, **options):
+        movies = Movie.objects.exclude(video='').exclude(video__isnull=True)
+        if not options['all']:
+            movies = movies.exclude(video_status=Movie.VIDEO_READY)
+
+        if options['queue']:
+            ids = list(movies.values_list('pk', flat=True))
+            movies.update(video_status=Movie.VIDEO_PENDING)
+            for pk in ids:
+                schedule_video_processing(pk)
+            self.stdout.write(self.style.SUCCESS(f"Queued {len(ids)} videos."))
+            return
+
+        start = time.perf_counter()
+        ready = 0
+        for movie in movies.only('video'):
+            before = self.startup_bytes(movie)
+            process_video(movie.pk)
+            movie.refresh_from_db(fields=['video', 'video_status'])
+            ready += movie.video_status == Movie.VIDEO_READY
+            self.stdout.write(
+                f"{movie.video.name}: {movie.video_status}, "
+                f"playback starts after {before} -> {self.startup_bytes(movie)} bytes"
+            )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Processed {ready} videos in {elapsed:.1f}s."))
+
+    def startup_bytes(self, movie):
+        try:
+            with movie.video.open('rb') as f:
+                return mp4.startup_bytes(f)
+        except (OSError, mp4.Mp4Error):
+            return '?'
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies import feeds, shelves, versioning
+from movies.models import Movie
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored rating_sum / rating_count / avg_rating columns on Movie."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of movies updated per statement (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(Movie.objects.order_by('pk').values_list('pk', flat=True))
+        updated = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            with transaction.atomic():
+                updated += Movie.objects.filter(pk__in=batch).refresh_ratings()
+            # update() sends no signals, so do what the Movie signals would
+            versioning.bump(batch)
+        feeds.invalidate_home_feed()
+        shelves.invalidate()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings for {updated} movies."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the movie full-text search index from the Movie table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias to rebuild.")
+
+    def handle(self, *args, **options):
+        using = options['database']
+        with transaction.atomic(using=using):
+            indexed = search.rebuild_index(using=using)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} movies."))
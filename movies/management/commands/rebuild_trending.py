@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from movies import trending
+from movies.models import Favorite, Review, TrendingScore
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute TrendingScore from stored reviews and favorites. "
+        "Watch starts are not persisted, so their contribution is dropped."
+    )
+
+    def handle(self, *args, **options):
+        scores = {}
+        history = [
+            ('review', Review.objects.values_list('movie_id', 'created_at')),
+            ('favorite', Favorite.objects.values_list('movie_id', 'added_at')),
+        ]
+        for kind, events in history:
+            for movie_id, at in events.iterator(chunk_size=5000):
+                value = trending.log_weight(kind, at.timestamp())
+                scores[movie_id] = trending.logaddexp(scores.get(movie_id), value)
+
+        with transaction.atomic():
+            TrendingScore.objects.all().delete()
+            TrendingScore.objects.bulk_create(
+                [TrendingScore(movie_id=pk, log_score=score) for pk, score in scores.items()],
+                batch_size=1000,
+            )
+        trending.refresh_top()
+        self.stdout.write(self.style.SUCCESS(f"Scored {len(scores)} movies."))
@@ -0,0 +1,100 @@
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from movies import jobs
+
+
+def _run(task, args, kwargs):
+    # Runs on a pool thread or process; each keeps its own database connection.
+    try:
+        jobs.call(task, args, kwargs)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (movies.jobs) until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOB_WORKERS,
+                            help=f"Jobs run at once (default: {settings.JOB_WORKERS}).")
+        parser.add_argument('--processes', action='store_true',
+                            help="Run jobs in worker processes instead of threads (CPU-bound work).")
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help="Seconds between checks for new jobs when idle (default: 1).")
+        parser.add_argument('--burst', action='store_true',
+                            help="Exit once no job is ready instead of waiting for more.")
+
+    def handle(self, *args, **options):
+        self.size = max(options['workers'], 1)
+        self.processes = options['processes']
+        pool = self.make_pool()
+
+        self.stopping = False
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self.stop)
+
+        done = failed = 0
+        running = {}
+        try:
+            while running or not self.stopping:
+                if not self.stopping and len(running) < self.size:
+                    for job in jobs.claim(self.size - len(running)):
+                        try:
+                            future = pool.submit(_run, job.task, job.args, job.kwargs)
+                        except BrokenProcessPool:
+                            pool = self.replace_pool(pool)
+                            future = pool.submit(_run, job.task, job.args, job.kwargs)
+                        running[future] = (job, pool)
+                if not running:
+                    if options['burst']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                finished, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                broken = False
+                for future in finished:
+                    job, job_pool = running.pop(future)
+                    error = future.exception()
+                    # A worker process died; every job in that pool counts as a failed attempt
+                    broken |= isinstance(error, BrokenProcessPool) and job_pool is pool
+                    jobs.finish(job, error)
+                    if error is None:
+                        done += 1
+                    else:
+                        failed += 1
+                        self.stderr.write(f"Job {job.pk} ({job.task}) failed: {error!r}")
+                if broken:
+                    pool = self.replace_pool(pool)
+        finally:
+            pool.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} jobs ({failed} failed)."))
+
+    def make_pool(self):
+        if self.processes:
+            # Fresh interpreters: a forked child would share the parent's database connection
+            return ProcessPoolExecutor(
+                max_workers=self.size, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+            )
+        return ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='jobs')
+
+    def replace_pool(self, pool):
+        self.stderr.write("A worker process died; starting a new pool.")
+        pool.shutdown(wait=False)
+        return self.make_pool()
+
+    def stop(self, signum, frame):
+        if self.stopping:
+            raise KeyboardInterrupt
+        self.stdout.write("Finishing running jobs; interrupt again to abort.")
+        self.stopping = True
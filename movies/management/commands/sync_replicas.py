@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into every DATABASE_REPLICAS file with the "
+        "online backup API. Stands in for real replication in a local setup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0,
+                            help="Keep copying every N seconds instead of once.")
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas configured; list their files in DB_REPLICAS.")
+        for alias in [DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"{alias} is not a SQLite database.")
+
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                self.copy(alias)
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def copy(self, alias):
+        started = time.perf_counter()
+        source = sqlite3.connect(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'])
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'], timeout=30)
+        try:
+            # Readers of the replica keep their snapshot until the copy commits
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"{alias}: copied in {elapsed:.0f} ms")
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 20:03
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Movie = apps.get_model('movies', 'Movie')
+    for movie in Movie.objects.annotate(
+        s=Sum('reviews__rating'), c=Count('reviews'), a=Avg('reviews__rating')
+    ).filter(c__gt=0):
+        Movie.objects.filter(pk=movie.pk).update(
+            rating_sum=movie.s, rating_count=movie.c, avg_rating=movie.a
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0004_movie_video_movie_video_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='avg_rating',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
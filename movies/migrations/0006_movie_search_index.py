@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 20:30
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from movies.search import SQLiteFTSBackend
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    backend = SQLiteFTSBackend()
+    schema_editor.execute(backend.create_sql)
+    backend.rebuild(using=schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    from movies.search import SQLiteFTSBackend
+
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(SQLiteFTSBackend.drop_sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_movie_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0012_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='video_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='', editable=False, max_length=10),
+        ),
+    ]
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models import Avg
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
 from datetime import date, timedelta
 
 class Genre(models.Model):
@@ -10,7 +11,37 @@ class Genre(models.Model):
         return self.name
 
 
+class MovieQuerySet(models.QuerySet):
+    def refresh_ratings(self):
+        """Recompute the stored rating aggregates for every movie in the queryset."""
+        reviews = Review.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+        rating_sum = Coalesce(
+            Subquery(reviews.annotate(s=Sum('rating')).values('s')),
+            Value(0),
+            output_field=IntegerField(),
+        )
+        rating_count = Coalesce(
+            Subquery(reviews.annotate(c=Count('id')).values('c')),
+            Value(0),
+            output_field=IntegerField(),
+        )
+        # SQL evaluates every SET expression against the old row, so the
+        # average is derived from the same subqueries rather than the columns.
+        avg_rating = Coalesce(
+            Cast(rating_sum, FloatField()) / Cast(rating_count, FloatField()),
+            Value(0.0),
+            output_field=FloatField(),
+        )
+        return self.order_by().update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            avg_rating=avg_rating,
+        )
+
+
 class Movie(models.Model):
+    # Catalog feed identifier; the key `import_movies` upserts on
+    external_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
     title = models.CharField(max_length=200)
     description = models.TextField()
     release_date = models.DateField()
@@ -20,8 +51,11 @@ class Movie(models.Model):
         on_delete=models.CASCADE
     )
     poster = models.ImageField(upload_to='posters/', blank=True, null=True)
+    poster_hash = models.CharField(max_length=32, blank=True, default='', editable=False)
     featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set by save() and import_movies, not by bulk update()s of derived columns
+    updated_at = models.DateTimeField(auto_now=True)
     duration = models.PositiveIntegerField(
         help_text="Duration in minutes",
         null=True,
@@ -35,6 +69,20 @@ class Movie(models.Model):
         null=True,
         help_text="Upload MP4 file (dev / small projects)"
     )
+    # Post-upload processing (see movies.video); the original is served meanwhile
+    VIDEO_PENDING = 'pending'
+    VIDEO_PROCESSING = 'processing'
+    VIDEO_READY = 'ready'
+    VIDEO_FAILED = 'failed'
+    VIDEO_STATUSES = [
+        (VIDEO_PENDING, 'Pending'),
+        (VIDEO_PROCESSING, 'Processing'),
+        (VIDEO_READY, 'Ready'),
+        (VIDEO_FAILED, 'Failed'),
+    ]
+    video_status = models.CharField(
+        max_length=10, choices=VIDEO_STATUSES, blank=True, default='', editable=False,
+    )
 
     video_url = models.URLField(
         blank=True,
@@ -42,14 +90,30 @@ class Movie(models.Model):
         help_text="External video URL (CDN / Cloudinary / S3)"
     )
 
+    # ⭐ Rating aggregates (kept current by Review writes)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    avg_rating = models.FloatField(default=0, editable=False)
+
+    objects = MovieQuerySet.as_manager()
+
+    class Meta:
+        # Every list is keyset-paginated with the primary key as the last
+        # sort key, so the ordering indexes end in `id` and serve both the
+        # ORDER BY and the "rows after this cursor" range.
+        indexes = [
+            models.Index(fields=['featured', 'created_at'], name='movie_featured_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='movie_created_idx'),
+            models.Index(fields=['release_date', 'id'], name='movie_release_idx'),
+            models.Index(fields=['avg_rating', 'id'], name='movie_rating_idx'),
+            models.Index(fields=['genre', 'release_date', 'id'], name='movie_genre_release_idx'),
+            models.Index(fields=['genre', 'avg_rating', 'id'], name='movie_genre_rating_idx'),
+            models.Index(fields=['updated_at'], name='movie_updated_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
-    # ⭐ Average rating (read-only)
-    @property
-    def avg_rating(self):
-        return self.reviews.aggregate(avg=Avg('rating'))['avg'] or 0
-
     # ⭐ Stars display (read-only)
     @property
     def stars_display(self):
@@ -64,6 +128,12 @@ class Movie(models.Model):
                 stars.append('empty')
         return stars
 
+    # 🖼 Responsive poster renditions (read-only)
+    @property
+    def poster_srcset(self):
+        from .renditions import poster_srcset
+        return poster_srcset(self.poster_hash)
+
     # ⏱ Runtime display (read-only)
     @property
     def display_duration(self):
@@ -93,6 +163,10 @@ class Favorite(models.Model):
 
     class Meta:
         unique_together = ('user', 'movie')  # Prevent duplicates
+        indexes = [
+            # Activity since the last offline build (related movies, trending)
+            models.Index(fields=['added_at'], name='favorite_added_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} → {self.movie.title}"
@@ -108,6 +182,85 @@ class Review(models.Model):
     class Meta:
         unique_together = ('movie', 'user')  # 1 review per user per movie
         ordering = ['-created_at']
+        indexes = [
+            # A movie's reviews, newest first
+            models.Index(fields=['movie', 'created_at'], name='review_movie_created_idx'),
+            # Covers the per-movie SUM/COUNT behind the rating aggregates
+            models.Index(fields=['movie', 'rating'], name='review_movie_rating_idx'),
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.movie.title} ({self.rating})"
+
+    def save(self, *args, **kwargs):
+        # The post_save handler refreshes the movie's rating aggregates;
+        # keep the review write and that refresh in a single transaction.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class TrendingScore(models.Model):
+    """Time-decayed activity for a movie, flushed from memory by ``movies.trending``."""
+    movie = models.OneToOneField(Movie, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    # ln(score) measured at the trending epoch; decay never reorders rows,
+    # so the index serves the top-K directly.
+    log_score = models.FloatField(db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.movie_id} ({self.log_score:.2f})"
+
+
+class RelatedMovie(models.Model):
+    """One entry of a movie's top-K "more like this" list, built by ``movies.related``."""
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='neighbors')
+    related = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='recommended_in')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    built_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('movie', 'rank')
+        ordering = ['movie', 'rank']
+
+    def __str__(self):
+        return f"{self.movie_id} → {self.related_id} (#{self.rank})"
+
+
+class Job(models.Model):
+    """A deferred call run by ``manage.py run_workers`` (see ``movies.jobs``)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    # Dotted path of a module-level function and its JSON arguments
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    # At most one queued job per key; enqueueing it again is a no-op
+    key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField()
+    # Set by the worker that claimed the job; guards against a reclaimed job being finished twice
+    claim = models.CharField(max_length=32, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_ready_idx'),
+            models.Index(fields=['claim'], name='job_claim_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status='queued'), name='job_queued_key_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
@@ -0,0 +1,396 @@
+"""
+MP4 (ISO base media file format) rewriting in pure Python.
+
+A player cannot start until it has the ``moov`` box, the index of every
+sample. Many encoders write it after the media data (``mdat``), so a
+browser must download the whole file before the first frame. ``faststart``
+rewrites such a file with ``moov`` in front and every chunk offset in the
+``stco``/``co64`` tables shifted to match (switching to 64-bit offsets if
+the shift needs it). ``fragment`` instead writes a fragmented MP4: a
+``moov`` without samples followed by ``moof``/``mdat`` pairs that start at
+key frames, which segment-based players can fetch and append one at a time.
+
+Only ``moov`` is read into memory; media data is copied in chunks.
+"""
+import struct
+from bisect import bisect_left
+from itertools import accumulate
+
+COPY_CHUNK = 1024 * 1024
+FRAGMENT_SECONDS = 4
+
+_HEADER = struct.Struct('>I4s')
+_U32 = struct.Struct('>I')
+_U64 = struct.Struct('>Q')
+# Only boxes on the way to the sample tables are opened; everything else is kept as bytes
+_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+# Sample tables that describe samples in place; a fragmented moov keeps them empty
+_SAMPLE_TABLES = {b'stts', b'ctts', b'stsc', b'stsz', b'stz2', b'stco', b'co64', b'stss', b'stps', b'sdtp'}
+
+# trun sample_flags: key frame / frame that depends on others
+SYNC_SAMPLE = 0x02000000
+NON_SYNC_SAMPLE = 0x01010000
+
+
+class Mp4Error(ValueError):
+    """The file is not an MP4 this module can rewrite."""
+
+
+class Box:
+    """A top-level box: four-character ``type``, byte ``offset`` and total ``size``."""
+    __slots__ = ('type', 'offset', 'size')
+
+    def __init__(self, type, offset, size):
+        self.type, self.offset, self.size = type, offset, size
+
+    def __repr__(self):
+        return f'Box({self.type!r}, {self.offset}, {self.size})'
+
+
+def top_level_boxes(f):
+    f.seek(0, 2)
+    end = f.tell()
+    boxes, offset = [], 0
+    while offset < end:
+        f.seek(offset)
+        size, kind = _read_header(f.read(16), end - offset)
+        boxes.append(Box(kind, offset, size))
+        offset += size
+    return boxes
+
+
+def _read_header(data, available):
+    """``(size, type)`` of the box whose header starts ``data``."""
+    if len(data) < 8:
+        raise Mp4Error("truncated box header")
+    size, kind = _HEADER.unpack_from(data)
+    if size == 1:
+        if len(data) < 16:
+            raise Mp4Error("truncated box header")
+        size = _U64.unpack_from(data, 8)[0]
+    elif size == 0:
+        size = available  # runs to the end of the file
+    if size < 8 or size > available:
+        raise Mp4Error(f"invalid size for {kind!r} box")
+    return size, kind
+
+
+def _moov(f, boxes):
+    found = [box for box in boxes if box.type == b'moov']
+    if len(found) != 1:
+        raise Mp4Error("expected exactly one moov box")
+    if not any(box.type == b'mdat' for box in boxes):
+        raise Mp4Error("no mdat box")
+    f.seek(found[0].offset)
+    return found[0], parse(f.read(found[0].size))[0]
+
+
+def is_faststart(f):
+    """Whether ``moov`` comes before the first ``mdat`` (``False`` if either is missing)."""
+    offsets = {}
+    for box in top_level_boxes(f):
+        offsets.setdefault(box.type, box.offset)
+    return b'moov' in offsets and b'mdat' in offsets and offsets[b'moov'] < offsets[b'mdat']
+
+
+def startup_bytes(f):
+    """
+    How much of the file a player downloads before it can show the first
+    frame: everything up to the end of ``moov``, plus the first fragment.
+    """
+    boxes = top_level_boxes(f)
+    for i, box in enumerate(boxes):
+        if box.type == b'moov':
+            end = box.offset + box.size
+            following = [b.type for b in boxes[i + 1:i + 3]]
+            if following == [b'moof', b'mdat']:
+                end += boxes[i + 1].size + boxes[i + 2].size
+            return end
+    raise Mp4Error("no moov box")
+
+
+def copy_range(src, dst, offset, length):
+    src.seek(offset)
+    while length:
+        data = src.read(min(length, COPY_CHUNK))
+        if not data:
+            raise Mp4Error("unexpected end of file")
+        dst.write(data)
+        length -= len(data)
+
+
+# ---------------- Box trees ----------------
+# A parsed box is a [type, body] list; body is bytes for a leaf or a list of
+# child boxes for a container, so edits are made in place and re-serialized.
+def parse(data, start=0, end=None):
+    end = len(data) if end is None else end
+    boxes = []
+    while start < end:
+        size, kind = _read_header(data[start:start + 16], end - start)
+        header = 16 if _U32.unpack_from(data, start)[0] == 1 else 8
+        body_start, box_end = start + header, start + size
+        if kind in _CONTAINERS:
+            boxes.append([kind, parse(data, body_start, box_end)])
+        else:
+            boxes.append([kind, data[body_start:box_end]])
+        start = box_end
+    return boxes
+
+
+def serialize(boxes):
+    out = []
+    for kind, body in boxes:
+        payload = serialize(body) if isinstance(body, list) else body
+        if len(payload) + 8 <= 0xFFFFFFFF:
+            out.append(_HEADER.pack(len(payload) + 8, kind))
+        else:
+            out.append(_HEADER.pack(1, kind) + _U64.pack(len(payload) + 16))
+        out.append(payload)
+    return b''.join(out)
+
+
+def children(box, kind):
+    return [child for child in box[1] if child[0] == kind]
+
+
+def find(box, *path):
+    """First descendant of ``box`` along ``path`` of types, or ``None``."""
+    for kind in path:
+        found = children(box, kind) if isinstance(box[1], list) else []
+        if not found:
+            return None
+        box = found[0]
+    return box
+
+
+def full_box(version, flags, payload=b''):
+    return _U32.pack(version << 24 | flags) + payload
+
+
+def _version(body):
+    return body[0]
+
+
+def _entries(body, fmt, offset=8):
+    """Table entries of a full box whose entry count sits at ``offset - 4``."""
+    count = _U32.unpack_from(body, offset - 4)[0]
+    entry = struct.Struct('>' + fmt)
+    if offset + count * entry.size > len(body):
+        raise Mp4Error("truncated sample table")
+    return list(entry.iter_unpack(body[offset:offset + count * entry.size]))
+
+
+# ---------------- Fast start ----------------
+def faststart(src, dst):
+    """
+    Copy ``src`` to ``dst`` with ``moov`` ahead of the media data. Returns
+    ``False`` without writing anything if ``src`` already starts that way.
+    """
+    boxes = top_level_boxes(src)
+    moov_box, moov = _moov(src, boxes)
+    first_mdat = min(box.offset for box in boxes if box.type == b'mdat')
+    if moov_box.offset < first_mdat:
+        return False
+
+    head = [box for box in boxes if box.offset < first_mdat]
+    tail = [box for box in boxes if box.offset >= first_mdat and box is not moov_box]
+    tables = []
+    for trak in children(moov, b'trak'):
+        stbl = find(trak, b'mdia', b'minf', b'stbl')
+        for table in (stbl[1] if stbl else ()):
+            if table[0] == b'stco':
+                tables.append((table, [o for o, in _entries(table[1], 'I')]))
+            elif table[0] == b'co64':
+                tables.append((table, [o for o, in _entries(table[1], 'Q')]))
+
+    starts = [box.offset for box in tail]
+    head_size = sum(box.size for box in head)
+    wide = False
+    while True:
+        for table, offsets in tables:
+            _write_offsets(table, offsets, wide)  # only the size matters here
+        position = head_size + len(serialize([moov]))
+        moved = {}
+        for box in tail:
+            moved[box.offset] = position
+            position += box.size
+
+        def shift(offset):
+            index = bisect_left(starts, offset + 1) - 1
+            if index < 0:
+                return offset
+            return moved[starts[index]] + offset - starts[index]
+
+        shifted = [[shift(o) for o in offsets] for _, offsets in tables]
+        if wide or all(o <= 0xFFFFFFFF for offsets in shifted for o in offsets):
+            break
+        wide = True  # stco entries are 32-bit; moving past 4 GiB needs co64
+    for (table, _), offsets in zip(tables, shifted):
+        _write_offsets(table, offsets, wide)
+
+    for box in head:
+        copy_range(src, dst, box.offset, box.size)
+    dst.write(serialize([moov]))
+    for box in tail:
+        copy_range(src, dst, box.offset, box.size)
+    return True
+
+
+def _write_offsets(table, offsets, wide):
+    wide = wide or table[0] == b'co64'
+    table[0] = b'co64' if wide else b'stco'
+    fmt = '>%dQ' if wide else '>%dI'
+    table[1] = full_box(0, 0, _U32.pack(len(offsets)) + struct.pack(fmt % len(offsets), *offsets))
+
+
+# ---------------- Fragmented output ----------------
+class Track:
+    """One ``trak``'s samples: file offsets, sizes, decode times and flags."""
+
+    def __init__(self, trak):
+        self.trak = trak
+        tkhd = find(trak, b'tkhd')[1]
+        self.id = _U32.unpack_from(tkhd, 20 if _version(tkhd) == 1 else 12)[0]
+        mdhd = find(trak, b'mdia', b'mdhd')[1]
+        self.timescale = _U32.unpack_from(mdhd, 20 if _version(mdhd) == 1 else 12)[0]
+        self.handler = find(trak, b'mdia', b'hdlr')[1][8:12]
+
+        stbl = find(trak, b'mdia', b'minf', b'stbl')
+        if stbl is None or find(stbl, b'stz2'):
+            raise Mp4Error(f"unsupported sample table in track {self.id}")
+        stsz = find(stbl, b'stsz')[1]
+        uniform, count = struct.unpack_from('>II', stsz, 4)
+        self.sizes = [uniform] * count if uniform else [s for s, in _entries(stsz, 'I', 12)]
+
+        self.durations = [d for n, d in _entries(find(stbl, b'stts')[1], 'II') for _ in range(n)]
+        self.dts = [0, *accumulate(self.durations)][:-1]
+        ctts = find(stbl, b'ctts')
+        self.cts_version = _version(ctts[1]) if ctts else 0
+        self.cts = [o for n, o in _entries(ctts[1], 'Ii' if self.cts_version else 'II')
+                    for _ in range(n)] if ctts else None
+        stss = find(stbl, b'stss')
+        self.sync = {s - 1 for s, in _entries(stss[1], 'I')} if stss else None
+
+        chunks = find(stbl, b'stco') or find(stbl, b'co64')
+        offsets = [o for o, in _entries(chunks[1], 'I' if chunks[0] == b'stco' else 'Q')]
+        self.offsets = []
+        stsc = _entries(find(stbl, b'stsc')[1], 'III')
+        if len({description for _, _, description in stsc}) > 1:
+            raise Mp4Error(f"track {self.id} switches sample descriptions")
+        for i, (first, per_chunk, _) in enumerate(stsc):
+            last = stsc[i + 1][0] - 1 if i + 1 < len(stsc) else len(offsets)
+            for chunk in range(first - 1, last):
+                position = offsets[chunk]
+                for _ in range(per_chunk):
+                    self.offsets.append(position)
+                    position += self.sizes[len(self.offsets) - 1]
+        if not (len(self.sizes) == len(self.durations) == len(self.offsets)) or \
+                (self.cts is not None and len(self.cts) != len(self.sizes)):
+            raise Mp4Error(f"inconsistent sample tables in track {self.id}")
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def is_sync(self, index):
+        return self.sync is None or index in self.sync
+
+
+def fragment(src, dst, seconds=FRAGMENT_SECONDS):
+    """
+    Write ``src`` to ``dst`` as a fragmented MP4 and return the number of
+    fragments; returns 0 without writing anything if ``src`` already is one.
+    """
+    boxes = top_level_boxes(src)
+    if any(box.type == b'moof' for box in boxes):
+        return 0
+    _, moov = _moov(src, boxes)
+    tracks = [Track(trak) for trak in children(moov, b'trak')]
+    if not any(tracks):
+        raise Mp4Error("no samples")
+
+    lead = next((t for t in tracks if t.handler == b'vide'), tracks[0])
+    cuts = [0]
+    for i in range(1, len(lead)):
+        if lead.is_sync(i) and lead.dts[i] - lead.dts[cuts[-1]] >= seconds * lead.timescale:
+            cuts.append(i)
+    # Where each fragment starts in every track, aligned to the lead track's key frames
+    bounds = {
+        track.id: [0] + [
+            bisect_left(track.dts, -(-lead.dts[c] * track.timescale // lead.timescale)) for c in cuts[1:]
+        ] + [len(track)]
+        for track in tracks
+    }
+
+    for box in boxes:
+        if box.type == b'ftyp':
+            copy_range(src, dst, box.offset, box.size)
+    dst.write(serialize([_fragmented_moov(moov, tracks)]))
+    for sequence in range(1, len(cuts) + 1):
+        parts = [(t, bounds[t.id][sequence - 1], bounds[t.id][sequence]) for t in tracks]
+        _write_fragment(src, dst, sequence, [p for p in parts if p[1] < p[2]])
+    return len(cuts)
+
+
+def _fragmented_moov(moov, tracks):
+    moov = [b'moov', [box for box in moov[1] if box[0] != b'mvex']]
+    for trak in children(moov, b'trak'):
+        stbl = find(trak, b'mdia', b'minf', b'stbl')
+        stbl[1] = [box for box in stbl[1] if box[0] not in _SAMPLE_TABLES] + [
+            [b'stts', full_box(0, 0, _U32.pack(0))],
+            [b'stsc', full_box(0, 0, _U32.pack(0))],
+            [b'stsz', full_box(0, 0, _U64.pack(0))],
+            [b'stco', full_box(0, 0, _U32.pack(0))],
+        ]
+
+    mvhd = find(moov, b'mvhd')[1]
+    duration = _U64.unpack_from(mvhd, 24)[0] if _version(mvhd) == 1 else _U32.unpack_from(mvhd, 16)[0]
+    mvex = [[b'mehd', full_box(1, 0, _U64.pack(duration))]] + [
+        # trex defaults; every trun spells out its samples' values
+        [b'trex', full_box(0, 0, struct.pack('>IIIII', track.id, 1, 0, 0, 0))] for track in tracks
+    ]
+    moov[1].append([b'mvex', mvex])
+    return moov
+
+
+def _write_fragment(src, dst, sequence, parts):
+    def moof(data_offsets):
+        trafs = []
+        for (track, start, stop), data_offset in zip(parts, data_offsets):
+            flags = 0x001 | 0x100 | 0x200 | 0x400 | (0x800 if track.cts is not None else 0)
+            samples = []
+            for i in range(start, stop):
+                samples.append(struct.pack(
+                    '>III', track.durations[i], track.sizes[i],
+                    SYNC_SAMPLE if track.is_sync(i) else NON_SYNC_SAMPLE,
+                ))
+                if track.cts is not None:
+                    samples.append(struct.pack('>i' if track.cts_version else '>I', track.cts[i]))
+            trafs.append([b'traf', [
+                # default-base-is-moof, sample-description-index-present
+                [b'tfhd', full_box(0, 0x020002, struct.pack('>II', track.id, 1))],
+                [b'tfdt', full_box(1, 0, _U64.pack(track.dts[start]))],
+                [b'trun', full_box(track.cts_version, flags, struct.pack('>Ii', stop - start, data_offset)
+                                   + b''.join(samples))],
+            ]])
+        return serialize([[b'moof', [[b'mfhd', full_box(0, 0, _U32.pack(sequence))]] + trafs]])
+
+    sizes = [sum(track.sizes[start:stop]) for track, start, stop in parts]
+    media = sum(sizes)
+    mdat_header = _HEADER.pack(media + 8, b'mdat') if media + 8 <= 0xFFFFFFFF \
+        else _HEADER.pack(1, b'mdat') + _U64.pack(media + 16)
+    base = len(moof([0] * len(parts))) + len(mdat_header)
+    dst.write(moof([base + sum(sizes[:i]) for i in range(len(parts))]))
+    dst.write(mdat_header)
+
+    for track, start, stop in parts:
+        # Samples stored back to back are copied as one range
+        run_start = run_end = None
+        for i in range(start, stop):
+            if track.offsets[i] != run_end:
+                if run_start is not None:
+                    copy_range(src, dst, run_start, run_end - run_start)
+                run_start = track.offsets[i]
+            run_end = track.offsets[i] + track.sizes[i]
+        if run_start is not None:
+            copy_range(src, dst, run_start, run_end - run_start)
+
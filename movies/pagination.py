@@ -0,0 +1,158 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of ``COUNT(*)`` + ``OFFSET`` the paginator remembers the sort key of
+the last row it returned and asks for rows strictly after it, so every page
+costs the same regardless of how deep it is. The primary key is always added
+as the final sort key so rows with equal values keep a stable order.
+"""
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+class CursorPaginator:
+    """
+    Paginate ``queryset`` by ``ordering`` (e.g. ``('-release_date',)``).
+
+    Ordering entries may name model fields or annotations on the queryset.
+    ``.values()`` querysets work too as long as they include those columns.
+    """
+
+    def __init__(self, queryset, ordering, per_page=20):
+        self.queryset = queryset
+        self.per_page = per_page
+        ordering = [o for o in ordering if o.lstrip('-') not in ('id', 'pk')]
+        self.ordering = tuple(ordering) + ('-id',)
+        self.fields = [o.lstrip('-') for o in self.ordering]
+
+    # -------- cursors --------
+    def encode_cursor(self, obj, direction):
+        get = obj.get if isinstance(obj, dict) else lambda name: getattr(obj, name)
+        values = [self._dump(get(name)) for name in self.fields]
+        raw = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, values = data['d'], data['v']
+            if direction not in ('n', 'p') or len(values) != len(self.fields):
+                raise ValueError
+            return direction, [self._load(name, v) for name, v in zip(self.fields, values)]
+        except (ValueError, TypeError, KeyError, ValidationError):
+            raise InvalidCursor("Invalid cursor")
+
+    @staticmethod
+    def _dump(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def _load(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotation: still validate, a tampered value would otherwise reach the SQL
+            field = self.queryset.query.annotations[name].output_field
+        return field.to_python(value)
+
+    # -------- queries --------
+    def _after(self, values, reverse=False):
+        """Q matching rows that sort strictly after ``values``."""
+        condition = Q()
+        for i, order in enumerate(self.ordering):
+            descending = order.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            step = Q(**{f'{self.fields[i]}__{lookup}': values[i]})
+            for name, value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{name: value})
+            condition |= step
+        # Implied by the above, but lets the database seek the index to the
+        # cursor instead of walking it from the first row
+        descending = self.ordering[0].startswith('-') != reverse
+        return Q(**{f"{self.fields[0]}__{'lte' if descending else 'gte'}": values[0]}) & condition
+
+    @staticmethod
+    def _flip(order):
+        return order[1:] if order.startswith('-') else f'-{order}'
+
+    def _page_query(self, cursor):
+        direction, values = self.decode_cursor(cursor) if cursor else ('n', None)
+        backwards = direction == 'p'
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse=backwards))
+        ordering = [self._flip(o) for o in self.ordering] if backwards else self.ordering
+        return queryset.order_by(*ordering)[:self.per_page + 1], backwards, values is not None
+
+    def _make_page(self, rows, backwards, has_cursor):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows)
+        has_next = more if not backwards else True
+        has_previous = has_cursor if not backwards else more
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], 'n') if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], 'p') if has_previous else None,
+        )
+
+    def page(self, cursor=None):
+        queryset, backwards, has_cursor = self._page_query(cursor)
+        return self._make_page(list(queryset), backwards, has_cursor)
+
+    async def apage(self, cursor=None):
+        queryset, backwards, has_cursor = self._page_query(cursor)
+        return self._make_page([row async for row in queryset], backwards, has_cursor)
+
+    def approximate_count(self, timeout=60):
+        """Row count for the unpaginated queryset, cached briefly per query."""
+        key = 'movies:count:' + hashlib.md5(str(self.queryset.query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.queryset.order_by().count()
+            cache.set(key, count, timeout)
+        return count
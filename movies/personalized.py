@@ -0,0 +1,144 @@
+"""
+"For you" recommendations.
+
+A batch job (``manage.py build_for_you``) scores candidates for every user
+with history: movies similar to what they favorited or rated well (the
+``RelatedMovie`` index), boosted by their genre affinity and padded with
+the best rated movies of their favorite genres. Movies they already
+favorited or reviewed are excluded. The result is cached per user as a
+list of movie ids; serving the section reads it and builds the cards from
+current rows in one query, so an edited movie never shows a stale card.
+Until the job has run for a user the section is simply absent.
+"""
+import heapq
+from collections import defaultdict
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from . import versioning
+from .feeds import movie_card
+from .models import Favorite, Movie, RelatedMovie, Review
+
+CANDIDATES = 20       # stored per user, so newly favorited ones can be dropped
+SHOWN = 10
+FAVORITE_WEIGHT = 2.0
+GENRE_FILL = 0.5      # weight of the "best rated in your genres" padding
+FILL_PER_GENRE = 20
+
+
+def _key(user_id):
+    return f'movies:for_you:{user_id}'
+
+
+def history_weight(rating=None):
+    """Favorites count 2; reviews count ``rating - 3`` (a 1-star review pushes away)."""
+    return FAVORITE_WEIGHT if rating is None else rating - 3
+
+
+def score_user(history, neighbors, genre_of, genre_top, k=CANDIDATES):
+    """
+    Best ``k`` unseen movie ids for one user.
+
+    ``history`` maps movie id -> preference weight, ``neighbors`` movie id ->
+    ``[(movie id, similarity)]``, ``genre_of`` movie id -> genre id and
+    ``genre_top`` genre id -> best rated movie ids.
+    """
+    affinity = defaultdict(float)
+    for movie_id, weight in history.items():
+        if weight > 0 and movie_id in genre_of:
+            affinity[genre_of[movie_id]] += weight
+    total = sum(affinity.values())
+
+    scores = defaultdict(float)
+    for movie_id, weight in history.items():
+        for other, similarity in neighbors.get(movie_id, ()):
+            scores[other] += weight * similarity
+
+    if total:
+        for genre, value in heapq.nlargest(3, affinity.items(), key=itemgetter(1)):
+            share = value / total
+            top = genre_top.get(genre, ())
+            for rank, other in enumerate(top):
+                scores[other] += GENRE_FILL * share * (1 - rank / len(top))
+        for other in scores:
+            scores[other] *= 1 + affinity.get(genre_of.get(other), 0) / total
+
+    for movie_id in history:
+        scores.pop(movie_id, None)
+    return [m for m, score in heapq.nlargest(k, scores.items(), key=itemgetter(1)) if score > 0]
+
+
+# ---------------- Batch job inputs ----------------
+def load_neighbors():
+    neighbors = defaultdict(list)
+    for movie_id, other, score in RelatedMovie.objects.order_by('movie', 'rank') \
+            .values_list('movie_id', 'related_id', 'score').iterator(chunk_size=5000):
+        neighbors[movie_id].append((other, score))
+    return dict(neighbors)
+
+
+def load_genre_top():
+    genre_of = dict(Movie.objects.values_list('id', 'genre_id').iterator(chunk_size=5000))
+    genre_top = defaultdict(list)
+    for movie_id, genre_id in Movie.objects.filter(rating_count__gt=0) \
+            .order_by('-avg_rating', '-rating_count').values_list('id', 'genre_id').iterator(chunk_size=5000):
+        if len(genre_top[genre_id]) < FILL_PER_GENRE:
+            genre_top[genre_id].append(movie_id)
+    return genre_of, dict(genre_top)
+
+
+def user_histories(user_ids=None):
+    """``{user id: {movie id: weight}}`` from Favorite and Review rows."""
+    favorites = Favorite.objects.values_list('user_id', 'movie_id')
+    reviews = Review.objects.values_list('user_id', 'movie_id', 'rating')
+    if user_ids is not None:
+        favorites = favorites.filter(user_id__in=user_ids)
+        reviews = reviews.filter(user_id__in=user_ids)
+
+    histories = defaultdict(dict)
+    for user_id, movie_id, rating in reviews.iterator(chunk_size=5000):
+        histories[user_id][movie_id] = history_weight(rating)
+    for user_id, movie_id in favorites.iterator(chunk_size=5000):
+        history = histories[user_id]
+        history[movie_id] = history.get(movie_id, 0) + history_weight()
+    return histories
+
+
+def store(candidates):
+    """Cache ``{user id: [movie id, ...]}``."""
+    cache.set_many(
+        {_key(user_id): list(ids) for user_id, ids in candidates.items()},
+        settings.FOR_YOU_TTL,
+    )
+    for user_id in candidates:
+        versioning.bump_user(user_id)
+
+
+# ---------------- Serving ----------------
+def _cards(movie_ids, exclude):
+    """Cards for the first ``SHOWN`` of ``movie_ids`` not in ``exclude`` that still exist."""
+    movie_ids = [m for m in movie_ids or () if m not in exclude]
+    if not movie_ids:
+        return []
+    # Versions first: a card must never claim a newer version than its row
+    versions = versioning.movie_versions(movie_ids)
+    movies = Movie.objects.using(DEFAULT_DB_ALIAS).select_related('genre').in_bulk(movie_ids)
+    cards = [dict(movie_card(movies[m]), version=versions[m]) for m in movie_ids if m in movies]
+    return cards[:SHOWN]
+
+
+def for_you(user_id, exclude=()):
+    """Recommendations for ``user_id`` minus ``exclude``; ``[]`` for anonymous users."""
+    if user_id is None:
+        return []
+    return _cards(cache.get(_key(user_id)), exclude)
+
+
+async def afor_you(user_id, exclude=()):
+    if user_id is None:
+        return []
+    return await sync_to_async(_cards)(await cache.aget(_key(user_id)), exclude)
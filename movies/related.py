@@ -0,0 +1,228 @@
+"""
+"More like this": an offline item-to-item similarity index.
+
+Three signals are combined per pair of movies:
+
+* co-favorites - cosine similarity of the sets of users who favorited each;
+* co-ratings - adjusted cosine of user-mean-centred review ratings;
+* text - cosine of TF-IDF vectors over title and description,
+
+plus a small bonus for sharing a genre. Each movie keeps only its ``TOP_K``
+best neighbors, stored as ``RelatedMovie`` rows so a detail page loads them
+with one join.
+
+The math is sparse matrix products done with inverted indexes: a movie's
+row is accumulated from the users (or terms) it has in common with others,
+so cost follows the number of co-occurrences, never catalog size squared.
+Users with very large baskets and very common terms are left out of
+candidate generation because they are quadratic and carry little signal.
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Favorite, Movie, RelatedMovie, Review
+
+TOP_K = 8
+WEIGHTS = {'favorites': 0.4, 'ratings': 0.35, 'text': 0.25}
+GENRE_BONUS = 0.05
+MAX_BASKET = 300      # users with more favorites/reviews than this are skipped
+MAX_TERMS = 16        # TF-IDF terms kept per movie
+MAX_POSTINGS = 200    # terms in more movies than this do not propose neighbors
+
+TOKEN_RE = re.compile(r'[a-z0-9]{3,}')
+STOP_WORDS = frozenset(
+    'the and for with from that this his her their they them into over after before '
+    'when where while who whom which what about than then there these those are was '
+    'were been being have has had not but one two its out all can will his him she'.split()
+)
+
+
+def tokens(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOP_WORDS]
+
+
+class SimilarityIndex:
+    """
+    Inverted indexes over the catalog; ``neighbors(movie_id)`` computes one row.
+
+    ``movies`` yields ``(id, genre_id, title, description)``, ``favorites``
+    ``(user_id, movie_id)`` and ``ratings`` ``(user_id, movie_id, rating)``.
+    """
+
+    def __init__(self, movies, favorites, ratings):
+        self.genre = {}
+        documents = {}
+        for movie_id, genre_id, title, description in movies:
+            self.genre[movie_id] = genre_id
+            documents[movie_id] = tokens(f'{title} {description}')
+
+        self._index_favorites(favorites)
+        self._index_ratings(ratings)
+        self._index_text(documents)
+
+    # -------- indexing --------
+    def _index_favorites(self, favorites):
+        baskets = defaultdict(list)
+        for user_id, movie_id in favorites:
+            baskets[user_id].append(movie_id)
+        self.fav_baskets = {u: items for u, items in baskets.items() if len(items) <= MAX_BASKET}
+        self.fav_users = defaultdict(list)
+        for user_id, items in self.fav_baskets.items():
+            for movie_id in items:
+                self.fav_users[movie_id].append(user_id)
+        self.fav_norm = {m: math.sqrt(len(users)) for m, users in self.fav_users.items()}
+
+    def _index_ratings(self, ratings):
+        baskets = defaultdict(list)
+        for user_id, movie_id, rating in ratings:
+            baskets[user_id].append((movie_id, rating))
+        self.rating_baskets = {}
+        self.rating_users = defaultdict(list)
+        squares = defaultdict(float)
+        for user_id, items in baskets.items():
+            if len(items) < 2 or len(items) > MAX_BASKET:
+                continue  # a single review carries no co-rating signal
+            mean = sum(r for _, r in items) / len(items)
+            centred = [(m, r - mean) for m, r in items if r != mean]
+            self.rating_baskets[user_id] = centred
+            for movie_id, value in centred:
+                self.rating_users[movie_id].append((user_id, value))
+                squares[movie_id] += value * value
+        self.rating_norm = {m: math.sqrt(s) for m, s in squares.items()}
+
+    def _index_text(self, documents):
+        df = Counter()
+        for words in documents.values():
+            df.update(set(words))
+        n = len(documents) or 1
+        self.terms = {}
+        self.postings = defaultdict(list)
+        for movie_id, words in documents.items():
+            weights = {t: c * math.log(n / df[t]) for t, c in Counter(words).items() if df[t] > 1}
+            top = heapq.nlargest(MAX_TERMS, weights.items(), key=itemgetter(1))
+            norm = math.sqrt(sum(w * w for _, w in top))
+            if not norm:
+                continue
+            vector = [(t, w / norm) for t, w in top]
+            self.terms[movie_id] = vector
+            for term, weight in vector:
+                if df[term] <= MAX_POSTINGS:
+                    self.postings[term].append((movie_id, weight))
+
+    # -------- scoring --------
+    def neighbors(self, movie_id, k=TOP_K):
+        """Best ``k`` ``(movie_id, score)`` pairs for ``movie_id``."""
+        scores = defaultdict(float)
+
+        counts = Counter()
+        for user_id in self.fav_users.get(movie_id, ()):
+            counts.update(self.fav_baskets[user_id])
+        if counts:
+            weight = WEIGHTS['favorites'] / self.fav_norm[movie_id]
+            fav_norm = self.fav_norm
+            for other, n in counts.items():
+                scores[other] += weight * n / fav_norm[other]
+
+        dots = defaultdict(float)
+        for user_id, value in self.rating_users.get(movie_id, ()):
+            for other, other_value in self.rating_baskets[user_id]:
+                dots[other] += value * other_value
+        if dots:
+            weight = WEIGHTS['ratings'] / self.rating_norm[movie_id]
+            rating_norm = self.rating_norm
+            for other, dot in dots.items():
+                if dot > 0:
+                    scores[other] += weight * dot / rating_norm[other]
+
+        weight = WEIGHTS['text']
+        for term, value in self.terms.get(movie_id, ()):
+            for other, other_value in self.postings.get(term, ()):
+                scores[other] += weight * value * other_value
+
+        scores.pop(movie_id, None)
+        genre, genres = self.genre.get(movie_id), self.genre
+        for other in scores:
+            if genres.get(other) == genre:
+                scores[other] += GENRE_BONUS
+        return heapq.nlargest(k, scores.items(), key=itemgetter(1))
+
+    def rows(self, movie_ids=None, k=TOP_K):
+        for movie_id in self.genre if movie_ids is None else movie_ids:
+            if movie_id in self.genre:
+                yield movie_id, self.neighbors(movie_id, k)
+
+
+# ---------------- Database ----------------
+def load_index():
+    return SimilarityIndex(
+        Movie.objects.values_list('id', 'genre_id', 'title', 'description').iterator(chunk_size=5000),
+        Favorite.objects.values_list('user_id', 'movie_id').iterator(chunk_size=5000),
+        Review.objects.values_list('user_id', 'movie_id', 'rating').iterator(chunk_size=5000),
+    )
+
+
+def store(rows, movie_ids=None, batch_size=5000):
+    """Replace the neighbor lists of ``movie_ids`` (all movies if ``None``) with ``rows``."""
+    rows = list(rows)  # score before taking the write lock
+    built_at = timezone.now()
+    written = []
+    with transaction.atomic():
+        existing = RelatedMovie.objects.all()
+        if movie_ids is not None:
+            existing = existing.filter(movie_id__in=movie_ids)
+        existing.delete()
+
+        batch = []
+        for movie_id, neighbors in rows:
+            written.append(movie_id)
+            batch.extend(
+                RelatedMovie(movie_id=movie_id, related_id=other, rank=rank, score=score, built_at=built_at)
+                for rank, (other, score) in enumerate(neighbors)
+            )
+            if len(batch) >= batch_size:
+                RelatedMovie.objects.bulk_create(batch)
+                batch = []
+        RelatedMovie.objects.bulk_create(batch)
+    return written
+
+
+def last_built():
+    return RelatedMovie.objects.aggregate(at=Max('built_at'))['at']
+
+
+def changed_since(since):
+    """
+    Movies whose neighbor lists may have changed after ``since``: new and
+    edited movies (title, description and genre feed the scores) and the
+    movies listing an edited one, plus everything reviewed or favorited by a
+    user who was active since (a new co-occurrence touches both movies of
+    the pair).
+    """
+    edited = set(Movie.objects.filter(updated_at__gt=since).values_list('pk', flat=True))
+    users = (
+        set(Review.objects.filter(created_at__gt=since).values_list('user_id', flat=True))
+        | set(Favorite.objects.filter(added_at__gt=since).values_list('user_id', flat=True))
+    )
+    return (
+        edited
+        | set(RelatedMovie.objects.filter(related_id__in=edited).values_list('movie_id', flat=True))
+        | set(Review.objects.filter(user_id__in=users).values_list('movie_id', flat=True))
+        | set(Favorite.objects.filter(user_id__in=users).values_list('movie_id', flat=True))
+    )
+
+
+def related_movies(movie_id):
+    """``movie_id``'s stored neighbors, best first, in one query."""
+    return Movie.objects.filter(recommended_in__movie_id=movie_id).order_by('recommended_in__rank')
+
+
+def related_ids(movie_id):
+    """Ids of ``movie_id``'s stored neighbors, without loading the movies."""
+    return RelatedMovie.objects.filter(movie_id=movie_id).values_list('related_id', flat=True)
@@ -0,0 +1,110 @@
+"""
+Poster renditions.
+
+Uploaded posters are resized to a few fixed widths in WebP and JPEG and
+stored under ``MEDIA_ROOT/posters/renditions/<content hash>/``. Keying by
+the image's hash means identical uploads share files and a changed poster
+never serves stale thumbnails. ``Movie.poster_hash`` records which set
+belongs to a movie; until it is filled in, cards fall back to the original.
+"""
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+
+WIDTHS = (160, 320, 480)
+FORMATS = {
+    'webp': ('WEBP', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+DEFAULT_WIDTH = 320
+ROOT = 'posters/renditions'
+
+
+def rendition_name(digest, width, ext):
+    return f'{ROOT}/{digest}/{width}.{ext}'
+
+
+def poster_srcset(digest):
+    """``srcset`` strings per format plus a fallback ``src`` for a rendition set."""
+    if not digest:
+        return None
+    srcset = {
+        ext: ', '.join(f'{default_storage.url(rendition_name(digest, w, ext))} {w}w' for w in WIDTHS)
+        for ext in FORMATS
+    }
+    srcset['src'] = default_storage.url(rendition_name(digest, DEFAULT_WIDTH, 'jpeg'))
+    return srcset
+
+
+def build_renditions(name, storage=default_storage):
+    """Render every width/format for the poster stored at ``name``; returns its content hash."""
+    with storage.open(name, 'rb') as f:
+        sha = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+        digest = sha.hexdigest()[:32]
+
+        missing = [
+            (w, ext) for w in WIDTHS for ext in FORMATS
+            if not storage.exists(rendition_name(digest, w, ext))
+        ]
+        if not missing:
+            return digest
+
+        f.seek(0)
+        image = ImageOps.exif_transpose(Image.open(f))
+        image = image.convert('RGB')
+
+    for width, ext in missing:
+        resized = image.copy()
+        resized.thumbnail((width, width * 4), Image.LANCZOS)
+        buffer = BytesIO()
+        fmt, options = FORMATS[ext]
+        resized.save(buffer, fmt, **options)
+        _write(storage, rendition_name(digest, width, ext), buffer.getvalue())
+    return digest
+
+
+def _write(storage, name, data):
+    """Write ``data`` at exactly ``name``; concurrent writers of the same hash are harmless."""
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        if not storage.exists(name):
+            storage.save(name, ContentFile(data))
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
+
+
+def generate_for_movie(movie_id):
+    from .models import Movie
+
+    movie = Movie.objects.filter(pk=movie_id).only('poster').first()
+    if movie is None or not movie.poster:
+        return None
+    digest = build_renditions(movie.poster.name)
+    # Only record the hash if the poster was not replaced in the meantime.
+    if Movie.objects.filter(pk=movie_id, poster=movie.poster.name).update(poster_hash=digest):
+        from . import feeds, shelves, versioning
+        feeds.invalidate_home_feed()
+        shelves.movies_changed([movie_id])
+        versioning.bump([movie_id])
+    return digest
+
+
+def schedule_renditions(movie_id):
+    """Queue ``generate_for_movie`` for when the current transaction commits."""
+    from . import jobs
+
+    jobs.enqueue_on_commit(generate_for_movie, movie_id, key=f'renditions:{movie_id}')
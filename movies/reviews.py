@@ -0,0 +1,55 @@
+"""
+Bulk review writes.
+
+``upsert_reviews`` stores many of one user's reviews with a single
+``INSERT ... ON CONFLICT`` and recomputes each affected movie's rating once.
+``bulk_create`` sends no signals, so it also performs what the Review
+receivers in ``signals.py`` would have done per row.
+"""
+from django.db import transaction
+
+from . import feeds, shelves, trending, versioning
+from .models import Movie, Review
+
+
+def upsert_reviews(user, entries):
+    """
+    Create or update ``user``'s reviews from ``{movie_id: (rating, comment)}``.
+
+    Returns ``(created, updated, missing)`` lists of movie ids; entries for
+    movies that do not exist are skipped.
+    """
+    existing_movies = set(Movie.objects.filter(pk__in=entries).values_list('pk', flat=True))
+    missing = sorted(set(entries) - existing_movies)
+    movie_ids = sorted(existing_movies)
+    if not movie_ids:
+        return [], [], missing
+
+    with transaction.atomic():
+        reviewed = set(
+            Review.objects.filter(user=user, movie_id__in=movie_ids).order_by().values_list('movie_id', flat=True)
+        )
+        Review.objects.bulk_create(
+            [
+                Review(movie_id=pk, user=user, rating=entries[pk][0], comment=entries[pk][1])
+                for pk in movie_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['movie', 'user'],
+            update_fields=['rating', 'comment'],
+        )
+        Movie.objects.filter(pk__in=movie_ids).refresh_ratings()
+
+        created = [pk for pk in movie_ids if pk not in reviewed]
+        updated = [pk for pk in movie_ids if pk in reviewed]
+
+        def after_commit():
+            feeds.invalidate_home_feed()
+            versioning.bump(movie_ids)
+            shelves.movies_changed(movie_ids)
+            for pk in created:
+                trending.record(pk, 'review')
+
+        feeds.invalidate_home_feed()
+        transaction.on_commit(after_commit)
+    return created, updated, missing
@@ -0,0 +1,99 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to one of
+``settings.DATABASE_REPLICAS`` unless the current request or task is pinned
+to the primary, which happens:
+
+* inside a transaction on the primary,
+* for the rest of a request or task once it has written anything (each
+  request and background job runs in its own ``scope``),
+* for unsafe (POST, ...) requests, and for ``DATABASE_REPLICA_LAG`` seconds
+  after them through a cookie set by ``ReplicaPinMiddleware``, so a user
+  reads their own writes even while the replicas trail behind.
+
+Without replicas configured every query goes to ``default``.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_pinned = ContextVar('movies_db_pinned', default=False)
+
+
+def pin():
+    """Send the remaining reads of this request (or task) to the primary; returns the reset token."""
+    return _pinned.set(True)
+
+
+@contextmanager
+def scope(pinned=False):
+    """
+    Run one request or task: reads start on the replicas (the primary if
+    ``pinned``) and a write inside pins only the rest of the block.
+    """
+    token = _pinned.set(pinned)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def primary():
+    """Read from the primary inside the block."""
+    return scope(pinned=True)
+
+
+def read_alias():
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas or _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return random.choice(replicas)
+
+
+def from_replica(obj):
+    """Whether a model instance was loaded from a replica (and so may be behind)."""
+    state = getattr(obj, '_state', None)
+    return state is not None and state.db in settings.DATABASE_REPLICAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas are copies of the primary (see `manage.py sync_replicas`)
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unsafe = request.method not in SAFE_METHODS
+        with scope(pinned=unsafe or PIN_COOKIE in request.COOKIES):
+            response = self.get_response(request)
+
+        if unsafe:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.DATABASE_REPLICA_LAG, httponly=True, samesite='Lax',
+            )
+        return response
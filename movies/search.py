@@ -0,0 +1,138 @@
+"""
+Movie search.
+
+Views call ``search_movies(queryset, query)`` and get back a queryset that is
+filtered to the matches and ordered by relevance. On SQLite the lookup goes
+through an FTS5 index (``movies_movie_fts``) kept in sync by the Movie/Genre
+signals; other databases fall back to ``icontains`` filtering.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'movies_movie_fts'
+
+# bm25() weights for the title, description and genre columns.
+FTS_WEIGHTS = (10.0, 1.0, 5.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class BasicSearchBackend:
+    """Substring search; works on any database but scans the whole table."""
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(genre__name__icontains=query)
+        )
+
+    def index_movies(self, movie_ids, using='default'):
+        pass
+
+    def remove_movies(self, movie_ids, using='default'):
+        pass
+
+    def rebuild(self, using='default'):
+        return 0
+
+
+class SQLiteFTSBackend(BasicSearchBackend):
+    """Ranked prefix search backed by an SQLite FTS5 virtual table."""
+
+    create_sql = (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        "USING fts5(title, description, genre, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    drop_sql = f"DROP TABLE IF EXISTS {FTS_TABLE}"
+
+    @staticmethod
+    def build_match(query):
+        """Turn free text into an FTS5 MATCH expression (every term, prefix-matched)."""
+        terms = TOKEN_RE.findall(query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        match = self.build_match(query)
+        if not match:
+            return super().search(queryset, query)
+
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        table = queryset.model._meta.db_table
+        # Join the index so MATCH runs once and yields each row's rank with it
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE} MATCH %s", f"{FTS_TABLE}.rowid = {table}.id"],
+            params=[match],
+        ).annotate(
+            search_rank=RawSQL(f"bm25({FTS_TABLE}, {weights})", (), output_field=FloatField())
+        ).order_by('search_rank', '-release_date')
+
+    def index_movies(self, movie_ids, using='default'):
+        from .models import Movie
+
+        movie_ids = list(movie_ids)
+        if not movie_ids:
+            return
+        rows = Movie.objects.using(using).filter(pk__in=movie_ids) \
+            .values_list('pk', 'title', 'description', 'genre__name')
+        with connections[using].cursor() as cursor:
+            self._delete(cursor, movie_ids)
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description, genre) VALUES (%s, %s, %s, %s)",
+                [(pk, title, description, genre or '') for pk, title, description, genre in rows],
+            )
+
+    def remove_movies(self, movie_ids, using='default'):
+        movie_ids = list(movie_ids)
+        if movie_ids:
+            with connections[using].cursor() as cursor:
+                self._delete(cursor, movie_ids)
+
+    def rebuild(self, using='default'):
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, description, genre) "
+                "SELECT m.id, m.title, m.description, COALESCE(g.name, '') "
+                "FROM movies_movie m LEFT JOIN movies_genre g ON g.id = m.genre_id"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def _delete(cursor, movie_ids):
+        placeholders = ', '.join(['%s'] * len(movie_ids))
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", movie_ids)
+
+
+_basic_backend = BasicSearchBackend()
+_fts_backend = SQLiteFTSBackend()
+
+
+def get_backend(using='default'):
+    if connections[using].vendor == 'sqlite':
+        return _fts_backend
+    return _basic_backend
+
+
+def search_movies(queryset, query):
+    """Filter ``queryset`` to movies matching ``query``, best matches first."""
+    return get_backend(queryset.db).search(queryset, query)
+
+
+def index_movies(movie_ids, using='default'):
+    get_backend(using).index_movies(movie_ids, using=using)
+
+
+def remove_movies(movie_ids, using='default'):
+    get_backend(using).remove_movies(movie_ids, using=using)
+
+
+def rebuild_index(using='default'):
+    return get_backend(using).rebuild(using=using)
@@ -0,0 +1,113 @@
+"""
+Per-genre top-N shelves.
+
+Each genre's shelf holds the ``SHELF_SIZE`` best movies by release date
+(``latest``) and by rating (``top_rated``) as ``feeds.movie_card`` payloads,
+one cache entry per genre. Reading any number of shelves is a single
+``get_many``; missing ones are built together in one windowed query.
+
+Movie and Review commits drop the affected shelves (``movies_changed``),
+which are rebuilt from the primary on next read. Cached shelves are never
+patched in place: a read-modify-write could race another writer or a
+rebuild and leave a wrong shelf cached until it expires. Cards carry their
+movie versions like the home feed's (see ``feeds.stamp_cards``).
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from . import versioning
+from .feeds import movie_card, stamp_cards
+from .genres import genre_registry
+from .models import Movie
+
+SHELF_SIZE = 10
+
+# shelf name -> (ORM ordering, matching sort key on a card; both descending)
+SHELVES = {
+    'latest': (
+        (F('release_date').desc(), F('id').desc()),
+        lambda card: (card['release_date'], card['id']),
+    ),
+    'top_rated': (
+        (F('avg_rating').desc(), F('release_date').desc(), F('id').desc()),
+        lambda card: (card['avg_rating'], card['release_date'], card['id']),
+    ),
+}
+
+
+def shelf_key(genre_id):
+    return f'movies:shelf:{genre_id}'
+
+
+def _query(genre_ids):
+    # Rebuilt right after writes, before replicas may have caught up
+    movies = Movie.objects.using(DEFAULT_DB_ALIAS).select_related('genre').filter(genre_id__in=genre_ids)
+    movies = movies.annotate(**{
+        f'{name}_rank': Window(RowNumber(), partition_by=F('genre_id'), order_by=ordering)
+        for name, (ordering, _) in SHELVES.items()
+    })
+    ranked = Q()
+    for name in SHELVES:
+        ranked |= Q(**{f'{name}_rank__lte': SHELF_SIZE})
+    return movies.filter(ranked)
+
+
+def _assemble(genre_ids, movies, catalog):
+    shelves = {genre_id: {name: [] for name in SHELVES} for genre_id in genre_ids}
+    for movie in movies:
+        card = movie_card(movie)
+        for name in SHELVES:
+            if getattr(movie, f'{name}_rank') <= SHELF_SIZE:
+                shelves[movie.genre_id][name].append(card)
+    for shelf in shelves.values():
+        for name, (_, key) in SHELVES.items():
+            shelf[name].sort(key=key, reverse=True)
+    stamp_cards((card for shelf in shelves.values() for entries in shelf.values() for card in entries), catalog)
+    cache.set_many({shelf_key(g): shelf for g, shelf in shelves.items()}, settings.GENRE_SHELF_TTL)
+    return shelves
+
+
+def get_shelves(genre_ids):
+    """``{genre_id: {'latest': [card, ...], 'top_rated': [card, ...]}}``."""
+    cached = cache.get_many([shelf_key(g) for g in genre_ids])
+    shelves = {g: cached[shelf_key(g)] for g in genre_ids if shelf_key(g) in cached}
+    missing = [g for g in genre_ids if g not in shelves]
+    if missing:
+        catalog = versioning.current(versioning.CATALOG_KEY)
+        shelves.update(_assemble(missing, list(_query(missing)), catalog))
+    return shelves
+
+
+async def aget_shelves(genre_ids):
+    cached = await cache.aget_many([shelf_key(g) for g in genre_ids])
+    shelves = {g: cached[shelf_key(g)] for g in genre_ids if shelf_key(g) in cached}
+    missing = [g for g in genre_ids if g not in shelves]
+    if missing:
+        catalog = await sync_to_async(versioning.current)(versioning.CATALOG_KEY)
+        movies = [movie async for movie in _query(missing)]
+        shelves.update(_assemble(missing, movies, catalog))
+    return shelves
+
+
+def movies_changed(movie_ids):
+    """Drop the shelves that saved/deleted/re-rated movies are on or may join."""
+    touched = set(movie_ids)
+    genre_ids = set(
+        Movie.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=touched).values_list('genre_id', flat=True)
+    )
+    # A movie may have left any genre, so also drop every cached shelf that shows it.
+    keys = {shelf_key(g.id): g.id for g in genre_registry.all()}
+    for key, shelf in cache.get_many(keys).items():
+        if any(card['id'] in touched for entries in shelf.values() for card in entries):
+            genre_ids.add(keys[key])
+    invalidate(genre_ids)
+
+
+def invalidate(genre_ids=None):
+    if genre_ids is None:
+        genre_ids = [g.id for g in genre_registry.all()]
+    cache.delete_many([shelf_key(g) for g in genre_ids])
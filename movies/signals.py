@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import favorites, feeds, search, shelves, trending, versioning
+from .genres import genre_registry
+from .models import Favorite, Genre, Movie, Review
+
+
+# ---------------- Rating aggregates ----------------
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_movie_rating(sender, instance, **kwargs):
+    Movie.objects.filter(pk=instance.movie_id).refresh_ratings()
+
+
+# ---------------- Search index ----------------
+@receiver(post_save, sender=Movie)
+def index_movie(sender, instance, using, **kwargs):
+    search.index_movies([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Movie)
+def unindex_movie(sender, instance, using, **kwargs):
+    search.remove_movies([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Genre)
+def reindex_genre_movies(sender, instance, created, using, **kwargs):
+    if not created:
+        search.index_movies(instance.movies.using(using).values_list('pk', flat=True), using=using)
+
+
+# ---------------- Home feed ----------------
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_home_feed(sender, using, **kwargs):
+    # Drop the feed now and again on commit, so a rebuild that raced the
+    # write cannot leave pre-commit data cached.
+    feeds.invalidate_home_feed()
+    transaction.on_commit(feeds.invalidate_home_feed, using=using)
+
+
+# ---------------- Favorites cache ----------------
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_favorites(sender, instance, using, **kwargs):
+    transaction.on_commit(lambda: favorites.favorites_changed(instance.user_id), using=using)
+
+
+# ---------------- Genre registry ----------------
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_genre_registry(sender, using, **kwargs):
+    genre_registry.invalidate()
+    transaction.on_commit(genre_registry.invalidate, using=using)
+
+
+# ---------------- Genre shelves ----------------
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def update_movie_shelves(sender, instance, using, **kwargs):
+    transaction.on_commit(lambda: shelves.movies_changed([instance.pk]), using=using)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def update_review_shelves(sender, instance, using, **kwargs):
+    transaction.on_commit(lambda: shelves.movies_changed([instance.movie_id]), using=using)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_shelves(sender, instance, using, **kwargs):
+    # Cards embed the genre name.
+    transaction.on_commit(lambda: shelves.invalidate([instance.pk]), using=using)
+
+
+# ---------------- Trending activity ----------------
+@receiver(post_save, sender=Review)
+def record_review_activity(sender, instance, created, using, **kwargs):
+    if created:
+        transaction.on_commit(lambda: trending.record(instance.movie_id, 'review'), using=using)
+
+
+@receiver(post_save, sender=Favorite)
+def record_favorite_activity(sender, instance, created, using, **kwargs):
+    if created:
+        transaction.on_commit(lambda: trending.record(instance.movie_id, 'favorite'), using=using)
+
+
+# ---------------- Catalog versions ----------------
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def bump_movie_version(sender, instance, using, **kwargs):
+    bump = lambda: versioning.bump([instance.pk])
+    bump()
+    transaction.on_commit(bump, using=using)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_review_version(sender, instance, using, **kwargs):
+    bump = lambda: versioning.bump([instance.movie_id])
+    bump()
+    transaction.on_commit(bump, using=using)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def bump_genre_version(sender, instance, using, **kwargs):
+    bump = lambda: versioning.bump(genres=True)
+    bump()
+    transaction.on_commit(bump, using=using)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def bump_favorites_version(sender, instance, using, **kwargs):
+    transaction.on_commit(lambda: versioning.bump_user(instance.user_id), using=using)
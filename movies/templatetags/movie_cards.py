@@ -0,0 +1,11 @@
+from django import template
+
+from movies.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def movie_cards(context, movies):
+    """Render ``movies`` as cards from the fragment cache (see ``movies.cards``)."""
+    return render_cards(context['request'], movies, context.get('user_fav_ids') or ())
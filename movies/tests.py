@@ -1,3 +1,1095 @@
-from django.test import TestCase
+import base64
+import contextvars
+import io
+import json
+import logging
+import os
+import re
+import struct
+import tempfile
+import warnings
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .api.serializers import (
+    MOVIE_CARD,
+    MOVIE_DETAIL,
+    MovieDetailSerializer,
+    MovieListSerializer,
+)
+from .api.streaming import NDJSONRenderer
+from . import (
+    async_views, cards, feeds, jobs, mp4, personalized, related, renditions, routers, search, shelves, trending,
+    versioning, views,
+)
+from .api import async_views as api_async_views, views as api_views
+from .benchmarks import data as bench_data, plans as bench_plans, runner as bench_runner
+from .benchmarks.scenarios import SCENARIOS, Context
+from .favorites import favorite_ids
+from .instrumentation import QueryBudgetMixin, fingerprint
+from .models import Favorite, Genre, Job, Movie, RelatedMovie, Review
+from .pagination import CursorPaginator, InvalidCursor
+from .video import schedule_video_processing
+
+
+class FastSerializerParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        drama = Genre.objects.create(name='Drama')
+        scifi = Genre.objects.create(name='Sci-Fi')
+        user = User.objects.create_user(username='critic', password='x')
+
+        full = Movie.objects.create(
+            title='Arrival', description='Linguist meets heptapods.',
+            release_date=date(2016, 11, 11), genre=scifi, featured=True,
+            duration=116, poster='posters/arrival.jpg', poster_hash='0' * 32,
+            video='movies/videos/arrival.mp4',
+        )
+        Movie.objects.create(
+            title='Ünïcode – Title', description='', release_date=date(2001, 1, 1),
+            genre=drama, video_url='https://cdn.example.com/v.mp4',
+        )
+        Movie.objects.create(
+            title='Bare', description='x', release_date=date(1999, 5, 5),
+            genre=drama, poster='posters/../posters/a b#1.jpg',
+        )
+        Review.objects.create(movie=full, user=user, rating=4, comment='')
+
+    def assertSameJSON(self, expected, actual):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(expected), renderer.render(actual))
+
+    def test_card_matches_movie_list_serializer(self):
+        movies = Movie.objects.select_related('genre').order_by('id')
+        expected = MovieListSerializer(movies, many=True).data
+        actual = MOVIE_CARD.serialize(MOVIE_CARD.rows(Movie.objects.order_by('id')))
+        self.assertSameJSON(expected, actual)
+
+    def test_detail_matches_movie_detail_serializer(self):
+        for movie in Movie.objects.select_related('genre'):
+            row = MOVIE_DETAIL.rows(Movie.objects.filter(pk=movie.pk)).get()
+            self.assertSameJSON(
+                MovieDetailSerializer(movie).data,
+                MOVIE_DETAIL.serialize([row])[0],
+            )
+
+    def test_movie_detail_api_uses_fast_path(self):
+        movie = Movie.objects.get(title='Arrival')
+        response = self.client.get(f'/api/movies/{movie.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertSameJSON(MovieDetailSerializer(movie).data, response.json()['movie'])
+
+
+class StreamingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        drama = Genre.objects.create(name='Drama')
+        scifi = Genre.objects.create(name='Sci-Fi')
+        Movie.objects.create(
+            title='Arrival', description='Linguist meets heptapods.',
+            release_date=date(2016, 11, 11), genre=scifi, featured=True,
+            duration=116, poster='posters/arrival.jpg', poster_hash='0' * 32,
+        )
+        Movie.objects.create(
+            title='Ünïcode – Title', description='', release_date=date(2001, 1, 1),
+            genre=drama, video_url='https://cdn.example.com/v.mp4',
+        )
+        Movie.objects.create(
+            title='Bare', description='x', release_date=date(1999, 5, 5),
+            genre=drama, poster='posters/../posters/a b#1.jpg',
+        )
+
+    def paginated(self, **params):
+        response = self.client.get('/api/movies/', {'page_size': 100, **params})
+        return sorted(response.json()['results'], key=lambda row: row['id'])
+
+    def streamed(self, response):
+        self.assertEqual(response.status_code, 200)
+        if not response.is_async:
+            return b''.join(response.streaming_content).decode()
+
+        async def collect():
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+        return async_to_sync(collect)()
+
+    def test_streamed_array_matches_paginated_results(self):
+        for params in ({}, {'genre': Genre.objects.get(name='Drama').pk}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/movies/', {'stream': 1, **params})
+                self.assertEqual(response['Content-Type'], 'application/json')
+                rows = json.loads(self.streamed(response))
+                self.assertEqual(sorted(rows, key=lambda row: row['id']), self.paginated(**params))
+
+    def test_ndjson_streams_one_object_per_line(self):
+        response = self.client.get('/api/movies/', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = self.streamed(response)
+        self.assertTrue(body.endswith('\n'))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), Movie.objects.count())
+        self.assertEqual(sorted(rows, key=lambda row: row['id']), self.paginated())
+
+    def test_ndjson_errors_use_the_ndjson_renderer(self):
+        response = self.client.get('/api/movies/', {'genre': 'drama'}, HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response.content, NDJSONRenderer().render({'error': 'Invalid genre'}))
+
+
+@override_settings(QUERY_INSTRUMENTATION=True)
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genres = [Genre.objects.create(name=name) for name in ('Drama', 'Comedy', 'Horror')]
+        cls.user = User.objects.create_user(username='viewer', password='pw')
+        critics = [User.objects.create_user(username=f'critic{i}', password='pw') for i in range(5)]
+        movies = [
+            Movie.objects.create(
+                title=f'Movie {i}', description='d', release_date=date(2020, 1, 1 + i % 28),
+                genre=genres[i % 3], featured=i < 3,
+            )
+            for i in range(30)
+        ]
+        cls.movie = movies[0]
+        cls.picks = [movie.pk for movie in movies[10:]]
+        for critic in critics:
+            Review.objects.create(movie=cls.movie, user=critic, rating=3, comment='ok')
+        for movie in movies[:10]:
+            Favorite.objects.create(user=cls.user, movie=movie)
+
+    def setUp(self):
+        cache.clear()
+        personalized.store({self.user.pk: self.picks})
+
+    def get_twice(self, client, url):
+        # Warm caches; only the second request is held to the budget, so keep
+        # the first one's over-budget warning out of the test output
+        logger = logging.getLogger('movies.instrumentation')
+        level = logger.level
+        logger.setLevel(logging.ERROR)
+        try:
+            client.get(url)
+        finally:
+            logger.setLevel(level)
+        return client.get(url)
+
+    def test_site_pages(self):
+        pk = self.movie.pk
+        urls = [
+            '/', '/movies/', '/movies/?q=movie', '/movies/genre/1/', '/movies/latest/',
+            '/movies/top-rated/', '/movies/trending/', f'/movies/{pk}/', f'/movies/{pk}/watch/',
+            '/movies/favorites/', '/login/', '/register/',
+        ]
+        self.client.login(username='viewer', password='pw')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertWithinQueryBudget(self.get_twice(self.client, url))
+
+        self.assertWithinQueryBudget(self.client.post(f'/movies/{pk}/favorite/'))
+        self.assertWithinQueryBudget(
+            self.client.post(f'/movies/{pk}/review/', {'rating': 4, 'comment': 'nice'})
+        )
+
+    def test_api(self):
+        pk = self.movie.pk
+        client = APIClient()
+        urls = (
+            '/api/home/', '/api/movies/', '/api/movies/?q=movie', f'/api/movies/{pk}/',
+            f'/api/genres/{self.movie.genre_id}/shelf/',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertWithinQueryBudget(self.get_twice(client, url))
+
+        client.force_authenticate(self.user)
+        self.assertWithinQueryBudget(client.get('/api/favorites/'))
+        self.assertWithinQueryBudget(client.post(f'/api/favorites/toggle/{pk}/'))
+        self.assertWithinQueryBudget(
+            client.post(f'/api/movies/{pk}/review/', {'rating': 5, 'comment': 'great'})
+        )
+        self.assertWithinQueryBudget(client.post('/api/reviews/bulk/', {'reviews': [
+            {'movie_id': pk, 'rating': 3, 'comment': 'changed my mind'},
+            {'movie_id': pk + 1000, 'rating': 4},
+        ]}, format='json'))
+
+    def test_server_timing_header(self):
+        response = self.client.get('/movies/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries"')
+
+    def test_fingerprint_ignores_values(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s) AND name = 'a'"),
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'b'"),
+        )
+
+
+def encode_cursor(data):
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name='Drama')
+        # Three movies per release date, so most page boundaries split a tie
+        cls.movies = [
+            Movie.objects.create(
+                title=f'Paged {i}', description='d', release_date=date(2020, 1, 1 + i // 3), genre=genre,
+            )
+            for i in range(8)
+        ]
+        cls.expected = [m.pk for m in sorted(cls.movies, key=lambda m: (m.release_date, m.pk), reverse=True)]
+
+    def paginator(self, per_page=3):
+        return CursorPaginator(Movie.objects.all(), ('-release_date',), per_page=per_page)
+
+    def walk(self, paginator):
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_next_and_previous_cursors_walk_every_row_once(self):
+        paginator = self.paginator()
+        pages = self.walk(paginator)
+        self.assertEqual([m.pk for page in pages for m in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(all(page.has_previous() for page in pages[1:]))
+
+        back = [pages[-1]]
+        while back[-1].has_previous():
+            back.append(paginator.page(back[-1].previous_cursor))
+        self.assertEqual([[m.pk for m in page] for page in reversed(back)], [[m.pk for m in page] for page in pages])
+        self.assertEqual(back[-1].next_cursor, pages[0].next_cursor)
+
+    def test_duplicate_sort_keys_keep_a_stable_order(self):
+        Movie.objects.update(release_date=date(2020, 1, 1))
+        for per_page in (1, 2, 3):
+            with self.subTest(per_page=per_page):
+                pages = self.walk(self.paginator(per_page))
+                self.assertEqual([m.pk for page in pages for m in page], sorted(self.expected, reverse=True))
+
+    def test_invalid_and_tampered_cursors(self):
+        valid = self.paginator().page().next_cursor
+        cursors = [
+            'not a cursor', valid[:-3], '!!!!',
+            encode_cursor({'d': 'x', 'v': ['2020-01-01', 1]}),
+            encode_cursor({'d': 'n', 'v': ['2020-01-01']}),
+            encode_cursor({'d': 'n', 'v': ['yesterday', 1]}),
+            encode_cursor({'d': 'n', 'v': ['2020-01-01', {'id': 1}]}),
+            encode_cursor({'d': 'n', 'v': {'release_date': '2020-01-01'}}),
+            encode_cursor(['n', ['2020-01-01', 1]]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    self.paginator().page(cursor)
+                self.assertEqual(self.client.get('/api/movies/', {'cursor': cursor}).status_code, 400)
+                self.assertEqual(self.client.get('/movies/', {'cursor': cursor}).status_code, 200)
+
+    def test_tampered_annotation_values_are_rejected(self):
+        cursor = encode_cursor({'d': 'n', 'v': [{'rank': 1}, '2020-01-01', 1]})
+        response = self.client.get('/api/movies/', {'q': 'paged', 'ordering': 'relevance', 'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+
+
+class MovieCardFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name='Drama')
+        cls.movies = [
+            Movie.objects.create(title=f'Card {i}', description='d', release_date=date(2020, 1, 1), genre=genre)
+            for i in range(3)
+        ]
+        cls.fan = User.objects.create_user(username='fan', password='pw')
+        Favorite.objects.create(user=cls.fan, movie=cls.movies[0])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_html_is_shared_with_per_user_hearts(self):
+        anonymous = self.client.get('/movies/').content.decode()
+        self.assertIsNotNone(cache.get(cards._key(self.movies[0].pk)))
+        self.assertNotIn('<form action="/movies/', anonymous)
+
+        self.client.force_login(self.fan)
+        page = self.client.get('/movies/').content.decode()
+        favorite_forms = page.count(f'<form action="/movies/{self.movies[0].pk}/favorite/"')
+        self.assertGreater(favorite_forms, 0)
+        self.assertEqual(page.count('class="fav-btn active"'), favorite_forms)
+        self.assertEqual(page.count('csrfmiddlewaretoken'), page.count('data-aos-delay'))
+        self.assertNotIn('\x00', page)
+
+    def test_favorite_writes_retire_the_cached_set(self):
+        first, second = self.movies[:2]
+        self.assertEqual(list(favorite_ids(self.fan)), [first.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.fan, movie=second)
+        self.assertEqual(list(favorite_ids(self.fan)), [first.pk, second.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.filter(user=self.fan, movie=first).delete()
+        self.assertEqual(list(favorite_ids(self.fan)), [second.pk])
+
+    def test_movie_changes_drop_old_and_new_shelves(self):
+        movie = self.movies[0]
+        drama = movie.genre_id
+        comedy = Genre.objects.create(name='Comedy').pk
+        shelves.get_shelves([drama, comedy])
+        movie.genre_id = comedy
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.save()
+        latest = {g: [c['id'] for c in shelf['latest']] for g, shelf in shelves.get_shelves([drama, comedy]).items()}
+        self.assertNotIn(movie.pk, latest[drama])
+        self.assertEqual(latest[comedy], [movie.pk])
+
+    def test_movie_save_rerenders_its_card(self):
+        self.client.get('/movies/')
+        movie = self.movies[1]
+        movie.title = 'Retitled'
+        with self.captureOnCommitCallbacks(execute=True):
+            movie.save()
+        self.assertContains(self.client.get('/movies/'), 'Retitled')
+
+    def test_card_dicts_are_cached_only_at_their_version(self):
+        movie = self.movies[1]
+        card = feeds.movie_card(movie)
+        cards.load([card])
+        self.assertIsNone(cache.get(cards._key(movie.pk)))
+
+        feeds.stamp_cards([card], versioning.current(versioning.CATALOG_KEY))
+        cards.load([card])
+        self.assertIsNotNone(cache.get(cards._key(movie.pk)))
+
+        cache.delete(cards._key(movie.pk))
+        versioning.bump([movie.pk])
+        cards.load([card])
+        self.assertIsNone(cache.get(cards._key(movie.pk)))
+
+    def test_home_feed_cards_are_cached(self):
+        self.client.get('/')
+        self.assertIsNotNone(cache.get(cards._key(self.movies[0].pk)))
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name='Drama')
+        cls.movie, cls.other = [
+            Movie.objects.create(title=title, description='d', release_date=date(2020, 1, 1), genre=genre)
+            for title in ('Shown', 'Neighbor')
+        ]
+        RelatedMovie.objects.create(
+            movie=cls.movie, related=cls.other, rank=0, score=1.0, built_at=timezone.now(),
+        )
+        cls.fan = User.objects.create_user(username='fan', password='pw')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.fan)
+
+    def revalidate(self, url):
+        self.client.get(url)  # picks up the CSRF cookie
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        return etag
+
+    def test_csrf_rotation_invalidates_pages(self):
+        etag = self.revalidate('/movies/')
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'r' * 32
+        self.assertEqual(self.client.get('/movies/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_page_follows_related_movies(self):
+        url = f'/movies/{self.movie.pk}/'
+        etag = self.revalidate(url)
+        versioning.bump([self.other.pk])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_api_follows_related_movies(self):
+        url = f'/api/movies/{self.movie.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        versioning.bump([self.other.pk])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# (sync, async) implementations of every read view that has both
+READ_VIEWS = [
+    (views.home, async_views.home),
+    (views.movie_list, async_views.movie_list),
+    (views.movie_detail, async_views.movie_detail),
+    (api_views.home_api, api_async_views.home_api),
+    (api_views.movie_list_api, api_async_views.movie_list_api),
+    (api_views.movie_detail_api, api_async_views.movie_detail_api),
+    (api_views.genre_shelf_api, api_async_views.genre_shelf_api),
+]
+
+
+def read_views_urlconf(use_async):
+    """The project's URLconf with every read view routed to one implementation."""
+    chosen = {view: pair[use_async] for pair in READ_VIEWS for view in pair}
+
+    def swap(patterns):
+        return [
+            URLResolver(p.pattern, swap(p.url_patterns), p.default_kwargs, p.app_name, p.namespace)
+            if isinstance(p, URLResolver) else
+            URLPattern(p.pattern, chosen.get(p.callback, p.callback), p.default_args, p.name)
+            for p in patterns
+        ]
+    return type('ReadViewsURLConf', (), {'urlpatterns': swap(get_resolver().url_patterns)})
+
+
+class AsyncReadViewParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        drama = Genre.objects.create(name='Drama')
+        Genre.objects.create(name='Empty')
+        movies = [
+            Movie.objects.create(
+                title=f'Parity {i}', description='Same either way', release_date=date(2020, 1, 1 + i),
+                genre=drama, featured=i < 2,
+            )
+            for i in range(5)
+        ]
+        cls.movie = movies[0]
+        RelatedMovie.objects.create(
+            movie=cls.movie, related=movies[1], rank=0, score=1.0, built_at=timezone.now(),
+        )
+        cls.fan = User.objects.create_user(username='fan', password='pw')
+        Favorite.objects.create(user=cls.fan, movie=movies[2])
+        Review.objects.create(movie=cls.movie, user=cls.fan, rating=4, comment='Good')
+        cls.urlconfs = {use_async: read_views_urlconf(use_async) for use_async in (False, True)}
+
+    def fetch(self, use_async, url, **headers):
+        cache.clear()
+        with override_settings(ROOT_URLCONF=self.urlconfs[use_async]):
+            response = self.client.get(url, **headers)
+        # Forms carry a freshly masked CSRF token on every request
+        return response, re.sub(rb'name="csrfmiddlewaretoken" value="\w+"', b'', response.content)
+
+    def assertParity(self, url, **headers):
+        sync, sync_content = self.fetch(False, url, **headers)
+        async_, async_content = self.fetch(True, url, **headers)
+        self.assertEqual(async_.status_code, sync.status_code)
+        self.assertEqual(async_['Content-Type'], sync['Content-Type'])
+        self.assertEqual(async_content, sync_content)
+        return sync
+
+    def urls(self):
+        pk, genre = self.movie.pk, self.movie.genre_id
+        return [
+            '/', '/movies/', '/movies/?q=parity', f'/movies/genre/{genre}/', '/movies/latest/',
+            '/movies/top-rated/', '/movies/trending/', f'/movies/{pk}/',
+            '/api/home/', '/api/movies/', '/api/movies/?q=parity&ordering=relevance',
+            f'/api/movies/{pk}/', f'/api/genres/{genre}/shelf/',
+        ]
+
+    def test_same_output(self):
+        for login in (False, True):
+            if login:
+                self.client.force_login(self.fan)
+            for url in self.urls():
+                with self.subTest(url=url, login=login):
+                    self.assertEqual(self.assertParity(url).status_code, 200)
+
+    def test_same_errors(self):
+        urls = {
+            '/movies/9999/': 404, '/movies/genre/9999/': 404,
+            '/api/movies/9999/': 404, '/api/genres/9999/shelf/': 404,
+            '/api/movies/?genre=x': 400, '/api/movies/?ordering=title': 400, '/api/movies/?cursor=x': 400,
+        }
+        for url, status in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.assertParity(url).status_code, status)
+
+    def test_validators_are_interchangeable(self):
+        self.client.force_login(self.fan)
+        self.client.get('/')  # picks up the CSRF cookie
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.fetch(False, url)[0]['ETag']
+                for use_async in (False, True):
+                    with override_settings(ROOT_URLCONF=self.urlconfs[use_async]):
+                        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 304)
+
+
+class HomeApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name='Drama')
+        cls.movies = [
+            Movie.objects.create(title=f'Pick {i}', description='d', release_date=date(2020, 1, 1), genre=genre)
+            for i in range(3)
+        ]
+        cls.fan = User.objects.create_user(username='fan', password='pw')
+        Favorite.objects.create(user=cls.fan, movie=cls.movies[0])
+
+    def setUp(self):
+        cache.clear()
+        personalized.store({self.fan.pk: [movie.pk for movie in self.movies]})
+
+    def get_home(self, token):
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', 'The HMAC key', UserWarning)  # short development SECRET_KEY
+            return self.client.get('/api/home/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_for_you_leaves_out_favorites(self):
+        response = self.get_home(AccessToken.for_user(self.fan))
+        self.assertEqual([card['id'] for card in response.json()['for_you']], [m.pk for m in self.movies[1:]])
+
+    def test_for_you_shows_current_movie_data(self):
+        movie = self.movies[1]
+        movie.title = 'Retitled'
+        movie.save()
+        response = self.get_home(AccessToken.for_user(self.fan))
+        self.assertEqual(response.json()['for_you'][0]['title'], 'Retitled')
+
+    def test_tokens_of_inactive_users_are_rejected(self):
+        token = AccessToken.for_user(self.fan)
+        self.fan.is_active = False
+        self.fan.save()
+        response = self.get_home(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'user_inactive')
+
+
+class BulkReviewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name='Drama')
+        cls.seen, cls.unseen = [
+            Movie.objects.create(title=title, description='d', release_date=date(2020, 1, 1), genre=genre)
+            for title in ('Seen', 'Unseen')
+        ]
+        cls.critic = User.objects.create_user(username='critic', password='pw')
+        other = User.objects.create_user(username='other', password='pw')
+        Review.objects.create(movie=cls.seen, user=cls.critic, rating=1, comment='meh')
+        Review.objects.create(movie=cls.seen, user=other, rating=4, comment='good')
+
+    def test_upsert_mixes_new_and_existing_reviews(self):
+        client = APIClient()
+        client.force_authenticate(self.critic)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/reviews/bulk/', [
+                {'movie_id': self.seen.pk, 'rating': 5, 'comment': 'grew on me'},
+                {'movie_id': self.unseen.pk, 'rating': 3},
+                {'movie_id': self.unseen.pk + 1000, 'rating': 2},
+            ], format='json')
+        self.assertEqual(response.json(), {
+            'created': [self.unseen.pk], 'updated': [self.seen.pk], 'missing': [self.unseen.pk + 1000],
+        })
+        self.assertEqual(Review.objects.get(movie=self.seen, user=self.critic).comment, 'grew on me')
+
+        ratings = Movie.objects.order_by('pk').values_list('rating_sum', 'rating_count', 'avg_rating')
+        self.assertEqual(list(ratings), [(9, 2, 4.5), (3, 1, 3.0)])
+
+    def test_rebuild_ratings_refreshes_cached_views(self):
+        Movie.objects.update(rating_sum=0, rating_count=0, avg_rating=0)
+        feeds.get_home_feed()
+        version = versioning.current(versioning.movie_key(self.seen.pk))
+        call_command('rebuild_ratings', stdout=io.StringIO())
+        self.assertEqual(feeds.get_home_feed()['cards'][self.seen.pk]['avg_rating'], 2.5)
+        self.assertGreater(versioning.current(versioning.movie_key(self.seen.pk)), version)
+
+
+class ImportMoviesTests(TestCase):
+    HEADER = 'external_id,title,description,release_date,genre,duration\n'
+
+    def setUp(self):
+        self.dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.checkpoint = os.path.join(self.dir, 'import.checkpoint')
+
+    def write(self, rows, name='movies.csv'):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.HEADER + ''.join(f'{row}\n' for row in rows))
+        return path
+
+    def run_import(self, path, **options):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_movies', path, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_dry_run_validates_without_writing(self):
+        path = self.write([
+            'a1,Alpha,d,2020-01-01,Drama,90',
+            'a2,Beta,d,not a date,Drama,',
+            'a3,,d,2020-01-01,Western,',
+        ])
+        out, err = self.run_import(path, dry_run=True)
+        self.assertIn('Validated 1 movies (2 invalid rows, 1 new genres)', out)
+        self.assertIn('Line 3: release_date', err)
+        self.assertIn('Line 4: row: Missing title', err)
+        self.assertFalse(Movie.objects.exists())
+        self.assertFalse(Genre.objects.exists())
+
+    def test_reimport_updates_in_place(self):
+        self.run_import(self.write(['a1,Alpha,d,2020-01-01,Drama,90', 'a2,Beta,d,2021-01-01,Drama,']))
+        first = dict(Movie.objects.values_list('external_id', 'pk'))
+
+        self.run_import(self.write(['a1,Alpha Returns,d,2020-01-01,Comedy,', 'a2,Beta,d,2021-01-01,Drama,']))
+        self.run_import(self.write(['a1,Alpha Returns,d,2020-01-01,Comedy,', 'a2,Beta,d,2021-01-01,Drama,']))
+        self.assertEqual(dict(Movie.objects.values_list('external_id', 'pk')), first)
+        movie = Movie.objects.select_related('genre').get(external_id='a1')
+        self.assertEqual((movie.title, movie.genre.name), ('Alpha Returns', 'Comedy'))
+        self.assertEqual(movie.duration, 90)  # column left empty: kept
+        self.assertEqual(Genre.objects.count(), 2)
+
+    def test_interrupted_import_resumes_from_checkpoint(self):
+        path = self.write([f'm{i},Movie {i},d,2020-01-0{i + 1},Drama,' for i in range(5)])
+        with mock.patch.object(search, 'index_movies', side_effect=[None, RuntimeError('disk full')]):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, batch_size=2, checkpoint=self.checkpoint)
+        self.assertEqual(sorted(Movie.objects.values_list('external_id', flat=True)), ['m0', 'm1'])
+        with open(self.checkpoint) as f:
+            self.assertEqual(json.load(f)['line'], 3)
+
+        with mock.patch.object(search, 'index_movies') as index_movies:
+            out, _ = self.run_import(path, batch_size=2, checkpoint=self.checkpoint)
+        self.assertIn('Resuming after line 3.', out)
+        self.assertIn('Imported 3 movies', out)
+        self.assertEqual(index_movies.call_count, 2)
+        self.assertEqual(Movie.objects.count(), 5)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_checkpoint_of_another_file_is_refused(self):
+        self.run_import(self.write(['a1,Alpha,d,2020-01-01,Drama,']))
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'source': '/elsewhere.csv', 'line': 2}, f)
+        with self.assertRaisesMessage(CommandError, 'belongs to /elsewhere.csv'):
+            self.run_import(self.write(['a2,Beta,d,2020-01-01,Drama,']), checkpoint=self.checkpoint)
+
+
+class IncrementalRelatedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genre = Genre.objects.create(name='Drama')
+        cls.movies = [
+            Movie.objects.create(
+                title=f'Harbor story {i}', description=f"Fishing boats at {('dawn', 'dusk')[i % 2]}",
+                release_date=date(2020, 1, 1),
+                genre=genre, external_id=f'h{i}',
+            )
+            for i in range(4)
+        ]
+
+    def test_edited_movies_and_their_listers_are_rebuilt(self):
+        call_command('build_related', stdout=io.StringIO())
+        since = related.last_built()
+        self.assertEqual(related.changed_since(since), set())
+
+        edited = self.movies[0]
+        edited.title = 'Mountain story'
+        edited.save()
+        listers = set(RelatedMovie.objects.filter(related=edited).values_list('movie_id', flat=True))
+        self.assertTrue(listers)
+        self.assertEqual(related.changed_since(since), {edited.pk} | listers)
+
+    def test_imported_updates_count_as_edits(self):
+        since = timezone.now()
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'movies.csv')
+        with open(path, 'w') as f:
+            f.write('external_id,title,description,release_date,genre\nh1,Retitled,d,2020-01-01,Drama\n')
+        call_command('import_movies', path, stdout=io.StringIO())
+        self.assertEqual(related.changed_since(since), {self.movies[1].pk})
+
+
+class BenchmarkScenarioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        bench_data.load(movies=60, users=10, reviews=200, favorites=50, genres=4)
+
+    def test_every_scenario_succeeds(self):
+        results = bench_runner.run_client(SCENARIOS, Context(sample=5, depth=2), iterations=2, warmup=0)
+        self.assertEqual(list(results), [s.name for s in SCENARIOS])
+        for name, result in results.items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['errors'], 0, result['status'])
+                self.assertIsNotNone(result['queries'])
+
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(bench_runner.percentile(values, 50), 50)
+        self.assertEqual(bench_runner.percentile(values, 99), 99)
+        self.assertEqual(bench_runner.percentile([7], 95), 7)
+
+
+class QueryPlanTests(TestCase):
+    """Every query the benchmark scenarios issue must be served by an index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        bench_data.load(movies=500, users=50, reviews=3000, favorites=600, genres=8)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_no_full_table_scans(self):
+        statements = bench_plans.capture(SCENARIOS, Context(sample=5, depth=3))
+        self.assertGreater(len(statements), len(SCENARIOS))
+        for sql, params in statements.values():
+            plan = bench_plans.explain(sql, params)
+            with self.subTest(sql=sql[:120]):
+                scans = bench_plans.full_scans(plan, limited=' LIMIT ' in sql)
+                self.assertEqual(scans, [], '\n'.join([sql, *plan]))
+
+    def test_full_scans_detects_unindexed_reads(self):
+        plan = bench_plans.explain('SELECT * FROM movies_movie WHERE description = %s', ['x'])
+        self.assertEqual(bench_plans.full_scans(plan), ['movies_movie'])
+        plan = bench_plans.explain('SELECT id FROM movies_movie ORDER BY release_date', [])
+        self.assertEqual(bench_plans.full_scans(plan), ['movies_movie'])
+
+
+class TrendingCountersTests(SimpleTestCase):
+    def wait_for_flushes(self):
+        # The flush executor has one worker, so a no-op queued behind them runs last
+        for _ in range(3):
+            trending._executor.submit(lambda: None).result(timeout=5)
+
+    @override_settings(TRENDING_FLUSH_INTERVAL=0)
+    def test_events_recorded_during_a_flush_are_persisted(self):
+        counters = trending.TrendingCounters()
+        written = []
+
+        def write_scores(deltas):
+            if not written:
+                counters.record(2, 'review')  # lands while the first batch is being written
+            written.append(set(deltas))
+
+        with mock.patch.object(trending, 'write_scores', write_scores):
+            counters.record(1, 'review')
+            self.wait_for_flushes()
+        self.assertEqual(written, [{1}, {2}])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def run_isolated(self, func, *args):
+        # Writes by earlier tests pinned this thread's context
+        return contextvars.Context().run(func, *args)
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        router = routers.ReplicaRouter()
+
+        def reads():
+            before = router.db_for_read(Movie)
+            router.db_for_write(Movie)
+            return before, router.db_for_read(Movie)
+
+        self.assertEqual(self.run_isolated(reads), ('replica', 'default'))
+        self.assertEqual(self.run_isolated(router.db_for_read, Movie), 'replica')
+
+    def test_pins_end_with_their_scope(self):
+        router = routers.ReplicaRouter()
+
+        def reads():
+            with routers.scope():
+                router.db_for_write(Movie)
+                inside = router.db_for_read(Movie)
+            token = routers.pin()
+            pinned = router.db_for_read(Movie)
+            token.var.reset(token)
+            return inside, pinned, router.db_for_read(Movie)
+
+        self.assertEqual(self.run_isolated(reads), ('default', 'default', 'replica'))
+
+    def test_jobs_read_from_the_primary_without_pinning_the_worker(self):
+        def work():
+            seen = []
+            jobs.call('movies.tests.write_and_read', [seen], {})
+            return seen, routers.read_alias()
+
+        self.assertEqual(self.run_isolated(work), (['default'], 'replica'))
+
+    def test_unsafe_requests_pin_the_user_to_the_primary(self):
+        middleware = routers.ReplicaPinMiddleware(lambda request: HttpResponse(routers.read_alias()))
+        factory = RequestFactory()
+
+        response = self.run_isolated(middleware, factory.post('/'))
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]['max-age'], settings.DATABASE_REPLICA_LAG)
+
+        pinned = factory.get('/')
+        pinned.COOKIES[routers.PIN_COOKIE] = '1'
+        self.assertEqual(self.run_isolated(middleware, pinned).content, b'default')
+        self.assertEqual(self.run_isolated(middleware, factory.get('/')).content, b'replica')
+
+
+def write_and_read(seen):
+    routers.ReplicaRouter().db_for_write(Movie)
+    seen.append(routers.read_alias())
+
+
+def failing_job(message):
+    raise ValueError(message)
+
+
+class JobQueueTests(TestCase):
+    def test_enqueue_deduplicates_queued_keys(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            renditions.schedule_renditions(7)
+            renditions.schedule_renditions(7)
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.args, job.key), ('movies.renditions.generate_for_movie', [7], 'renditions:7'))
+
+        # Once claimed, a new request is queued rather than absorbed
+        self.assertEqual(jobs.claim(10), [job])
+        self.assertNotEqual(jobs.enqueue(renditions.generate_for_movie, 7, key='renditions:7').pk, job.pk)
+
+    def test_claimed_jobs_are_not_handed_out_twice(self):
+        jobs.enqueue(renditions.generate_for_movie, 1)
+        claimed = jobs.claim(10)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(jobs.claim(10), [])
+        jobs.finish(claimed[0])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_failures_are_retried_later_then_kept_as_failed(self):
+        job = jobs.enqueue(failing_job, 'boom')
+        with self.assertLogs('movies.jobs', 'WARNING'):
+            self.assertEqual(jobs.run_ready(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('ValueError: boom', job.last_error)
+        self.assertEqual(jobs.run_ready(), 0)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('movies.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_ready(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_jobs_whose_workers_die_fail_after_max_attempts(self):
+        job = jobs.enqueue(renditions.generate_for_movie, 1)
+        expired = timezone.now() - timedelta(seconds=settings.JOB_LEASE + 1)
+        for _ in range(2):
+            self.assertEqual(jobs.claim(10), [job])
+            Job.objects.update(claimed_at=expired)  # the worker died mid-job
+        with self.assertLogs('movies.jobs', 'ERROR'):
+            self.assertEqual(jobs.claim(10), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+
+def mp4_box(kind, *parts):
+    payload = b''.join(parts)
+    return struct.pack('>I4s', len(payload) + 8, kind) + payload
+
+
+def mp4_table(kind, fmt, rows):
+    return mp4_box(kind, bytes(4), struct.pack('>I', len(rows)), *(struct.pack(fmt, *r) for r in rows))
+
+
+def build_mp4():
+    """
+    A two-track MP4 with the moov at the end. Video: 10 half-second samples,
+    key frames at 0s, 2s and 4s; audio: 12 samples. Each sample's bytes name it.
+    """
+    tracks = [
+        (1, b'vide', 1000, [500] * 10, {0, 4, 8}),
+        (2, b'soun', 100, [40] * 12, None),
+    ]
+    samples = {tid: [f'{tid}:{i}:'.encode() * (3 + i % 4) for i in range(len(d))] for tid, _, _, d, _ in tracks}
+    ftyp = mp4_box(b'ftyp', b'isom', bytes(4), b'isommp41')
+
+    # Two samples per chunk, chunks of both tracks interleaved
+    media, chunk_offsets = b'', {tid: [] for tid in samples}
+    for chunk in range(6):
+        for tid, track_samples in samples.items():
+            if chunk * 2 < len(track_samples):
+                chunk_offsets[tid].append(len(ftyp) + 8 + len(media))
+                media += b''.join(track_samples[chunk * 2:chunk * 2 + 2])
+
+    traks = []
+    for tid, handler, timescale, durations, sync in tracks:
+        stbl = [
+            mp4_box(b'stsd', bytes(4), struct.pack('>I', 1), mp4_box(b'avc1', bytes(16))),
+            mp4_table(b'stts', '>II', [(len(durations), durations[0])]),
+            mp4_table(b'stsc', '>III', [(1, 2, 1)]),
+            mp4_box(b'stsz', bytes(8), struct.pack('>I', len(durations)),
+                    *(struct.pack('>I', len(s)) for s in samples[tid])),
+            mp4_table(b'stco', '>I', [(o,) for o in chunk_offsets[tid]]),
+        ]
+        if sync is not None:
+            stbl.append(mp4_table(b'stss', '>I', [(i + 1,) for i in sorted(sync)]))
+            stbl.append(mp4_table(b'ctts', '>II', [(len(durations), 1000)]))
+        traks.append(mp4_box(
+            b'trak',
+            mp4_box(b'tkhd', bytes(12), struct.pack('>I', tid), bytes(64)),
+            mp4_box(b'mdia',
+                    mp4_box(b'mdhd', bytes(12), struct.pack('>II', timescale, sum(durations)), bytes(4)),
+                    mp4_box(b'hdlr', bytes(8), handler, bytes(13)),
+                    mp4_box(b'minf', mp4_box(b'stbl', *stbl))),
+        ))
+    moov = mp4_box(b'moov', mp4_box(b'mvhd', bytes(12), struct.pack('>II', 1000, 5000), bytes(80)), *traks)
+    mdat = mp4_box(b'mdat', media)
+    return ftyp + mdat + moov, samples
+
+
+class Mp4RewriteTests(SimpleTestCase):
+    def setUp(self):
+        data, self.samples = build_mp4()
+        self.src = io.BytesIO(data)
+
+    def test_faststart_moves_moov_and_keeps_samples_addressable(self):
+        out = io.BytesIO()
+        self.assertTrue(mp4.faststart(self.src, out))
+        self.assertEqual([b.type for b in mp4.top_level_boxes(out)], [b'ftyp', b'moov', b'mdat'])
+        self.assertLess(mp4.startup_bytes(out), mp4.startup_bytes(self.src) - 200)
+
+        moov = mp4.parse(out.getvalue()[mp4.top_level_boxes(out)[1].offset:])[0]
+        for trak in mp4.children(moov, b'trak'):
+            track = mp4.Track(trak)
+            data = [out.getvalue()[o:o + n] for o, n in zip(track.offsets, track.sizes)]
+            self.assertEqual(data, self.samples[track.id])
+        self.assertFalse(mp4.faststart(out, io.BytesIO()))
+
+    def test_fragment_starts_each_fragment_on_a_key_frame(self):
+        out = io.BytesIO()
+        self.assertEqual(mp4.fragment(self.src, out, seconds=2), 3)
+        boxes = mp4.top_level_boxes(out)
+        self.assertEqual([b.type for b in boxes], [b'ftyp', b'moov'] + [b'moof', b'mdat'] * 3)
+        data = out.getvalue()
+        mvex = mp4.find(mp4.parse(data[boxes[1].offset:boxes[2].offset])[0], b'mvex')
+        self.assertEqual([box[0] for box in mp4.parse(mvex[1])], [b'mehd', b'trex', b'trex'])
+
+        found = {1: [], 2: []}
+        for moof in boxes[2::2]:
+            for kind, body in mp4.parse(data, moof.offset + 8, moof.offset + moof.size):
+                if kind != b'traf':
+                    continue
+                traf = dict(mp4.parse(body))
+                track_id = struct.unpack_from('>I', traf[b'tfhd'], 4)[0]
+                base = struct.unpack_from('>Q', traf[b'tfdt'], 4)[0]
+                trun = traf[b'trun']
+                count, position = struct.unpack_from('>Ii', trun, 4)
+                width = 16 if track_id == 1 else 12
+                entries = [struct.unpack_from('>III', trun, 12 + i * width) for i in range(count)]
+                # Uniform sample durations, so the decode time is samples so far * duration
+                self.assertEqual(base, len(found[track_id]) * entries[0][0])
+                if track_id == 1:
+                    self.assertEqual(entries[0][2], mp4.SYNC_SAMPLE)
+                for _, size, _ in entries:
+                    found[track_id].append(data[moof.offset + position:moof.offset + position + size])
+                    position += size
+        self.assertEqual(found, self.samples)
+
+    def test_rejects_files_without_a_moov(self):
+        with self.assertRaises(mp4.Mp4Error):
+            mp4.faststart(io.BytesIO(mp4_box(b'ftyp', b'isom') + mp4_box(b'mdat', b'xx')), io.BytesIO())
+
+
+class VideoProcessingTests(TestCase):
+    def test_upload_is_rewritten_and_marked_ready(self):
+        with tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT=media, FILE_UPLOAD_PERMISSIONS=0o640):
+            movie = Movie.objects.create(
+                title='Clip', description='', release_date=date(2024, 1, 1),
+                genre=Genre.objects.create(name='Shorts'),
+                video=SimpleUploadedFile('clip.mp4', build_mp4()[0]),
+            )
+            upload = movie.video.name
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_video_processing(movie.pk)
+            self.assertEqual(jobs.run_ready(), 1)
+
+            movie.refresh_from_db()
+            self.assertEqual(movie.video_status, Movie.VIDEO_READY)
+            self.assertNotEqual(movie.video.name, upload)
+            self.assertEqual(os.stat(movie.video.path).st_mode & 0o777, 0o640)
+            with movie.video.open('rb') as f:
+                self.assertTrue(mp4.is_faststart(f))
+
+            # The upload is removed later, once requests reading it are done
+            self.assertTrue(movie.video.storage.exists(upload))
+            Job.objects.update(run_at=timezone.now())
+            self.assertEqual(jobs.run_ready(), 1)
+            self.assertFalse(movie.video.storage.exists(upload))
+
+
+class VideoRangeTests(TestCase):
+    def setUp(self):
+        media = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=media, VIDEO_SENDFILE_MODE=None))
+        self.data = build_mp4()[0]
+        movie = Movie.objects.create(
+            title='Clip', description='', release_date=date(2024, 1, 1),
+            genre=Genre.objects.create(name='Shorts'),
+            video=SimpleUploadedFile('clip.mp4', self.data),
+        )
+        self.client.force_login(User.objects.create_user(username='viewer', password='pw'))
+        self.url = f'/movies/{movie.pk}/video/'
+        self.size = len(self.data)
+        self.etag = self.get()[0]['ETag']
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, content
+
+    def test_ranges_are_served_as_partial_content(self):
+        size = self.size
+        cases = {
+            'bytes=0-9': (0, 9),
+            'bytes=10-': (10, size - 1),
+            'bytes=-16': (size - 16, size - 1),
+            f'bytes=5-{size * 2}': (5, size - 1),
+            f'bytes=-{size * 2}': (0, size - 1),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(range=header):
+                response, content = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{size}')
+                self.assertEqual(response['Content-Length'], str(end - start + 1))
+                self.assertEqual(content, self.data[start:end + 1])
+
+    def test_whole_file_without_a_usable_range(self):
+        for header in (None, 'bytes=0-1,4-5', 'bytes=-', 'items=0-9', 'bytes=a-b'):
+            with self.subTest(range=header):
+                response, content = self.get(**({'HTTP_RANGE': header} if header else {}))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Accept-Ranges'], 'bytes')
+                self.assertEqual(content, self.data)
+
+    def test_if_range_mismatch_falls_back_to_the_whole_file(self):
+        response, content = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=self.etag)
+        self.assertEqual((response.status_code, content), (206, self.data[:10]))
+
+        stale = {
+            'etag': '"0-0"',
+            'weak etag': f'W/{self.etag}',
+            'old date': 'Mon, 01 Jan 2001 00:00:00 GMT',
+            'bad date': 'yesterday',
+        }
+        for name, if_range in stale.items():
+            with self.subTest(if_range=name):
+                response, content = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=if_range)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(content, self.data)
+
+    def test_unsatisfiable_ranges(self):
+        for header in (f'bytes={self.size}-', f'bytes={self.size + 10}-{self.size + 20}', 'bytes=9-5', 'bytes=-0'):
+            with self.subTest(range=header):
+                response, content = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], f'bytes */{self.size}')
+                self.assertEqual(content, b'')
@@ -0,0 +1,181 @@
+"""
+Trending scores from time-decayed activity.
+
+Reviews, favorites and watch starts add a weight to a movie's score that
+halves every ``TRENDING_HALF_LIFE`` seconds. Scores are kept as
+``ln(score)`` measured at a fixed epoch: an event at time ``t`` contributes
+``ln(weight) + (t - EPOCH) / tau``, so decay never changes the order of
+stored scores and nothing has to be rewritten as time passes.
+
+Each process accumulates events in memory (``counters``) and flushes them
+to ``TrendingScore`` on a background thread, at most
+``TRENDING_FLUSH_INTERVAL`` seconds after the first pending event. The flush also refreshes the cached top list, which the
+home feed and ``top_movie_ids`` read in O(K).
+"""
+import atexit
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Abs, Coalesce, Exp, Greatest, Ln
+
+from .models import Movie, TrendingScore
+
+logger = logging.getLogger(__name__)
+
+EPOCH = 1767225600  # 2026-01-01T00:00:00Z
+WEIGHTS = {'review': 3.0, 'favorite': 2.0, 'watch': 1.0}
+TOP_KEY = 'movies:trending:top'
+TOP_SIZE = 50
+# Sort value for movies without any recorded activity
+NO_SCORE = -1e9
+
+
+def log_weight(kind, at):
+    return math.log(WEIGHTS[kind]) + (at - EPOCH) * math.log(2) / settings.TRENDING_HALF_LIFE
+
+
+def logaddexp(a, b):
+    """``ln(exp(a) + exp(b))`` without overflow."""
+    if a is None:
+        return b
+    hi, lo = (a, b) if a >= b else (b, a)
+    return hi + math.log1p(math.exp(lo - hi))
+
+
+def current_score(log_score, now=None):
+    """Decayed score as of ``now``, for display."""
+    now = time.time() if now is None else now
+    return math.exp(log_score - (now - EPOCH) * math.log(2) / settings.TRENDING_HALF_LIFE)
+
+
+# ---------------- In-process counters ----------------
+class TrendingCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._flush_scheduled = False
+
+    def record(self, movie_id, kind, at=None):
+        value = log_weight(kind, time.time() if at is None else at)
+        with self._lock:
+            self._pending[movie_id] = logaddexp(self._pending.get(movie_id), value)
+            schedule = not self._flush_scheduled
+            if schedule:
+                self._flush_scheduled = True
+                delay = settings.TRENDING_FLUSH_INTERVAL - (time.monotonic() - self._last_flush)
+        if not schedule:
+            return
+        if delay <= 0:
+            _executor.submit(self._background_flush)
+        else:
+            # Flush on a timer, so a burst followed by silence is not held back
+            timer = threading.Timer(delay, _executor.submit, args=(self._background_flush,))
+            timer.daemon = True
+            timer.start()
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            # Events recorded from here on need a flush of their own
+            self._flush_scheduled = False
+        return pending
+
+    def flush(self):
+        pending = self.drain()
+        if pending:
+            write_scores(pending)
+        return len(pending)
+
+    def _background_flush(self):
+        from django.db import close_old_connections
+
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Flushing trending counters failed")
+        finally:
+            close_old_connections()
+
+
+counters = TrendingCounters()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trending')
+
+
+def record(movie_id, kind):
+    counters.record(movie_id, kind)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        counters.flush()
+    except Exception:
+        pass  # the database may already be gone
+
+
+# ---------------- Storage ----------------
+def write_scores(deltas):
+    """Add ``{movie_id: log weight}`` to the stored scores and refresh the top list."""
+    with transaction.atomic():
+        # Missing rows start at NO_SCORE, which adds nothing below; other
+        # processes may insert the same rows, so both paths go through the update
+        TrendingScore.objects.bulk_create(
+            [
+                TrendingScore(movie_id=pk, log_score=NO_SCORE)
+                for pk in Movie.objects.filter(pk__in=deltas).values_list('pk', flat=True)
+            ],
+            ignore_conflicts=True,
+        )
+        for pk, value in deltas.items():
+            delta = Value(value)
+            # logaddexp in SQL, so concurrent flushes from other processes add up
+            TrendingScore.objects.filter(pk=pk).update(
+                log_score=Greatest(F('log_score'), delta) + Ln(1 + Exp(-Abs(F('log_score') - delta)))
+            )
+    refresh_top()
+
+
+def _query_top():
+    return TrendingScore.objects.order_by('-log_score').values_list('movie_id', flat=True)[:TOP_SIZE]
+
+
+def refresh_top():
+    """Recompute the cached top list; the home feed is rebuilt only if it changed."""
+    from . import feeds, versioning
+
+    top = list(_query_top())
+    if cache.get(TOP_KEY) != top:
+        cache.set(TOP_KEY, top, None)
+        feeds.invalidate_home_feed()
+        versioning.bump()
+    return top
+
+
+def top_movie_ids(k=TOP_SIZE):
+    top = cache.get(TOP_KEY)
+    if top is None:
+        top = list(_query_top())
+        cache.set(TOP_KEY, top, None)
+    return top[:k]
+
+
+async def atop_movie_ids(k=TOP_SIZE):
+    top = await cache.aget(TOP_KEY)
+    if top is None:
+        top = [pk async for pk in _query_top()]
+        await cache.aset(TOP_KEY, top, None)
+    return top[:k]
+
+
+def with_scores(queryset):
+    """Annotate ``trending_score`` (``NO_SCORE`` when a movie has no activity)."""
+    return queryset.annotate(trending_score=Coalesce(F('trending__log_score'), Value(NO_SCORE)))
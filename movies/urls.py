@@ -1,23 +1,51 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Read-heavy pages can be served by their async (ASGI-native) versions.
+if settings.ASYNC_READ_VIEWS:
+    from . import async_views as read_views
+else:
+    read_views = views
+
 urlpatterns = [
-    path('', views.home, name='home'),
+    path('', read_views.home, name='home'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('register/', views.register_view, name='register'),
 
     # Movies
-    path('movies/', views.movie_list, name='movie_list'),  # All movies
-    path('movies/genre/<int:genre_id>/', views.movie_list, name='movie_list_by_genre'),  # By genre
-    path('movies/<int:pk>/', views.movie_detail, name='movie_detail'),
+    path('movies/', read_views.movie_list, name='movie_list'),  # All movies
+    path('movies/genre/<int:genre_id>/', read_views.movie_list, name='movie_list_by_genre'),  # By genre
+    path('movies/<int:pk>/', read_views.movie_detail, name='movie_detail'),
     path('movies/<int:pk>/watch/', views.watch_movie, name='watch_movie'),
+    path('movies/<int:pk>/video/', views.movie_video, name='movie_video'),
     path('movies/<int:movie_id>/favorite/', views.toggle_favorite, name='toggle_favorite'),
     path('movies/<int:movie_id>/review/', views.add_review, name='add_review'),
-    path('movies/latest/', views.movie_list, {'filter_type': 'latest'}, name='latest_movies'),
-    path('movies/top-rated/', views.movie_list, {'filter_type': 'top-rated'}, name='top_rated_movies'),
-    path('movies/trending/', views.movie_list, {'filter_type': 'trending'}, name='trending_movies'),
+    path('movies/latest/', read_views.movie_list, {'filter_type': 'latest'}, name='latest_movies'),
+    path('movies/top-rated/', read_views.movie_list, {'filter_type': 'top-rated'}, name='top_rated_movies'),
+    path('movies/trending/', read_views.movie_list, {'filter_type': 'trending'}, name='trending_movies'),
 
     # Favorites
     path('movies/favorites/', views.favorites_list, name='favorites'),
 ]
+
+# Max SQL queries per request (authenticated user, warm caches), checked by
+# movies.instrumentation; exceeding one is logged and fails the test suite.
+QUERY_BUDGETS = {
+    'home': 3,
+    'login': 2,
+    'logout': 2,
+    'register': 2,
+    'movie_list': 5,
+    'movie_list_by_genre': 4,
+    'movie_detail': 6,
+    'watch_movie': 3,
+    'movie_video': 3,
+    'toggle_favorite': 5,
+    'add_review': 6,
+    'latest_movies': 3,
+    'top_rated_movies': 3,
+    'trending_movies': 3,
+    'favorites': 3,
+}
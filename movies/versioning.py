@@ -0,0 +1,179 @@
+"""
+Catalog versions and conditional GET.
+
+Monotonic counters in the shared cache record when catalog data changed:
+one for the catalog as a whole, one per movie, one for genres (the navbar on
+every page) and one per user for personalized content (favorites, "for you"
+candidates). Movie/Review/Genre/Favorite writes bump them (see ``signals.py``).
+``conditional_view`` turns those counters into ``ETag``/``Last-Modified``
+validators *before* the view runs and answers ``304 Not Modified`` when the
+client is current, so a repeat visit costs one ``get_many`` on the cache.
+
+Pages embed CSRF tokens in their forms, so per-user validators also carry a
+digest of the CSRF secret: after a login or any other token rotation the
+browser gets a fresh page instead of a 304 for one with a stale token.
+
+Counters that fall out of the cache restart from the current time in
+milliseconds rather than from zero, so a version is never reused.
+"""
+import time
+import zlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+CATALOG_KEY = 'movies:version:catalog'
+GENRES_KEY = 'movies:version:genres'
+CHANGED_KEY = 'movies:version:changed_at'
+
+
+def movie_key(movie_id):
+    return f'movies:version:movie:{movie_id}'
+
+
+def user_key(user_id):
+    return f'movies:version:user:{user_id}'
+
+
+def _baseline():
+    return time.time_ns() // 1_000_000
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _baseline(), None)
+
+
+def bump(movie_ids=(), genres=False):
+    """Record a catalog change, optionally touching specific movies or the genre list."""
+    _incr(CATALOG_KEY)
+    if genres:
+        _incr(GENRES_KEY)
+    for movie_id in movie_ids:
+        _incr(movie_key(movie_id))
+    cache.set(CHANGED_KEY, time.time(), None)
+
+
+def bump_user(user_id):
+    _incr(user_key(user_id))
+    cache.set(CHANGED_KEY, time.time(), None)
+
+
+def seed(keys):
+    """Start counters for ``keys`` that are missing from the cache; returns their values."""
+    seeded = {key: _baseline() for key in keys}
+    for key, value in seeded.items():
+        cache.add(key, value, None)
+    return seeded
+
+
+def current(key):
+    """Value of the counter ``key``, starting it if it is missing."""
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _baseline(), None)
+        value = cache.get(key)
+    return value
+
+
+def movie_versions(movie_ids):
+    """``{movie id: counter}`` for ``movie_ids``, starting missing counters."""
+    keys = {movie_key(pk): pk for pk in movie_ids}
+    values = cache.get_many(list(keys))
+    values.update(seed(key for key in keys if key not in values))
+    return {keys[key]: value for key, value in values.items()}
+
+
+def _keys(request, movie_id, related_ids, per_user):
+    keys = [CHANGED_KEY]
+    keys += [GENRES_KEY, movie_key(movie_id)] if movie_id is not None else [CATALOG_KEY]
+    keys += [movie_key(pk) for pk in related_ids]
+    if per_user and request.user.is_authenticated:
+        keys.append(user_key(request.user.pk))
+    return keys
+
+
+def _validators(request, movie_id, per_user, values, keys):
+    missing = [key for key in keys if key not in values]
+    if missing:
+        # Seed counters so the next request can validate against them.
+        seeded = seed(key for key in missing if key != CHANGED_KEY)
+        seeded[CHANGED_KEY] = time.time()
+        if CHANGED_KEY in missing:
+            cache.add(CHANGED_KEY, seeded[CHANGED_KEY], None)
+        values = {**seeded, **values}
+
+    parts = [str(movie_id if movie_id is not None else 'c')] + [str(values[key]) for key in keys[1:]]
+    if per_user:
+        parts.append(str(request.user.pk) if request.user.is_authenticated else 'anon')
+        # Set by CsrfViewMiddleware from the cookie (or session) before the view runs
+        parts.append(format(zlib.crc32(request.META.get('CSRF_COOKIE', '').encode()), 'x'))
+    parts.append(format(zlib.crc32(request.META.get('HTTP_ACCEPT', '').encode()), 'x'))
+    return '"' + '-'.join(parts) + '"', values[CHANGED_KEY]
+
+
+def _finish(response, etag, last_modified):
+    if response.status_code == 200 and not response.has_header('ETag'):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional_view(movie_kwarg=None, per_user=True, anonymous_only=False, related=None):
+    """
+    Add catalog-version validators to a GET view.
+
+    Pages validate against the catalog counter, or against a single movie's
+    counter (plus the genre list) when its id is passed as ``movie_kwarg``.
+    ``related(movie_id)`` returns a queryset of other movie ids the page
+    renders (its "more like this" list), whose counters are folded in too.
+    ``per_user`` folds in who is logged in and their personalized content;
+    API endpoints that render the same for everyone turn it off.
+    ``anonymous_only`` skips validation for requests with an
+    ``Authorization`` header, for API views that personalize for token users.
+    """
+    def decorator(view):
+        def applies(request):
+            if request.method not in ('GET', 'HEAD'):
+                return False
+            return not (anonymous_only and 'HTTP_AUTHORIZATION' in request.META)
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if not applies(request):
+                    return await view(request, *args, **kwargs)
+                if per_user:
+                    request.user = await request.auser()
+                movie_id = kwargs.get(movie_kwarg)
+                related_ids = []
+                if related and movie_id is not None:
+                    related_ids = [pk async for pk in related(movie_id)]
+                keys = _keys(request, movie_id, related_ids, per_user)
+                values = await cache.aget_many(keys)
+                etag, last_modified = _validators(request, movie_id, per_user, values, keys)
+                response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+                if response is not None:
+                    return response
+                return _finish(await view(request, *args, **kwargs), etag, last_modified)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not applies(request):
+                return view(request, *args, **kwargs)
+            movie_id = kwargs.get(movie_kwarg)
+            related_ids = list(related(movie_id)) if related and movie_id is not None else []
+            keys = _keys(request, movie_id, related_ids, per_user)
+            etag, last_modified = _validators(request, movie_id, per_user, cache.get_many(keys), keys)
+            response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+            if response is not None:
+                return response
+            return _finish(view(request, *args, **kwargs), etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,224 @@
+"""
+Video delivery for ``Movie.video``.
+
+``stream_video`` answers HTTP range requests (``Range``/``If-Range`` → 206
+Partial Content) with ``ETag``/``Last-Modified`` validators so players can
+seek without re-downloading the file. Bytes are handed to the server as a
+file object, which lets WSGI servers with ``wsgi.file_wrapper`` (gunicorn,
+uWSGI) use ``sendfile``. With ``VIDEO_SENDFILE_MODE`` set, the response only
+carries an ``X-Accel-Redirect`` (nginx) or ``X-Sendfile`` (Apache/lighttpd)
+header and the front proxy serves the file itself.
+
+Uploads are post-processed by a background job (``process_video``): files
+with the ``moov`` index at the end are rewritten with it in front so
+playback can start before the download finishes, or, with
+``VIDEO_FRAGMENTED``, rewritten as fragmented MP4 (see ``movies.mp4``).
+The rewrite is saved under a new name and ``Movie.video`` switched to it,
+so the upload is served as is until then; ``Movie.video_status`` tracks
+the job.
+"""
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import jobs, mp4
+from .models import Movie
+
+logger = logging.getLogger(__name__)
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """File-like view of ``length`` bytes of ``file`` starting at ``start``."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+        self.name = file.name
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # wsgi.file_wrapper sendfile()s from the current offset and stops
+        # at Content-Length, so the underlying descriptor is safe to share.
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single-range ``Range`` header,
+    ``None`` to serve the whole file, or ``False`` if it is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None  # absent, malformed or multi-range: send everything
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return False
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag  # If-Range needs a strong match
+    date = parse_http_date_safe(if_range)
+    return date is not None and int(last_modified) <= date
+
+
+def _sendfile_response(name, path, content_type):
+    response = HttpResponse(content_type=content_type)
+    if settings.VIDEO_SENDFILE_MODE == 'x-accel':
+        response['X-Accel-Redirect'] = settings.VIDEO_ACCEL_PREFIX.rstrip('/') + '/' + name
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def stream_video(request, movie):
+    try:
+        path = movie.video.path
+    except NotImplementedError:
+        # Remote storage (S3 etc.): let the storage's URL serve the bytes.
+        return HttpResponseRedirect(movie.video.url)
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return HttpResponse(status=404)
+
+    size = stat.st_size
+    last_modified = stat.st_mtime
+    etag = f'"{size:x}-{int(last_modified * 1000):x}"'
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        return not_modified
+
+    if settings.VIDEO_SENDFILE_MODE:
+        response = _sendfile_response(movie.video.name, path, content_type)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(FileRange(open(path, 'rb'), start, length), status=206, content_type=content_type)
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+# ---------------- Upload processing ----------------
+# Players may still be fetching ranges of a replaced file for a while
+SUPERSEDED_VIDEO_GRACE = 60 * 60
+
+
+def rewrite_video(name, storage=default_storage, fragmented=None):
+    """
+    Store a rewritten copy of the MP4 at ``name`` under a new name and return
+    it, or ``None`` if the file needs no rewrite. The original is untouched.
+    """
+    if fragmented is None:
+        fragmented = settings.VIDEO_FRAGMENTED
+    rewrite = mp4.fragment if fragmented else mp4.faststart
+    try:
+        staging = os.path.dirname(storage.path(name))  # same disk as the result
+    except NotImplementedError:
+        staging = None
+
+    with tempfile.TemporaryFile(dir=staging) as tmp:
+        with storage.open(name, 'rb') as src:
+            if not rewrite(src, tmp):
+                return None
+        tmp.seek(0)
+        # save() picks a free name and applies FILE_UPLOAD_PERMISSIONS
+        return storage.save(name, File(tmp, name=os.path.basename(name)))
+
+
+def process_video(movie_id):
+    movie = Movie.objects.filter(pk=movie_id).only('video').first()
+    if movie is None or not movie.video:
+        return
+    # Only touch the row while it still points at this upload
+    current = Movie.objects.filter(pk=movie_id, video=movie.video.name)
+    current.update(video_status=Movie.VIDEO_PROCESSING)
+    try:
+        new_name = rewrite_video(movie.video.name)
+    except mp4.Mp4Error as exc:
+        logger.warning("Serving video of movie %s as uploaded: %s", movie_id, exc)
+        current.update(video_status=Movie.VIDEO_FAILED)
+        return
+    except Exception:
+        current.update(video_status=Movie.VIDEO_FAILED)
+        raise  # retried by the job queue
+
+    if new_name is None:
+        current.update(video_status=Movie.VIDEO_READY)
+    elif current.update(video=new_name, video_status=Movie.VIDEO_READY):
+        # The upload stays in place until requests that started on it are done
+        jobs.enqueue(delete_video_file, movie.video.name, delay=SUPERSEDED_VIDEO_GRACE)
+        from . import feeds, versioning
+        feeds.invalidate_home_feed()
+        versioning.bump([movie_id])
+    else:
+        default_storage.delete(new_name)  # a new upload replaced this one meanwhile
+
+
+def delete_video_file(name):
+    """Remove a stored video that no movie points at any more."""
+    if not Movie.objects.filter(video=name).exists():
+        default_storage.delete(name)
+
+
+def schedule_video_processing(movie_id):
+    """Queue ``process_video`` for when the current transaction commits."""
+    jobs.enqueue_on_commit(process_video, movie_id, key=f'video:{movie_id}')
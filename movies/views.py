@@ -3,77 +3,45 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib import messages
+from django.http import Http404
 from .models import Movie, Favorite, Review, Genre
-from django.core.paginator import Paginator
-from django.db.models import Avg, Prefetch, Q
+from .cards import prefetch as prefetch_cards
+from .favorites import favorite_ids
+from .feeds import get_home_feed, section_cards
+from .genres import genre_registry
+from .pagination import CursorPaginator, InvalidCursor
+from .personalized import for_you
+from .related import related_ids, related_movies
+from .search import search_movies
+from .shelves import get_shelves
+from . import trending
+from .versioning import conditional_view
+from .video import stream_video
 
 # ---------------- Home ----------------
-from django.db.models import Count
+CARD_SECTIONS = ('for_you_movies', 'latest_movies', 'trending_movies', 'other_movies')
 
-from django.db.models import Avg
-
-from django.shortcuts import render
-from django.db.models import Avg, Prefetch
-from .models import Movie, Genre
 
+@conditional_view()
 def home(request):
-    # Featured movies
-    featured_movies = Movie.objects.select_related('genre') \
-        .filter(featured=True).order_by('-created_at')[:6]
-
-    if not featured_movies.exists():
-        featured_movies = Movie.objects.select_related('genre') \
-            .order_by('-created_at')[:6]
-
-    # Other / Latest movies
-    other_movies = Movie.objects.select_related('genre') \
-        .exclude(id__in=featured_movies.values_list('id', flat=True)) \
-        .order_by('-created_at')[:4]
-
-    # Trending movies
-    trending_movies = Movie.objects.select_related('genre') \
-        .annotate(avg_rating_val=Avg('reviews__rating')) \
-        .order_by('-avg_rating_val')[:4]
-
-    # Latest releases
-    latest_movies = Movie.objects.select_related('genre') \
-        .exclude(id__in=featured_movies.values_list('id', flat=True)) \
-        .order_by('-release_date')[:4]
-
-    # Genres for badges
-    genres = Genre.objects.filter(movies__isnull=False).distinct()
+    # Sections and card payloads come precomputed from the cache
+    feed = get_home_feed()
 
     # User favorites
-    user_fav_ids = set(
-        request.user.favorites.values_list('movie_id', flat=True)
-    ) if request.user.is_authenticated else set()
-
-    # Stars computation
-    all_movies = (
-        list(featured_movies)
-        + list(other_movies)
-        + list(trending_movies)
-        + list(latest_movies)
-    )
-
-    for movie in all_movies:
-        avg = getattr(movie, 'avg_rating_val', None) or movie.avg_rating or 0
-        movie.avg_rating_value = avg
-        movie.stars_list = [
-            'full' if i <= avg else
-            'half' if i - avg < 1 else
-            'empty'
-            for i in range(1, 6)
-        ]
-
-    return render(request, 'movies/home.html', {
-        'movies': featured_movies,
-        'other_movies': other_movies,
-        'trending_movies': trending_movies,
-        'latest_movies': latest_movies,
-        'genres': genres,          # ✅ THIS feeds your badges
+    user_fav_ids = favorite_ids(request.user)
+
+    context = {
+        'for_you_movies': for_you(request.user.pk, exclude=user_fav_ids),
+        'movies': section_cards(feed, 'featured'),
+        'other_movies': section_cards(feed, 'other'),
+        'trending_movies': section_cards(feed, 'trending'),
+        'latest_movies': section_cards(feed, 'latest'),
+        'genres': feed['genres'],          # ✅ THIS feeds your badges
         'user_fav_ids': user_fav_ids,
-    })
+    }
+    # Rendered cards for every section in one cache round trip
+    prefetch_cards(request, *(context[name] for name in CARD_SECTIONS))
+    return render(request, 'movies/home.html', context)
 
 # ---------------- Login ----------------
 def login_view(request):
@@ -118,16 +86,44 @@ def register_view(request):
 
 
 # ---------------- Movie List ----------------
+def list_ordering(filter_type, query):
+    # Filter by Top Rated / Trending
+    if filter_type == 'top-rated':
+        return ('-avg_rating',)
+    if filter_type == 'trending':
+        # Time-decayed reviews/favorites/watches (see movies.trending)
+        return ('-trending_score', '-created_at')
+    if query and filter_type != 'latest':
+        return ('search_rank', '-release_date')
+    return ('-release_date',)
+
+
+def genre_shelves():
+    # Latest movies per genre, precomputed as cards (see movies.shelves)
+    genres = genre_registry.with_movies()
+    shelves = get_shelves([genre.id for genre in genres])
+    return {genre: shelves[genre.id]['latest'] for genre in genres if shelves[genre.id]['latest']}
+
+
+def add_stars(movies):
+    for movie in movies:
+        avg = movie.avg_rating
+        movie.avg_rating_value = avg
+        movie.stars_list = [
+            'full' if i <= avg else
+            'half' if i - avg < 1 else
+            'empty'
+            for i in range(1, 6)
+        ]
+
+
+@conditional_view()
 def movie_list(request, genre_id=None, filter_type=None):
     movies = Movie.objects.select_related('genre')
     # 🔍 SEARCH
     query = request.GET.get('q')
     if query:
-        movies = movies.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(genre__name__icontains=query)
-        )
+        movies = search_movies(movies, query)  # ranked by relevance
     selected_genre = None
 
     # Filter by genre
@@ -135,48 +131,29 @@ def movie_list(request, genre_id=None, filter_type=None):
         selected_genre = get_object_or_404(Genre, id=genre_id)
         movies = movies.filter(genre=selected_genre)
 
-    # Filter by Top Rated / Trending
-    if filter_type == 'top-rated':
-        movies = movies.annotate(avg_rating_val=Avg('reviews__rating')).order_by('-avg_rating_val')
-    elif filter_type == 'trending':
-        # Trending could be latest + top rated combination or based on views
-        movies = movies.annotate(avg_rating_val=Avg('reviews__rating')).order_by('-avg_rating_val', '-created_at')
-    elif filter_type == 'latest' or (not genre_id and not filter_type):
-        movies = movies.order_by('-release_date')
+    if filter_type == 'trending':
+        movies = trending.with_scores(movies)
 
+    ordering = list_ordering(filter_type, query)
 
-    # Pagination
-    paginator = Paginator(movies, 20)
-    page_obj = paginator.get_page(request.GET.get('page'))
+    # Pagination (keyset, so deep pages cost the same as the first)
+    paginator = CursorPaginator(movies, ordering, per_page=20)
+    try:
+        page_obj = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        page_obj = paginator.page()
 
     # Movies by Genre sections (only show if not filtering)
     movies_by_genre = {}
     if not selected_genre and not filter_type:
-        genres = Genre.objects.prefetch_related(
-            Prefetch(
-                'movies',
-                queryset=Movie.objects.select_related('genre').order_by('-release_date')[:10],
-                to_attr='top_movies'
-            )
-        )
-        movies_by_genre = {genre: genre.top_movies for genre in genres if genre.top_movies}
+        movies_by_genre = genre_shelves()
 
     # User favorites
-    user_fav_ids = set(
-        request.user.favorites.values_list('movie_id', flat=True)
-    ) if request.user.is_authenticated else set()
+    user_fav_ids = favorite_ids(request.user)
 
     # Compute stars
-    all_movies = list(page_obj) + [m for genre_movies in movies_by_genre.values() for m in genre_movies]
-    for movie in all_movies:
-        avg = getattr(movie, 'avg_rating_val', None) or movie.avg_rating or 0
-        movie.avg_rating_value = avg
-        movie.stars_list = [
-            'full' if i <= avg else
-            'half' if i - avg < 1 else
-            'empty'
-            for i in range(1, 6)
-        ]
+    add_stars(page_obj)
+    prefetch_cards(request, page_obj, *movies_by_genre.values())
 
     return render(request, 'movies/movie_list.html', {
         'page_obj': page_obj,
@@ -189,15 +166,20 @@ def movie_list(request, genre_id=None, filter_type=None):
     })
 
 # ---------------- Movie Detail ----------------
+@conditional_view(movie_kwarg='pk', related=related_ids)
 def movie_detail(request, pk):
-    movie = get_object_or_404(Movie, pk=pk)
-    user_fav_ids = set(request.user.favorites.values_list('movie_id', flat=True)) if request.user.is_authenticated else set()
-    reviews = movie.reviews.all()
+    movie = get_object_or_404(Movie.objects.select_related('genre'), pk=pk)
+    user_fav_ids = favorite_ids(request.user)
+    reviews = movie.reviews.select_related('user')
+    related = list(related_movies(pk).select_related('genre'))
+    add_stars(related)
+    prefetch_cards(request, related)
 
     return render(request, 'movies/movie_detail.html', {
         'movie': movie,
         'user_fav_ids': user_fav_ids,
         'reviews': reviews,
+        'related_movies': related,
         'avg_rating_value': movie.avg_rating,
         'stars_display': movie.stars_display,
         'review_stars_range': range(1, 6),
@@ -214,7 +196,18 @@ def watch_movie(request, pk):
             'movie': movie,
         })
 
+    trending.record(movie.pk, 'watch')
     return render(request, 'movies/watch_movie.html', {'movie': movie})
+
+
+@login_required(login_url='login')
+def movie_video(request, pk):
+    movie = get_object_or_404(Movie, pk=pk)
+    if not movie.video:
+        raise Http404("No video file for this movie.")
+    return stream_video(request, movie)
+
+
 # ---------------- Toggle Favorite ----------------
 @login_required
 def toggle_favorite(request, movie_id):
@@ -243,18 +236,12 @@ def add_review(request, movie_id):
 # ---------------- Favorites List ----------------
 @login_required
 def favorites_list(request):
-    fav_movies = Movie.objects.filter(favorited_by__user=request.user).order_by('-created_at')
+    fav_movies = Movie.objects.select_related('genre') \
+        .filter(favorited_by__user=request.user).order_by('-created_at')
     user_fav_ids = set(movie.id for movie in fav_movies)
 
-    for movie in fav_movies:
-        avg = movie.avg_rating
-        movie.avg_rating_value = avg
-        movie.stars_list = [
-            'full' if i <= avg else
-            'half' if i - avg < 1 else
-            'empty'
-            for i in range(1, 6)
-        ]
+    add_stars(fav_movies)
+    prefetch_cards(request, fav_movies)
 
     return render(request, 'movies/favorites.html', {
         'fav_movies': fav_movies,